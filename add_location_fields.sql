@@ -4,4 +4,12 @@ ADD COLUMN `latitude` DECIMAL(10, 8) NULL DEFAULT NULL COMMENT '纬度' AFTER `h
 ADD COLUMN `longitude` DECIMAL(11, 8) NULL DEFAULT NULL COMMENT '经度' AFTER `latitude`;
 
 -- 为经纬度字段创建索引，便于地理位置搜索
-CREATE INDEX `idx_location` ON `house_info` (`latitude`, `longitude`);
\ No newline at end of file
+CREATE INDEX `idx_location` ON `house_info` (`latitude`, `longitude`);
+
+-- 小区级地理编码（amap_geocoding.py --mode block）无法解析到街道/建筑级别的小区，与 migrations/0007 一致
+CREATE TABLE IF NOT EXISTS `geocode_failed_blocks` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `block` VARCHAR(100) NOT NULL,
+    `failed_at` DATETIME NOT NULL,
+    PRIMARY KEY (`region`, `block`)
+) DEFAULT CHARSET=utf8mb4;
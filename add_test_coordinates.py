@@ -5,10 +5,11 @@
 用于快速演示地图找房功能
 """
 
-import mysql.connector
 import random
 import time
 
+from database import db_manager
+
 # 北京主要区域的坐标范围
 BEIJING_REGIONS = {
     '朝阳区': {
@@ -44,15 +45,8 @@ BEIJING_REGIONS = {
 }
 
 def get_db_connection():
-    """获取数据库连接"""
-    return mysql.connector.connect(
-        host='127.0.0.1',
-        port=3306,
-        user='root',
-        password='',
-        database='house',
-        charset='utf8mb4'
-    )
+    """从共享连接池获取数据库连接，close() 时归还"""
+    return db_manager.get_connection()
 
 def generate_coordinates(region):
     """根据区域生成坐标"""
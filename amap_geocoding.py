@@ -5,15 +5,17 @@
 100万次/天免费配额，替代百度地图API
 """
 
+import argparse
 import requests
 import time
 import json
-import mysql.connector
 from datetime import datetime, date
 import logging
 import os
 import random
 
+from database import db_manager
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -24,13 +26,29 @@ logging.basicConfig(
     ]
 )
 
+# 高德地理编码批量模式单次请求最多支持的地址数
+AMAP_BATCH_LIMIT = 10
+
+# 小区级编码只接受精确到街道或建筑的结果；找不到小区时高德会返回区县或城市的中心点，
+# 写入整个小区会把所有房源放到同一个错误的位置
+BLOCK_PRECISE_LEVELS = frozenset({'兴趣点', '门牌号', '单元号', '道路', '道路交叉路口'})
+
+
 class AmapGeocoder:
-    def __init__(self, api_key):
-        """初始化高德地图地理编码器"""
+    def __init__(self, api_key, base_url=None):
+        """初始化高德地图地理编码器
+
+        Args:
+            api_key: 高德Web服务API密钥
+            base_url: 地理编码接口地址，默认为高德官方接口，测试时可指向本地桩服务
+        """
         self.api_key = api_key
-        self.base_url = "https://restapi.amap.com/v3/geocode/geo"
+        self.base_url = base_url or "https://restapi.amap.com/v3/geocode/geo"
         self.session = requests.Session()
 
+        # 批量模式：每次请求打包的地址数量
+        self.batch_size = AMAP_BATCH_LIMIT
+
         # 处理配置 - 高德地图配额更高，可以更快处理
         self.daily_quota = 1000000  # 100万次/天
         self.requests_per_second = 10  # 10次/秒
@@ -46,6 +64,7 @@ class AmapGeocoder:
         self.success_count = 0
         self.fail_count = 0
         self.retry_count = 0
+        self.api_calls = 0
         self.start_time = datetime.now()
 
     def load_progress(self):
@@ -74,7 +93,8 @@ class AmapGeocoder:
             'retries': self.retry_count,
             'remaining_quota': self.daily_quota - self.today_processed,
             'last_update': datetime.now().isoformat(),
-            'success_rate': round((self.success_count/max(1,self.today_processed))*100, 2)
+            'api_calls': self.api_calls,
+            'success_rate': round((self.success_count/max(1,self.success_count + self.fail_count))*100, 2)
         }
 
         try:
@@ -84,15 +104,8 @@ class AmapGeocoder:
             logging.error(f"进度保存失败: {e}")
 
     def get_db_connection(self):
-        """获取数据库连接"""
-        return mysql.connector.connect(
-            host='127.0.0.1',
-            port=3306,
-            user='root',
-            password='',
-            database='house',
-            charset='utf8mb4'
-        )
+        """从共享连接池获取数据库连接，close() 时归还"""
+        return db_manager.get_connection()
 
     def get_addresses_batch(self, offset=0, limit=1000):
         """批量获取待处理地址"""
@@ -139,6 +152,18 @@ class AmapGeocoder:
 
         return cleaned
 
+    @staticmethod
+    def _is_quota_error(error_info):
+        """是否为日配额超限错误（如 DAILY_QUERY_OVER_LIMIT）"""
+        info = error_info.upper()
+        return '配额' in error_info or 'QUOTA' in info or 'DAILY_QUERY_OVER_LIMIT' in info
+
+    @staticmethod
+    def _is_qps_error(error_info):
+        """是否为并发/QPS超限错误（如 CUQPS_HAS_EXCEEDED_THE_LIMIT）"""
+        info = error_info.upper()
+        return 'QPS' in info or '并发' in error_info or 'TOO_FREQUENT' in info
+
     def geocode_address_with_retry(self, address):
         """带重试机制的地理编码"""
         if self.today_processed >= self.daily_quota:
@@ -155,6 +180,7 @@ class AmapGeocoder:
 
                 response = self.session.get(self.base_url, params=params, timeout=15)
                 self.today_processed += 1
+                self.api_calls += 1
 
                 if response.status_code == 200:
                     data = response.json()
@@ -170,10 +196,10 @@ class AmapGeocoder:
 
                     elif data.get('status') == '0':
                         error_info = data.get('info', '未知错误')
-                        if '配额' in error_info or 'QUOTA' in error_info.upper():
+                        if self._is_quota_error(error_info):
                             logging.error("高德地图天配额超限，停止处理")
                             return "QUOTA_EXCEEDED", "QUOTA_EXCEEDED"
-                        elif 'QPS' in error_info.upper() or '并发' in error_info:
+                        elif self._is_qps_error(error_info):
                             if retry < self.max_retries:
                                 self.retry_count += 1
                                 wait_time = self.retry_delay + self.concurrent_error_delay + random.uniform(1, 3)
@@ -205,6 +231,149 @@ class AmapGeocoder:
         self.fail_count += 1
         return None, None
 
+    @staticmethod
+    def _parse_location(location):
+        """解析高德返回的 "lng,lat" 字符串，失败返回 None"""
+        # 批量模式下未解析成功的地址，location 字段为空列表或空字符串
+        if not location or not isinstance(location, str) or ',' not in location:
+            return None
+        try:
+            lng, lat = location.split(',')
+            return float(lat), float(lng)
+        except ValueError:
+            return None
+
+    def _request_batch(self, addresses, levels=None):
+        """发送一次批量地理编码请求
+
+        Args:
+            addresses: 地址列表
+            levels: 可接受的匹配级别（geocode 的 level 字段），None 表示不限；级别不符的结果视为无法解析
+
+        Returns:
+            (status, results): status 为 'OK'、'QUOTA_EXCEEDED'、'RETRY' 或 'ERROR'；
+            results 与 addresses 一一对应，失败的位置为 None
+        """
+        params = {
+            # 批量模式以 | 分隔地址，地址本身不能包含分隔符
+            'address': '|'.join(addr.replace('|', ' ') for addr in addresses),
+            'batch': 'true',
+            'output': 'json',
+            'key': self.api_key
+        }
+
+        try:
+            response = self.session.get(self.base_url, params=params, timeout=15)
+        except Exception as e:
+            logging.error(f"批量请求异常: {len(addresses)} 条地址 - {e}")
+            return 'RETRY', []
+
+        self.today_processed += 1
+        self.api_calls += 1
+
+        if response.status_code != 200:
+            logging.error(f"HTTP错误: {response.status_code}")
+            return 'RETRY', []
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            logging.error(f"批量响应解析失败: {e}")
+            return 'RETRY', []
+
+        if data.get('status') == '1':
+            geocodes = data.get('geocodes') or []
+            results = [None] * len(addresses)
+            # 批量模式下 geocodes 按请求顺序返回
+            for i, geocode in enumerate(geocodes[:len(addresses)]):
+                if not geocode:
+                    continue
+                # 批量模式下未解析成功的地址，level 字段为空列表
+                level = geocode.get('level')
+                if levels is not None and (not isinstance(level, str) or level not in levels):
+                    continue
+                results[i] = self._parse_location(geocode.get('location'))
+            return 'OK', results
+
+        error_info = data.get('info', '未知错误')
+        if self._is_quota_error(error_info):
+            logging.error("高德地图天配额超限，停止处理")
+            return 'QUOTA_EXCEEDED', []
+        if self._is_qps_error(error_info):
+            return 'RETRY', []
+
+        logging.warning(f"高德API批量请求错误: {error_info}")
+        return 'ERROR', []
+
+    def geocode_batch_with_retry(self, items, levels=None, unresolved=None):
+        """带重试机制的批量地理编码
+
+        按 self.batch_size 把地址打包请求，结果按房源ID映射回去。
+        请求失败（网络、HTTP错误、QPS限制）的批次重新打包重试；地址无法解析的直接计为失败。
+
+        Args:
+            items: [(house_id, address), ...]
+            levels: 可接受的匹配级别，见 _request_batch
+            unresolved: 传入列表时，接口明确答复无法解析（或级别不符）的 house_id 追加到其中
+
+        Returns:
+            (results, quota_exceeded): results 为 {house_id: (lat, lng)}，
+            quota_exceeded 表示处理过程中遇到了配额超限
+        """
+        results = {}
+        pending = list(items)
+
+        for retry in range(self.max_retries + 1):
+            if not pending:
+                break
+
+            failed = []
+            for start in range(0, len(pending), self.batch_size):
+                if self.today_processed >= self.daily_quota:
+                    logging.warning("今日配额已用完，请明天继续处理")
+                    return results, True
+
+                chunk = pending[start:start + self.batch_size]
+                status, locations = self._request_batch([addr for _, addr in chunk], levels)
+
+                if status == 'QUOTA_EXCEEDED':
+                    return results, True
+
+                if status != 'OK':
+                    if status == 'RETRY':
+                        failed.extend(chunk)
+                    else:
+                        self.fail_count += len(chunk)
+                    continue
+
+                # 请求成功但没有坐标说明地址无法解析，重试只会再次消耗配额
+                for (house_id, address), location in zip(chunk, locations):
+                    if location:
+                        results[house_id] = location
+                        self.success_count += 1
+                    else:
+                        self.fail_count += 1
+                        if unresolved is not None:
+                            unresolved.append(house_id)
+                        logging.warning(f"⚠️  地址无法解析: ID={house_id} {address}")
+
+                # 控制请求频率
+                time.sleep(self.delay)
+
+            if failed and retry < self.max_retries:
+                self.retry_count += 1
+                wait_time = self.retry_delay + random.uniform(0, 1)
+                logging.warning(f"{len(failed)} 条地址失败，{wait_time:.1f}秒后重试 ({retry+1}/{self.max_retries})")
+                time.sleep(wait_time)
+                pending = failed
+            else:
+                self.fail_count += len(failed)
+                for house_id, address in failed:
+                    logging.warning(f"⚠️  地理编码失败: ID={house_id} {address}")
+                pending = []
+
+        return results, False
+
     def update_coordinates(self, house_id, latitude, longitude):
         """更新数据库坐标"""
         try:
@@ -223,6 +392,133 @@ class AmapGeocoder:
             logging.error(f"数据库更新失败: ID={house_id}, error: {e}")
             return False
 
+    def update_coordinates_batch(self, coordinates):
+        """批量更新数据库坐标
+
+        Args:
+            coordinates: {house_id: (lat, lng)}
+        """
+        if not coordinates:
+            return True
+
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+
+            sql = "UPDATE house_info SET latitude = %s, longitude = %s WHERE id = %s"
+            cursor.executemany(sql, [(lat, lng, house_id) for house_id, (lat, lng) in coordinates.items()])
+            conn.commit()
+
+            cursor.close()
+            conn.close()
+            return True
+
+        except Exception as e:
+            logging.error(f"数据库批量更新失败: {len(coordinates)} 条, error: {e}")
+            return False
+
+    def get_pending_blocks(self):
+        """获取待处理房源涉及的小区列表
+
+        之前无法解析到街道/建筑级别的小区（geocode_failed_blocks）不再重复请求，
+        其房源由逐条地址编码处理。
+
+        Returns:
+            [((region, block), 房源数量), ...]，按房源数量从多到少排列
+
+        查询失败时抛出异常，不静默退回逐条地址编码（例如缺少 geocode_failed_blocks 表）。
+        """
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+
+            sql = """
+                SELECT region, block, COUNT(*) AS house_count
+                FROM house_info
+                WHERE (latitude IS NULL OR longitude IS NULL)
+                AND block IS NOT NULL
+                AND block != ''
+                AND NOT EXISTS (
+                    SELECT 1 FROM geocode_failed_blocks f
+                    WHERE f.region = COALESCE(house_info.region, '') AND f.block = house_info.block
+                )
+                GROUP BY region, block
+                ORDER BY house_count DESC
+            """
+
+            cursor.execute(sql)
+            results = cursor.fetchall()
+
+            cursor.close()
+            conn.close()
+
+            return [((region, block), count) for region, block, count in results]
+
+        except Exception as e:
+            logging.error(f"小区查询失败: {e}")
+            raise
+
+    def record_failed_blocks(self, blocks):
+        """记录无法按小区解析的小区，之后的运行不再请求
+
+        Args:
+            blocks: [(region, block), ...]
+        """
+        if not blocks:
+            return
+
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+
+            # 先删后插，在 MySQL 和 SQLite（压测库）上都能运行
+            keys = [(region or '', block) for region, block in blocks]
+            now = datetime.now()
+            cursor.executemany("DELETE FROM geocode_failed_blocks WHERE region = %s AND block = %s", keys)
+            cursor.executemany("INSERT INTO geocode_failed_blocks (region, block, failed_at) VALUES (%s, %s, %s)",
+                               [(region, block, now) for region, block in keys])
+            conn.commit()
+
+            cursor.close()
+            conn.close()
+
+        except Exception as e:
+            logging.error(f"失败小区记录写入失败: {len(blocks)} 个小区, error: {e}")
+
+    def update_block_coordinates(self, coordinates):
+        """把小区坐标批量写入该小区下所有缺少坐标的房源
+
+        Args:
+            coordinates: {(region, block): (lat, lng)}
+
+        Returns:
+            更新的房源数量
+        """
+        if not coordinates:
+            return 0
+
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+
+            sql = """
+                UPDATE house_info SET latitude = %s, longitude = %s
+                WHERE region = %s AND block = %s
+                AND (latitude IS NULL OR longitude IS NULL)
+            """
+            params = [(lat, lng, region, block) for (region, block), (lat, lng) in coordinates.items()]
+            cursor.executemany(sql, params)
+            updated = cursor.rowcount
+            conn.commit()
+
+            cursor.close()
+            conn.close()
+            return updated
+
+        except Exception as e:
+            logging.error(f"小区坐标批量更新失败: {len(coordinates)} 个小区, error: {e}")
+            return 0
+
     def get_remaining_count(self):
         """获取剩余待处理数量"""
         try:
@@ -246,7 +542,7 @@ class AmapGeocoder:
 
         logging.info("=" * 60)
         logging.info(f"开始高德地图地理编码处理 - {date.today()}")
-        logging.info(f"优化特性: 高配额(100万/天), 智能重试, 稳定处理")
+        logging.info(f"优化特性: 高配额(100万/天), 批量请求({self.batch_size}条/次), 智能重试, 稳定处理")
         logging.info(f"今日配额: {self.daily_quota:,} 次")
         logging.info(f"已使用: {self.today_processed:,} 次")
         logging.info(f"剩余配额: {self.daily_quota - self.today_processed:,} 次")
@@ -267,8 +563,8 @@ class AmapGeocoder:
         consecutive_quota_errors = 0
 
         try:
-            while (self.today_processed < self.daily_quota and
-                   processed_today < self.daily_quota - self.today_processed):
+            # 配额按API调用次数计算，批量模式下一次调用可处理多条地址
+            while self.today_processed < self.daily_quota:
 
                 # 获取本批数据
                 batch_addresses = self.get_addresses_batch(offset, batch_size)
@@ -279,19 +575,38 @@ class AmapGeocoder:
 
                 logging.info(f"处理批次: offset={offset}, 获取到 {len(batch_addresses)} 条记录")
 
-                # 处理本批数据
-                for i, (house_id, address, region) in enumerate(batch_addresses):
+                # 处理本批数据：清理地址后按批量接口打包请求
+                items = [(house_id, self.clean_address(address, region))
+                         for house_id, address, region in batch_addresses]
+                address_map = dict(items)
+                batch_failed = 0
+
+                # 每组100条，便于及时落库和保存进度
+                group_size = self.batch_size * 10
+                for start in range(0, len(items), group_size):
                     if self.today_processed >= self.daily_quota:
                         logging.warning("达到今日配额限制")
                         break
 
-                    # 清理地址
-                    clean_addr = self.clean_address(address, region)
+                    group = items[start:start + group_size]
+                    coordinates, quota_exceeded = self.geocode_batch_with_retry(group)
 
-                    # 地理编码（带重试）
-                    lat, lng = self.geocode_address_with_retry(clean_addr)
+                    # 更新数据库
+                    if self.update_coordinates_batch(coordinates):
+                        for house_id, (lat, lng) in coordinates.items():
+                            logging.info(f"✅ ID:{house_id} {address_map[house_id]} -> ({lat:.6f}, {lng:.6f})")
+                        written = len(coordinates)
+                    else:
+                        # 写入失败的记录仍满足查询条件，按失败计入偏移，本次运行不再重复请求
+                        logging.error(f"❌ 数据库批量更新失败: {len(coordinates)} 条")
+                        self.success_count -= len(coordinates)
+                        self.fail_count += len(coordinates)
+                        written = 0
 
-                    if lat == "QUOTA_EXCEEDED":
+                    processed_today += len(group)
+                    batch_failed += len(group) - written
+
+                    if quota_exceeded:
                         logging.error("遇到配额超限，停止处理")
                         consecutive_quota_errors += 1
                         if consecutive_quota_errors >= 3:
@@ -300,42 +615,27 @@ class AmapGeocoder:
 
                     consecutive_quota_errors = 0
 
-                    if lat and lng:
-                        # 更新数据库
-                        if self.update_coordinates(house_id, lat, lng):
-                            logging.info(f"✅ ID:{house_id} {clean_addr} -> ({lat:.6f}, {lng:.6f})")
-                        else:
-                            logging.error(f"❌ 数据库更新失败: ID={house_id}")
-                    else:
-                        logging.warning(f"⚠️  地理编码失败: ID={house_id} {clean_addr}")
-
-                    processed_today += 1
-
-                    # 控制请求频率
-                    time.sleep(self.delay)
-
-                    # 每处理100条保存一次进度
-                    if processed_today % 100 == 0:
-                        self.save_progress()
-                        remaining = self.daily_quota - self.today_processed
-                        success_rate = (self.success_count/max(1,self.today_processed))*100
-                        logging.info(f"进度: 今日已处理 {self.today_processed:,}/{self.daily_quota:,}, "
-                                   f"成功 {self.success_count}, 失败 {self.fail_count}, "
-                                   f"重试 {self.retry_count}, 成功率 {success_rate:.1f}%, "
-                                   f"剩余配额 {remaining:,}")
+                    self.save_progress()
+                    remaining = self.daily_quota - self.today_processed
+                    success_rate = (self.success_count/max(1,self.success_count + self.fail_count))*100
+                    logging.info(f"进度: 今日已处理 {processed_today:,} 条, API调用 {self.api_calls:,} 次, "
+                               f"成功 {self.success_count}, 失败 {self.fail_count}, "
+                               f"重试 {self.retry_count}, 成功率 {success_rate:.1f}%, "
+                               f"剩余配额 {remaining:,}")
 
                 if consecutive_quota_errors >= 3:
                     logging.error("连续遇到配额错误，停止处理")
                     break
 
-                offset += batch_size
+                # 成功写入坐标的记录不再满足查询条件，只需跳过本批编码或写入失败的记录
+                offset += batch_failed
 
             # 最终保存进度
             self.save_progress()
 
             # 输出今日统计
             elapsed = datetime.now() - self.start_time
-            success_rate = (self.success_count/max(1,self.today_processed))*100
+            success_rate = (self.success_count/max(1,self.success_count + self.fail_count))*100
 
             logging.info("=" * 60)
             logging.info(f"高德地图处理完成！")
@@ -344,6 +644,7 @@ class AmapGeocoder:
             logging.info(f"成功处理: {self.success_count:,} 条")
             logging.info(f"失败记录: {self.fail_count:,} 条")
             logging.info(f"重试次数: {self.retry_count:,} 次")
+            logging.info(f"本次API调用: {self.api_calls:,} 次 (批量模式每次最多 {self.batch_size} 条地址)")
             logging.info(f"成功率: {success_rate:.2f}%")
 
             # 检查是否还有未处理记录
@@ -364,13 +665,82 @@ class AmapGeocoder:
             logging.error(f"处理过程发生异常: {e}")
             self.save_progress()
 
+    def process_block_geocoding(self):
+        """按小区分层地理编码
+
+        同一小区的房源只在门牌细节上不同，先对不重复的 (region, block) 编码，
+        再把坐标批量写入该小区下的所有房源。只接受精确到街道或建筑的结果
+        （BLOCK_PRECISE_LEVELS），其余小区记入 geocode_failed_blocks，以后不再请求；
+        这些小区的房源以及没有小区信息的房源，最后回退到逐条地址编码。
+        """
+        self.load_progress()
+
+        if self.today_processed >= self.daily_quota:
+            logging.info("今日配额已用完，请明天继续")
+            return
+
+        blocks = self.get_pending_blocks()
+        total_houses = sum(count for _, count in blocks)
+        logging.info("=" * 60)
+        logging.info(f"小区级地理编码: {len(blocks):,} 个小区, 覆盖 {total_houses:,} 条房源")
+        logging.info("=" * 60)
+
+        resolved_blocks = 0
+        failed_blocks = 0
+        propagated = 0
+        group_size = self.batch_size * 10
+
+        try:
+            for start in range(0, len(blocks), group_size):
+                if self.today_processed >= self.daily_quota:
+                    logging.warning("达到今日配额限制")
+                    break
+
+                group = [(key, self.clean_address(key[1], key[0])) for key, _ in blocks[start:start + group_size]]
+                unresolved = []
+                coordinates, quota_exceeded = self.geocode_batch_with_retry(
+                    group, levels=BLOCK_PRECISE_LEVELS, unresolved=unresolved)
+
+                resolved_blocks += len(coordinates)
+                failed_blocks += len(unresolved)
+                propagated += self.update_block_coordinates(coordinates)
+                self.record_failed_blocks(unresolved)
+                self.save_progress()
+
+                logging.info(f"小区进度: {min(start + group_size, len(blocks)):,}/{len(blocks):,}, "
+                           f"已解析 {resolved_blocks:,} 个小区, 无法解析 {failed_blocks:,} 个, "
+                           f"写入 {propagated:,} 条房源, API调用 {self.api_calls:,} 次")
+
+                if quota_exceeded:
+                    logging.error("遇到配额超限，停止处理")
+                    return
+
+        except KeyboardInterrupt:
+            logging.info("用户中断处理...")
+            self.save_progress()
+            return
+
+        logging.info(f"小区级编码完成: 解析 {resolved_blocks:,}/{len(blocks):,} 个小区, "
+                     f"写入 {propagated:,} 条房源, API调用 {self.api_calls:,} 次")
+
+        # 剩余房源回退到逐条地址编码
+        logging.info("开始处理无法按小区解析的房源...")
+        self.process_geocoding()
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='高德地图API地理编码工具')
+    parser.add_argument('--mode', choices=['address', 'block'], default='address',
+                        help='address: 逐条地址编码; block: 先按小区编码并批量写入，再回退到逐条地址编码')
+    args = parser.parse_args()
+
     print("高德地图API地理编码工具")
     print("=" * 50)
 
-    # API密钥配置
-    AMAP_API_KEY = "8ee0ac34b1d87ea07958b4ad595742a2"  # 高德地图API密钥
+    # API密钥配置，可通过环境变量覆盖
+    AMAP_API_KEY = os.environ.get('AMAP_API_KEY', "8ee0ac34b1d87ea07958b4ad595742a2")  # 高德地图API密钥
+    # 接口地址，压测时可指向本地桩服务（amap_stub_server.py）
+    AMAP_BASE_URL = os.environ.get('AMAP_BASE_URL')
 
     if AMAP_API_KEY == "YOUR_AMAP_API_KEY":
         print("❌ 请先设置高德地图API密钥！")
@@ -378,17 +748,22 @@ def main():
         return
 
     # 创建处理器
-    geocoder = AmapGeocoder(AMAP_API_KEY)
+    geocoder = AmapGeocoder(AMAP_API_KEY, base_url=AMAP_BASE_URL)
 
     print(f"📅 今日: {date.today()}")
+    print(f"🌐 接口地址: {geocoder.base_url}")
     print(f"📊 日配额: {geocoder.daily_quota:,} 次 (高德地图)")
     print(f"⏱️  处理速度: {geocoder.requests_per_second} 次/秒")
     print(f"🔄 最大重试: {geocoder.max_retries} 次")
+    print(f"🏘️  编码模式: {'小区级分层编码' if args.mode == 'block' else '逐条地址编码'}")
     print(f"⏳ 预计时间: {geocoder.daily_quota/geocoder.requests_per_second/3600:.1f} 小时 (满配额)")
     print()
 
     print("🚀 自动开始地理编码处理...")
-    geocoder.process_geocoding()
+    if args.mode == 'block':
+        geocoder.process_block_geocoding()
+    else:
+        geocoder.process_geocoding()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高德地理编码本地桩服务
+模拟 /v3/geocode/geo 接口（含批量模式），用于在不消耗真实配额的情况下测试和压测地理编码脚本
+支持注入响应延迟、QPS超限、日配额超限、HTTP错误和地址解析失败
+
+用法:
+    python amap_stub_server.py --port 8765 --latency 0.05 --qps-limit 50 --failure-rate 0.02
+    然后设置 AMAP_BASE_URL=http://127.0.0.1:8765/v3/geocode/geo 运行 amap_geocoding.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 与 amap_geocoding.AMAP_BATCH_LIMIT 保持一致（不直接导入，避免加载数据库驱动和日志配置）
+AMAP_BATCH_LIMIT = 10
+
+# 北京市范围，桩服务生成的坐标都落在这里
+BEIJING_LAT_RANGE = (39.75, 40.10)
+BEIJING_LNG_RANGE = (116.15, 116.65)
+
+# 地址中包含该标记时返回解析失败，用于测试部分失败
+UNRESOLVABLE_MARKER = '无法解析'
+
+# 地址中包含该标记时只解析到区县级（返回区县中心点），用于测试精度过滤
+COARSE_MARKER = '模糊'
+
+
+def stub_location(address):
+    """根据地址哈希生成稳定的坐标，同一地址每次返回相同结果"""
+    digest = hashlib.md5(address.encode('utf-8')).digest()
+    lat_ratio = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+    lng_ratio = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF
+    lat = BEIJING_LAT_RANGE[0] + (BEIJING_LAT_RANGE[1] - BEIJING_LAT_RANGE[0]) * lat_ratio
+    lng = BEIJING_LNG_RANGE[0] + (BEIJING_LNG_RANGE[1] - BEIJING_LNG_RANGE[0]) * lng_ratio
+    return f"{lng:.6f},{lat:.6f}"
+
+
+class AmapStubHandler(BaseHTTPRequestHandler):
+    """处理地理编码请求"""
+
+    def log_message(self, format, *args):
+        # 压测时不输出每条访问日志
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v3/geocode/geo':
+            self.send_json({'status': '0', 'info': 'INVALID_REQUEST', 'infocode': '20000'}, status=404)
+            return
+
+        params = parse_qs(url.query)
+        address = params.get('address', [''])[0]
+        batch = params.get('batch', ['false'])[0].lower() == 'true'
+
+        status, data = self.server.handle_geocode(address, batch)
+        self.send_json(data, status=status)
+
+
+class AmapStubServer(ThreadingHTTPServer):
+    """高德地理编码桩服务
+
+    Args:
+        server_address: (host, port)，port 为 0 时自动分配
+        latency: 每次请求的响应延迟（秒）
+        qps_limit: 每秒允许的请求数，超出返回 QPS 超限错误，None 表示不限制
+        daily_quota: 可用的请求总数，用完后返回日配额超限错误，None 表示不限制
+        failure_rate: 单条地址随机解析失败的概率
+        error_rate: 整个请求随机返回 HTTP 500 的概率
+        seed: 随机数种子，便于复现压测结果
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, latency=0.0, qps_limit=None, daily_quota=None,
+                 failure_rate=0.0, error_rate=0.0, seed=None):
+        super().__init__(server_address, AmapStubHandler)
+        self.latency = latency
+        self.qps_limit = qps_limit
+        self.daily_quota = daily_quota
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.recent_requests = deque()
+        self.request_count = 0
+        self.qps_rejected = 0
+        self.quota_rejected = 0
+        self.error_count = 0
+
+    def handle_geocode(self, address, batch):
+        """按配置注入延迟和错误，返回 (HTTP状态码, 响应数据)"""
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.request_count += 1
+            now = time.monotonic()
+
+            if self.daily_quota is not None and self.request_count > self.daily_quota:
+                self.quota_rejected += 1
+                return 200, {'status': '0', 'info': 'DAILY_QUERY_OVER_LIMIT', 'infocode': '10003'}
+
+            if self.qps_limit:
+                while self.recent_requests and now - self.recent_requests[0] >= 1.0:
+                    self.recent_requests.popleft()
+                if len(self.recent_requests) >= self.qps_limit:
+                    self.qps_rejected += 1
+                    return 200, {'status': '0', 'info': 'CUQPS_HAS_EXCEEDED_THE_LIMIT', 'infocode': '10020'}
+                self.recent_requests.append(now)
+
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.error_count += 1
+                return 500, {'status': '0', 'info': 'ENGINE_RESPONSE_DATA_ERROR', 'infocode': '30001'}
+
+        return 200, self.geocode(address, batch)
+
+    def geocode(self, address, batch):
+        """生成与高德接口格式一致的响应"""
+        addresses = address.split('|') if batch else [address]
+        if not address or len(addresses) > AMAP_BATCH_LIMIT:
+            return {'status': '0', 'info': 'INVALID_PARAMS', 'infocode': '20000'}
+
+        geocodes = []
+        for addr in addresses:
+            if UNRESOLVABLE_MARKER in addr or (self.failure_rate and self.random.random() < self.failure_rate):
+                # 与高德批量模式一致：解析失败的地址返回空的 location
+                geocodes.append({'formatted_address': [], 'location': [], 'level': []})
+            elif COARSE_MARKER in addr:
+                geocodes.append({'formatted_address': '北京市朝阳区', 'location': stub_location('北京市朝阳区'),
+                                 'level': '区县'})
+            else:
+                geocodes.append({'formatted_address': addr, 'location': stub_location(addr), 'level': '兴趣点'})
+
+        resolved = [g for g in geocodes if g['location']]
+        if not batch and not resolved:
+            geocodes = []
+
+        return {
+            'status': '1',
+            'info': 'OK',
+            'infocode': '10000',
+            'count': str(len(resolved)),
+            'geocodes': geocodes
+        }
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3/geocode/geo"
+
+    def get_stats(self):
+        """获取桩服务统计信息"""
+        return {
+            'requests': self.request_count,
+            'qps_rejected': self.qps_rejected,
+            'quota_rejected': self.quota_rejected,
+            'http_errors': self.error_count
+        }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='高德地理编码本地桩服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='响应延迟（秒）')
+    parser.add_argument('--qps-limit', type=int, default=None, help='每秒请求上限')
+    parser.add_argument('--daily-quota', type=int, default=None, help='请求总配额')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='单条地址解析失败概率')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 错误概率')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子')
+    args = parser.parse_args()
+
+    server = AmapStubServer((args.host, args.port),
+                            latency=args.latency,
+                            qps_limit=args.qps_limit,
+                            daily_quota=args.daily_quota,
+                            failure_rate=args.failure_rate,
+                            error_rate=args.error_rate,
+                            seed=args.seed)
+    print(f"高德地理编码桩服务已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"桩服务已停止: {server.get_stats()}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
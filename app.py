@@ -1,24 +1,102 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g, has_request_context, abort
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.sql.util import find_tables
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from location_utils import calculate_distance, get_nearby_bounds, format_distance, CITY_COORDINATES
+from house_snapshot import get_snapshot, region_chart_stats
+from database import db_manager, PRICE_BUCKET_WIDTH, AREA_BUCKET_WIDTH
+from db_engine import configure_flask_app, read_snapshot_path, ReplicaRouter, READ_SNAPSHOT_BIND
+from house_trend import trend_series
+from house_price_sketch import load_sketches, RELATIVE_ACCURACY
+from saved_search import MAX_SEARCHES_PER_USER
+from house_sqlite import fts_phrase, snapshot_available, snapshot_tables
+from favorite_cache import FavoriteCache
+from house_trending import TrendingBoard
+from browse_retention import retention_cutoff
+import hashlib
 import os
+import threading
+import time
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
-# MySQL配置
-MYSQL_HOST = '127.0.0.1'
-MYSQL_PORT = 3306
-MYSQL_USER = 'root'
-MYSQL_PASSWORD = ''  # 无密码
-MYSQL_DATABASE = 'house'
-
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}'
+# MySQL配置（config.json 的 database 段，可用 HOUSE_DB_* 环境变量覆盖）
+REPLICA_BINDS = configure_flask_app(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
+# 管理员用户名（HOUSE_ADMIN_USERS 环境变量，逗号分隔），只有管理员可以访问连接池等运行状态监控接口
+app.config['ADMIN_USERNAMES'] = {name.strip() for name in os.environ.get('HOUSE_ADMIN_USERS', '').split(',')
+                                 if name.strip()}
+
+# 读写分离：只读查询路由到健康的副本，写入和最近写过数据的用户走主库
+replica_router = ReplicaRouter(lambda: [db.engines[key] for key in REPLICA_BINDS])
+
+# 本地只读快照（house_sqlite.py 导出）：房源相关的只读查询直接查本地文件
+READ_SNAPSHOT = read_snapshot_path()
+
+def serving_snapshot():
+    """房源读请求当前是否由本地 SQLite 快照提供（已配置且文件已分发到本机）"""
+    return READ_SNAPSHOT is not None and snapshot_available(READ_SNAPSHOT)
+
+def snapshot_query(clause):
+    """只读且只涉及快照中实际导出的表的查询（MySQL 中缺失而未导出的汇总表仍查 MySQL）"""
+    if clause is None or getattr(clause, 'is_dml', False):
+        return False
+    tables = {table.name for table in find_tables(clause)}
+    return bool(tables) and tables.issubset(snapshot_tables(READ_SNAPSHOT))
+
+def recently_wrote():
+    """当前请求或当前用户最近 sticky_seconds 内是否写入过数据（读到自己的写入）"""
+    if not has_request_context():
+        return False
+    if g.get('db_wrote'):
+        return True
+    return time.time() - session.get('db_write_at', 0) < replica_router.sticky_seconds
+
+class RoutingSession(FlaskSession):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # 快照本身就落后于主库，房源数据的读请求不受读到自己写入的限制
+        if bind is None and not self._flushing and serving_snapshot() and snapshot_query(clause):
+            return db.engines[READ_SNAPSHOT_BIND]
+        if (bind is None and REPLICA_BINDS and not self._flushing
+                and not getattr(clause, 'is_dml', False)
+                and not (self.new or self.dirty or self.deleted)
+                and not recently_wrote()):
+            replica = replica_router.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def mysql_read_bind():
+    """绕过快照读取 MySQL 时使用的引擎：健康的副本，用户刚写入过数据或没有副本时为主库"""
+    if REPLICA_BINDS and not recently_wrote():
+        replica = replica_router.choose()
+        if replica is not None:
+            return replica
+    return db.engine
+
+def record_write():
+    """记录写入，之后的读请求在 sticky_seconds 内走主库"""
+    if has_request_context():
+        g.db_wrote = True
+        session['db_write_at'] = time.time()
+
+# 浏览记录和 User-Agent 字典随每次详情页访问写入，用户不会读回，只写这些表不把用户固定到主库
+NON_STICKY_TABLES = frozenset({'browse_history', 'user_agents'})
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_write(db_session, flush_context):
+    """flush 了用户需要读回的数据（收藏、订阅、账户等）时记录写入"""
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if getattr(obj, '__tablename__', None) not in NON_STICKY_TABLES:
+            record_write()
+            return
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 # 添加时间戳转换过滤器
 @app.template_filter('timestamp_to_date')
@@ -66,6 +144,14 @@ def timestamp_to_full_date(timestamp):
 # 根据现有数据库结构定义模型
 class HouseInfo(db.Model):
     __tablename__ = 'house_info'
+    # 索引与 migrations/ 中的迁移一致
+    __table_args__ = (
+        db.Index('idx_location', 'latitude', 'longitude'),
+        db.Index('idx_house_region_rent_type', 'region', 'rent_type'),
+        db.Index('idx_house_rooms_rent_type', 'rooms', 'rent_type'),
+        db.Index('idx_house_rent_type', 'rent_type'),
+        db.UniqueConstraint('house_num', name='uk_house_info_house_num'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100))
@@ -139,21 +225,433 @@ class User(db.Model):
 
 class Favorite(db.Model):
     __tablename__ = 'favorites'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'house_id', name='uk_favorites_user_house'),
+        db.Index('idx_favorites_user_created', 'user_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)  # 现在使用真实用户ID
     house_id = db.Column(db.Integer, nullable=False)  # 移除外键约束，简化实现
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 用户计数（由 migrations/ 中安装的触发器维护，触发器插入时依赖列的默认值）
+class UserCounter(db.Model):
+    __tablename__ = 'user_counters'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    favorite_count = db.Column(db.Integer, nullable=False, server_default='0')
+    browse_count = db.Column(db.Integer, nullable=False, server_default='0')
 
+# 用户每天的浏览次数，用于统计最近N天的浏览量
+class UserDailyView(db.Model):
+    __tablename__ = 'user_daily_views'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    view_count = db.Column(db.Integer, nullable=False, server_default='0')
+
+# 浏览记录按月分区（分区列必须在主键中），browse_retention.py 维护分区并清理过期数据
 class BrowseHistory(db.Model):
     __tablename__ = 'browse_history'
+    __table_args__ = (
+        db.Index('idx_history_user_house_time', 'user_id', 'house_id', 'visit_time'),
+        db.Index('idx_history_ip_house_time', 'ip_address', 'house_id', 'visit_time'),
+        db.Index('idx_history_user_time', 'user_id', 'visit_time'),
+        {'mysql_partition_by': 'RANGE COLUMNS (visit_time) (PARTITION pmax VALUES LESS THAN (MAXVALUE))'}
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, nullable=True)  # 可为空，支持匿名浏览
     house_id = db.Column(db.Integer, nullable=False)  # 关联到房源ID
     ip_address = db.Column(db.String(50))  # 存储IP地址，用于匿名用户
-    visit_time = db.Column(db.DateTime, default=datetime.utcnow)
-    user_agent = db.Column(db.Text)  # 存储浏览器信息
+    visit_time = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+    user_agent_id = db.Column(db.Integer, nullable=True)  # 浏览器信息，关联 user_agents
+
+# 去重后的浏览器信息（User-Agent 种类很少，不再每条浏览记录保存一份全文）
+class UserAgent(db.Model):
+    __tablename__ = 'user_agents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    ua_hash = db.Column(db.String(40), nullable=False, unique=True)  # SHA1(user_agent)
+    user_agent = db.Column(db.Text, nullable=False)
+
+# 过期浏览记录按房源、按天汇总后的浏览量（browse_retention.py 写入）
+class HouseDailyView(db.Model):
+    __tablename__ = 'house_daily_views'
+
+    house_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    view_count = db.Column(db.Integer, nullable=False, server_default='0')
+    visitor_count = db.Column(db.Integer, nullable=False, server_default='0')
+
+# 租金分位数草图（由迁移 0010_house_price_sketch.sql 安装的触发器维护，house_price_sketch.py 全量重建），每个 区域 × 户型 按对数分桶计数
+class HousePriceSketch(db.Model):
+    __tablename__ = 'house_price_sketch'
+
+    region = db.Column(db.String(100), primary_key=True)
+    rooms = db.Column(db.String(100), primary_key=True)
+    bin = db.Column(db.SmallInteger, primary_key=True)
+    listing_count = db.Column(db.Integer, nullable=False, default=0)
+
+# 保存的搜索（订阅），新房源由 saved_search.py 匹配；未填写的条件为 NULL
+class SavedSearch(db.Model):
+    __tablename__ = 'saved_searches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    region = db.Column(db.String(100))
+    rent_type = db.Column(db.String(100))
+    rooms = db.Column(db.String(100))
+    min_price = db.Column(db.Integer)
+    max_price = db.Column(db.Integer)
+    keyword = db.Column(db.String(100))
+    latitude = db.Column(db.Numeric(10, 7))
+    longitude = db.Column(db.Numeric(10, 7))
+    radius_km = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'region': self.region,
+            'rent_type': self.rent_type,
+            'rooms': self.rooms,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'keyword': self.keyword,
+            'latitude': float(self.latitude) if self.latitude is not None else None,
+            'longitude': float(self.longitude) if self.longitude is not None else None,
+            'radius_km': self.radius_km,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+# 订阅命中的房源，同一订阅同一房源只记录一次
+class SavedSearchMatch(db.Model):
+    __tablename__ = 'saved_search_matches'
+    __table_args__ = (
+        db.UniqueConstraint('search_id', 'house_id', name='uk_saved_search_matches'),
+        db.Index('idx_saved_search_matches_user', 'user_id', 'id'),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    search_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    house_id = db.Column(db.Integer, nullable=False)
+    matched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# 批处理任务的水位线（如 saved_search.py 已匹配到的房源ID）
+class JobWatermark(db.Model):
+    __tablename__ = 'job_watermarks'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+# "看过此房源的用户还看了"推荐表（由 house_covisit.py 定期重建），neighbor_ids 按相似度降序、逗号分隔
+class HouseCovisit(db.Model):
+    __tablename__ = 'house_covisit'
+
+    house_id = db.Column(db.Integer, primary_key=True)
+    neighbor_ids = db.Column(db.String(255), nullable=False)
+
+# 统计汇总表（由迁移 0008_house_rollup.sql 安装的触发器维护，house_rollup.py 全量重建，空值维度记为空字符串）
+class HouseRollup(db.Model):
+    __tablename__ = 'house_rollup'
+
+    region = db.Column(db.String(100), primary_key=True)
+    rooms = db.Column(db.String(100), primary_key=True)
+    rent_type = db.Column(db.String(100), primary_key=True)
+    direction = db.Column(db.String(100), primary_key=True)
+    listing_count = db.Column(db.Integer, default=0)
+    valid_count = db.Column(db.Integer, default=0)  # 租金、面积有效的房源数
+    price_sum = db.Column(db.Float, default=0)
+    price_sq_sum = db.Column(db.Float, default=0)
+    area_sum = db.Column(db.Float, default=0)
+    area_sq_sum = db.Column(db.Float, default=0)
+    unit_price_sum = db.Column(db.Float, default=0)
+    unit_price_sq_sum = db.Column(db.Float, default=0)
+
+class HousePriceHistogram(db.Model):
+    __tablename__ = 'house_price_histogram'
+
+    region = db.Column(db.String(100), primary_key=True)
+    rooms = db.Column(db.String(100), primary_key=True)
+    rent_type = db.Column(db.String(100), primary_key=True)
+    direction = db.Column(db.String(100), primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True)  # 租金 // PRICE_BUCKET_WIDTH
+    listing_count = db.Column(db.Integer, default=0)
+
+class HouseAreaHistogram(db.Model):
+    __tablename__ = 'house_area_histogram'
+
+    region = db.Column(db.String(100), primary_key=True)
+    rooms = db.Column(db.String(100), primary_key=True)
+    rent_type = db.Column(db.String(100), primary_key=True)
+    direction = db.Column(db.String(100), primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True)  # 面积 // AREA_BUCKET_WIDTH
+    listing_count = db.Column(db.Integer, default=0)
+    unit_price_sum = db.Column(db.Float, default=0)
+
+def listing_values(house):
+    """返回房源的有效 (租金, 面积)，口径与 database.VALID_LISTING_CONDITION 一致，无效时返回 None"""
+    if not (house.price and house.area and house.price.isdigit() and house.area.isdigit()):
+        return None
+    price, area = int(house.price), int(house.area)
+    if 0 < price < 100000 and 0 < area < 1000:
+        return price, area
+    return None
+
+def house_price_value():
+    """租金的数值表达式：快照中使用预先转换的 price_num 列（有索引），MySQL 中按字符串转换"""
+    if serving_snapshot():
+        return db.literal_column('house_info.price_num', db.Integer)
+    return db.cast(HouseInfo.price, db.Integer)
+
+def keyword_filter(keyword, columns=('title', 'address', 'block')):
+    """关键词搜索条件：快照中使用 FTS5 全文索引，否则（或关键词不足3个字符时）使用 LIKE"""
+    phrase = fts_phrase(keyword, columns) if serving_snapshot() else None
+    if phrase:
+        return HouseInfo.id.in_(
+            db.text("SELECT rowid FROM house_fts WHERE house_fts MATCH :phrase").bindparams(phrase=phrase)
+        )
+    return db.or_(*[getattr(HouseInfo, column).like(f'%{keyword}%') for column in columns])
+
+def get_house_or_404(house_id):
+    """按ID读取房源；快照导出之后新增的房源不在快照中，回退到 MySQL 查询，仍不存在时返回404"""
+    house = db.session.get(HouseInfo, house_id)
+    if house is None and serving_snapshot():
+        house = db.session.get(HouseInfo, house_id, bind_arguments={'bind': mysql_read_bind()})
+    if house is None:
+        abort(404)
+    return house
+
+def increment_page_views(house_id):
+    """在主库上原子递增浏览次数，不依赖读到的旧值（房源可能读自副本或快照）；
+    计数不需要读到自己的写入，不记录写入"""
+    HouseInfo.query.filter_by(id=house_id).update(
+        {HouseInfo.page_views: db.func.coalesce(HouseInfo.page_views, 0) + 1},
+        synchronize_session=False
+    )
+
+# 进程内缓存的 User-Agent 种类上限，超过后新出现的不再缓存
+USER_AGENT_CACHE_SIZE = 10000
+_user_agent_ids = {}  # SHA1 -> user_agents.id
+
+def user_agent_id(user_agent):
+    """返回 User-Agent 在 user_agents 中的ID，不存在时插入；同一进程内只查询一次"""
+    if not user_agent:
+        return None
+    ua_hash = hashlib.sha1(user_agent.encode('utf-8')).hexdigest()
+    if ua_hash in _user_agent_ids:
+        return _user_agent_ids[ua_hash]
+
+    select = db.select(UserAgent.id).where(UserAgent.ua_hash == ua_hash)
+    ua_id = db.session.execute(select).scalar()
+    if ua_id is None:
+        # 并发插入同一 User-Agent 时唯一约束使后到的插入被忽略，随后直接在主库上读取ID；
+        # 不记录写入，访客后续的读请求仍可走副本
+        insert = db.insert(UserAgent).values(
+            ua_hash=ua_hash, user_agent=user_agent
+        ).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+        db.session.execute(insert)
+        ua_id = db.session.execute(select, bind_arguments={'bind': db.engine}).scalar()
+
+    if len(_user_agent_ids) < USER_AGENT_CACHE_SIZE:
+        _user_agent_ids[ua_hash] = ua_id
+    return ua_id
+
+# 批量查询收藏状态时单次最多接受的房源数
+FAVORITE_STATUS_LIMIT = 200
+
+def load_favorite_ids(user_id):
+    """从数据库加载用户收藏的全部房源ID"""
+    return [row[0] for row in db.session.query(Favorite.house_id).filter(Favorite.user_id == user_id)]
+
+# 每个用户的收藏ID集合缓存在进程内，收藏状态检查不再查询数据库
+favorite_cache = FavoriteCache(load_favorite_ids)
+
+def user_favorite_ids(user_id):
+    """用户收藏的房源ID集合；会话中记录了最近修改收藏的时间，其他进程据此判断缓存是否过期"""
+    return favorite_cache.get(user_id, session.get('favorites_at', 0))
+
+def favorites_changed(user_id):
+    """收藏写入后使缓存失效"""
+    favorite_cache.invalidate(user_id)
+    session['favorites_at'] = time.time()
+    record_write()
+
+def favorite_house_ids(user_id, house_ids):
+    """返回 house_ids 中已被用户收藏的房源ID"""
+    if not user_id:
+        return set()
+    return user_favorite_ids(user_id) & set(house_ids)
+
+# 热门榜：浏览按6小时半衰期衰减，首页展示前6套，接口单次最多返回50套
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_INDEX_LIMIT = 6
+TRENDING_MAX_LIMIT = 50
+TRENDING_BATCH_SIZE = 5000
+
+def load_view_events(last_id, since):
+    """按ID追加读取浏览记录（带房源区域），供热门榜增量更新；visit_time 下界使查询只涉及最近的分区"""
+    return db.session.query(
+        BrowseHistory.id, BrowseHistory.house_id, BrowseHistory.visit_time, HouseInfo.region
+    ).join(
+        HouseInfo, HouseInfo.id == BrowseHistory.house_id
+    ).filter(
+        BrowseHistory.visit_time >= since,
+        BrowseHistory.id > last_id
+    ).order_by(BrowseHistory.id).limit(TRENDING_BATCH_SIZE).all()
+
+trending_board = TrendingBoard(load_view_events, half_life=TRENDING_HALF_LIFE,
+                               top_n=TRENDING_MAX_LIMIT, batch_size=TRENDING_BATCH_SIZE)
+
+def warm_up_trending():
+    """后台线程中读取最近几个半衰期的浏览记录；预热期间请求中的 sync() 直接返回，不等待"""
+    with app.app_context():
+        try:
+            trending_board.sync(force=True)
+        except Exception as e:
+            print(f"Trending warmup error: {e}")
+        finally:
+            db.session.remove()
+
+_trending_warmup_pid = None
+
+@app.before_request
+def start_trending_warmup():
+    """每个工作进程处理第一个请求前启动预热线程（预先 fork 的进程不继承父进程的线程）"""
+    global _trending_warmup_pid
+    if _trending_warmup_pid != os.getpid():
+        _trending_warmup_pid = os.getpid()
+        threading.Thread(target=warm_up_trending, daemon=True).start()
+
+def trending_houses(region=None, limit=TRENDING_INDEX_LIMIT):
+    """热门房源：[(房源, 衰减后的浏览次数)]，region 为空时为全市榜"""
+    trending_board.sync()
+    ranked = trending_board.top(region or None, limit)
+    if not ranked:
+        return []
+    houses = {house.id: house for house in
+              HouseInfo.query.filter(HouseInfo.id.in_([house_id for house_id, _ in ranked]))}
+    return [(houses[house_id], score) for house_id, score in ranked if house_id in houses]
+
+# 租金分位数草图在进程内缓存的时间（秒），草图表很小，过期后整体重新读取
+PRICE_SKETCH_TTL = 60
+PRICE_PERCENTILES = (10, 25, 50, 75, 90)
+_price_sketches = {'loaded_at': 0, 'sketches': {}}
+
+def price_sketches():
+    """全部租金草图：{(区域, 户型): PriceSketch}，户型为 None 表示该区域全部户型，(None, None) 为全市"""
+    if time.time() - _price_sketches['loaded_at'] >= PRICE_SKETCH_TTL:
+        try:
+            rows = db.session.query(HousePriceSketch.region, HousePriceSketch.rooms,
+                                    HousePriceSketch.bin, HousePriceSketch.listing_count).all()
+            _price_sketches['sketches'] = load_sketches(rows)
+        except Exception as e:
+            # 草图表尚未创建（migrate.py）时不提供分位数，过期后重试
+            print(f"Price sketch load error: {e}")
+            db.session.rollback()
+        _price_sketches['loaded_at'] = time.time()
+    return _price_sketches['sketches']
+
+def price_position(sketch, price, own=False):
+    """租金在草图中的位置：(更便宜的房源数, 房源总数)；own 为 True 时扣除该房源自身"""
+    below, same = sketch.count_below(price)
+    total = sketch.total
+    if own:
+        same = max(same - 1, 0)
+        total -= 1
+    # 同一分桶内的房源视为均匀分布在租金两侧
+    return min(below + same / 2, total), total
+
+def price_distribution(sketch):
+    """草图的分位数：{'p10': ..., 'p50': ...}，按元取整"""
+    values = sketch.quantiles(p / 100 for p in PRICE_PERCENTILES)
+    return {f'p{p}': round(value) for p, value in zip(PRICE_PERCENTILES, values) if value is not None}
+
+def price_summary(sketch, price, own=False):
+    """租金在草图中的位置和分位数；percentage 为租金不低于该价格的房源占比"""
+    summary = {'percentiles': price_distribution(sketch)}
+    if price and price > 0:
+        cheaper, total = price_position(sketch, price, own)
+        if total > 0:
+            summary.update({
+                'cheaper_count': int(round(cheaper)),
+                'total_count': total,
+                'percentage': round((total - cheaper) / total * 100, 1)
+            })
+    return summary
+
+# 详情页"看过此房源的用户还看了"展示的房源数
+ALSO_VIEWED_LIMIT = 6
+
+def also_viewed_houses(house_id, limit=ALSO_VIEWED_LIMIT):
+    """看过该房源的用户还看了哪些房源：按主键读取一行推荐表，再按ID取房源"""
+    neighbor_ids = db.session.query(HouseCovisit.neighbor_ids).filter(HouseCovisit.house_id == house_id).scalar()
+    if not neighbor_ids:
+        return []
+    ids = [int(i) for i in neighbor_ids.split(',')[:limit]]
+    houses = {house.id: house for house in HouseInfo.query.filter(HouseInfo.id.in_(ids))}
+    return [houses[i] for i in ids if i in houses]
+
+# 收藏列表每页条数和卡片展示需要的列
+FAVORITES_PAGE_SIZE = 20
+FAVORITE_CARD_COLUMNS = (
+    HouseInfo.id, HouseInfo.title, HouseInfo.rooms, HouseInfo.area, HouseInfo.price,
+    HouseInfo.direction, HouseInfo.rent_type, HouseInfo.region, HouseInfo.address, HouseInfo.page_views
+)
+
+def encode_favorite_cursor(row):
+    """分页游标：最后一条收藏的 (收藏时间, 收藏ID)"""
+    return f"{row.favorited_at:%Y%m%d%H%M%S%f}-{row.favorite_id}"
+
+def decode_favorite_cursor(cursor):
+    try:
+        created_at, favorite_id = cursor.split('-')
+        return datetime.strptime(created_at, '%Y%m%d%H%M%S%f'), int(favorite_id)
+    except ValueError:
+        return None
+
+def favorite_page(user_id, cursor=None, limit=FAVORITES_PAGE_SIZE):
+    """按收藏时间倒序的键集分页，只取卡片需要的列
+
+    Returns:
+        (房源卡片行列表, 下一页游标；没有下一页时为 None)
+    """
+    query = db.session.query(
+        Favorite.id.label('favorite_id'),
+        Favorite.created_at.label('favorited_at'),
+        *FAVORITE_CARD_COLUMNS
+    ).join(HouseInfo, HouseInfo.id == Favorite.house_id).filter(Favorite.user_id == user_id)
+
+    position = decode_favorite_cursor(cursor) if cursor else None
+    if position:
+        created_at, favorite_id = position
+        query = query.filter(db.or_(
+            Favorite.created_at < created_at,
+            db.and_(Favorite.created_at == created_at, Favorite.id < favorite_id)
+        ))
+
+    rows = query.order_by(Favorite.created_at.desc(), Favorite.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_favorite_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def favorite_count(user_id):
+    """用户的收藏总数，读计数表而不是 COUNT(*)"""
+    counter = db.session.get(UserCounter, user_id)
+    return counter.favorite_count if counter else 0
+
+def recent_view_count(user_id, days=30):
+    """最近 days 天（按 UTC 日期，含今天）的浏览次数，最多读取 days 个分桶"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return db.session.query(db.func.coalesce(db.func.sum(UserDailyView.view_count), 0)).filter(
+        UserDailyView.user_id == user_id,
+        UserDailyView.day >= since
+    ).scalar()
 
 @app.route('/')
 def index():
@@ -172,11 +670,7 @@ def index():
     query = HouseInfo.query
 
     if search:
-        query = query.filter(
-            HouseInfo.title.like(f'%{search}%') |
-            HouseInfo.address.like(f'%{search}%') |
-            HouseInfo.block.like(f'%{search}%')
-        )
+        query = query.filter(keyword_filter(search))
 
     if region:
         query = query.filter(HouseInfo.region.like(f'%{region}%'))
@@ -189,10 +683,10 @@ def index():
 
     # 价格筛选（需要处理字符串价格）
     if min_price:
-        query = query.filter(db.cast(HouseInfo.price, db.Integer) >= min_price)
+        query = query.filter(house_price_value() >= min_price)
 
     if max_price:
-        query = query.filter(db.cast(HouseInfo.price, db.Integer) <= max_price)
+        query = query.filter(house_price_value() <= max_price)
 
     # 分页查询
     houses = query.order_by(HouseInfo.id.desc()).paginate(
@@ -203,9 +697,23 @@ def index():
     regions = db.session.query(HouseInfo.region).distinct().limit(20).all()
     regions = [r[0] for r in regions if r[0]]
 
+    # 收藏状态随页面一起渲染，不再逐个房源请求
+    favorite_ids = favorite_house_ids(session.get('user_id'), [house.id for house in houses.items])
+
+    # 热门榜只在第一页展示，读取失败不影响房源列表
+    trending = []
+    if page == 1:
+        try:
+            trending = trending_houses(region)
+        except Exception as e:
+            print(f"Trending error: {e}")
+            db.session.rollback()
+
     return render_template('index.html',
                          houses=houses,
                          regions=regions,
+                         favorite_ids=favorite_ids,
+                         trending=trending,
                          search=search,
                          region=region,
                          rent_type=rent_type,
@@ -213,16 +721,15 @@ def index():
 
 @app.route('/house/<int:house_id>')
 def house_detail(house_id):
-    house = HouseInfo.query.get_or_404(house_id)
+    house = get_house_or_404(house_id)
 
-    # 增加浏览次数
-    if house.page_views:
-        house.page_views += 1
-    else:
-        house.page_views = 1
+    # 房源可能读自副本或快照，脱离会话只用于展示；浏览次数直接在主库上递增
+    db.session.expunge(house)
+    house.page_views = (house.page_views or 0) + 1
 
     # 记录浏览历史
     try:
+        increment_page_views(house_id)
         user_id = session.get('user_id')
         ip_address = request.remote_addr
         user_agent = request.headers.get('User-Agent', '')
@@ -250,7 +757,7 @@ def house_detail(house_id):
                 user_id=user_id,
                 house_id=house_id,
                 ip_address=ip_address,
-                user_agent=user_agent
+                user_agent_id=user_agent_id(user_agent)
             )
             db.session.add(browse_record)
 
@@ -259,6 +766,7 @@ def house_detail(house_id):
         print(f"Error recording browse history: {e}")
         # 即使浏览记录失败，也不影响页面正常显示
         db.session.rollback()
+        increment_page_views(house_id)
         db.session.commit()  # 只提交浏览次数更新
 
     # 推荐相似房源（智能推荐算法）
@@ -272,14 +780,14 @@ def house_detail(house_id):
         similar_houses_priority1 = HouseInfo.query.filter(
             HouseInfo.region == house.region,
             HouseInfo.rent_type == house.rent_type,
-            db.cast(HouseInfo.price, db.Integer).between(price_range_low, price_range_high),
+            house_price_value().between(price_range_low, price_range_high),
             HouseInfo.id != house.id
         ).limit(4).all()
 
         # 2. 相同区域 + 相似价格
         similar_houses_priority2 = HouseInfo.query.filter(
             HouseInfo.region == house.region,
-            db.cast(HouseInfo.price, db.Integer).between(price_range_low, price_range_high),
+            house_price_value().between(price_range_low, price_range_high),
             HouseInfo.id != house.id,
             ~HouseInfo.id.in_([h.id for h in similar_houses_priority1])
         ).limit(3).all()
@@ -315,7 +823,18 @@ def house_detail(house_id):
             HouseInfo.id != house.id
         ).limit(10).all()
 
-    return render_template('house_detail.html', house=house, similar_houses=similar_houses)
+    # 推荐表尚未构建时不展示
+    try:
+        also_viewed = also_viewed_houses(house_id)
+    except Exception as e:
+        print(f"Also viewed error: {e}")
+        db.session.rollback()
+        also_viewed = []
+
+    is_favorite = bool(favorite_house_ids(session.get('user_id'), [house_id]))
+
+    return render_template('house_detail.html', house=house, similar_houses=similar_houses,
+                           also_viewed=also_viewed, is_favorite=is_favorite)
 
 @app.route('/api/houses')
 def api_houses():
@@ -343,10 +862,7 @@ def api_search():
     query = HouseInfo.query
 
     if keyword:
-        query = query.filter(
-            HouseInfo.title.like(f'%{keyword}%') |
-            HouseInfo.address.like(f'%{keyword}%')
-        )
+        query = query.filter(keyword_filter(keyword, ('title', 'address')))
 
     if region:
         query = query.filter(HouseInfo.region == region)
@@ -370,16 +886,16 @@ def add_favorite():
 
     user_id = session['user_id']
 
-    # 检查是否已收藏
-    existing = Favorite.query.filter_by(user_id=user_id, house_id=house_id).first()
-    if existing:
-        return jsonify({'success': False, 'message': '该房源已在收藏列表中'})
-
-    # 添加收藏
-    favorite = Favorite(user_id=user_id, house_id=house_id)
-    db.session.add(favorite)
+    # 单条幂等写入：已收藏时唯一约束使插入被忽略，重复点击不会产生重复记录
+    insert = db.insert(Favorite).values(
+        user_id=user_id, house_id=house_id, created_at=datetime.utcnow()
+    ).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+    created = db.session.execute(insert).rowcount > 0
     db.session.commit()
+    favorites_changed(user_id)
 
+    if not created:
+        return jsonify({'success': True, 'message': '该房源已在收藏列表中'})
     return jsonify({'success': True, 'message': '收藏成功'})
 
 @app.route('/api/favorites', methods=['DELETE'])
@@ -397,28 +913,39 @@ def remove_favorite():
 
     user_id = session['user_id']
 
-    favorite = Favorite.query.filter_by(user_id=user_id, house_id=house_id).first()
-    if not favorite:
-        return jsonify({'success': False, 'message': '该房源不在收藏列表中'})
-
-    db.session.delete(favorite)
+    deleted = db.session.execute(
+        db.delete(Favorite).where(Favorite.user_id == user_id, Favorite.house_id == house_id)
+    ).rowcount > 0
     db.session.commit()
+    favorites_changed(user_id)
 
+    if not deleted:
+        return jsonify({'success': True, 'message': '该房源不在收藏列表中'})
     return jsonify({'success': True, 'message': '取消收藏成功'})
 
 @app.route('/api/favorites', methods=['GET'])
 def get_favorites():
-    """获取用户收藏列表"""
+    """获取用户收藏列表（按收藏时间倒序，cursor 为上一页返回的 next_cursor）"""
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': '请先登录'})
 
     user_id = session['user_id']
+    limit = min(max(request.args.get('limit', FAVORITES_PAGE_SIZE, type=int), 1), 50)
 
-    favorites = db.session.query(HouseInfo).join(
-        Favorite, HouseInfo.id == Favorite.house_id
-    ).filter(Favorite.user_id == user_id).all()
+    rows, next_cursor = favorite_page(user_id, request.args.get('cursor'), limit)
 
-    return jsonify([house.to_dict() for house in favorites])
+    houses = []
+    for row in rows:
+        house = {column.key: getattr(row, column.key) for column in FAVORITE_CARD_COLUMNS}
+        house['favorited_at'] = row.favorited_at.isoformat()
+        houses.append(house)
+
+    return jsonify({
+        'success': True,
+        'houses': houses,
+        'next_cursor': next_cursor,
+        'total': favorite_count(user_id)
+    })
 
 @app.route('/api/favorites/check/<int:house_id>')
 def check_favorite(house_id):
@@ -426,11 +953,174 @@ def check_favorite(house_id):
     if 'user_id' not in session:
         return jsonify({'is_favorite': False})
 
+    return jsonify({'is_favorite': house_id in user_favorite_ids(session['user_id'])})
+
+# 订阅动态每页条数
+SAVED_SEARCH_FEED_SIZE = 20
+
+def saved_search_feed(user_id, before=None, limit=SAVED_SEARCH_FEED_SIZE):
+    """订阅命中的房源，按匹配顺序倒序；before 为上一页最后一条的ID"""
+    query = db.session.query(SavedSearchMatch, SavedSearch.name, HouseInfo).join(
+        SavedSearch, SavedSearch.id == SavedSearchMatch.search_id
+    ).join(
+        HouseInfo, HouseInfo.id == SavedSearchMatch.house_id
+    ).filter(SavedSearchMatch.user_id == user_id)
+    if before:
+        query = query.filter(SavedSearchMatch.id < before)
+    rows = query.order_by(SavedSearchMatch.id.desc()).limit(limit + 1).all()
+    next_before = rows[limit - 1][0].id if len(rows) > limit else None
+    return rows[:limit], next_before
+
+def _optional_int(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+def _optional_float(value):
+    if value in (None, ''):
+        return None
+    return float(value)
+
+@app.route('/api/saved-searches', methods=['POST'])
+def create_saved_search():
+    """保存当前的筛选条件为订阅，之后新增的符合条件的房源会出现在订阅动态中"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': '请先登录'})
     user_id = session['user_id']
+    data = request.get_json() or {}
 
-    favorite = Favorite.query.filter_by(user_id=user_id, house_id=house_id).first()
+    try:
+        search = SavedSearch(
+            user_id=user_id,
+            region=(data.get('region') or '').strip() or None,
+            rent_type=(data.get('rent_type') or '').strip() or None,
+            rooms=(data.get('rooms') or '').strip() or None,
+            min_price=_optional_int(data.get('min_price')),
+            max_price=_optional_int(data.get('max_price')),
+            keyword=(data.get('keyword') or '').strip()[:100] or None,
+            latitude=_optional_float(data.get('latitude')),
+            longitude=_optional_float(data.get('longitude')),
+            radius_km=_optional_float(data.get('radius_km'))
+        )
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '价格或坐标格式不正确'})
+
+    if search.radius_km and (search.latitude is None or search.longitude is None):
+        return jsonify({'success': False, 'message': '按距离订阅需要提供中心点坐标'})
+    if not search.radius_km:
+        search.latitude = search.longitude = search.radius_km = None
+    conditions = [search.region, search.rent_type, search.rooms,
+                  f'{search.min_price or 0}-{search.max_price}元' if search.max_price else
+                  f'{search.min_price}元以上' if search.min_price else None,
+                  search.keyword and f'"{search.keyword}"',
+                  search.radius_km and f'{search.radius_km:g}公里内']
+    conditions = [c for c in conditions if c]
+    if not conditions:
+        return jsonify({'success': False, 'message': '请至少设置一个筛选条件'})
+
+    if SavedSearch.query.filter_by(user_id=user_id).count() >= MAX_SEARCHES_PER_USER:
+        return jsonify({'success': False, 'message': f'最多保存{MAX_SEARCHES_PER_USER}个订阅'})
+
+    search.name = ((data.get('name') or '').strip() or ' '.join(conditions))[:100]
+    db.session.add(search)
+    db.session.commit()
+    return jsonify({'success': True, 'message': '订阅成功，有新房源时会出现在订阅动态中',
+                    'search': search.to_dict()})
+
+@app.route('/api/saved-searches/<int:search_id>', methods=['DELETE'])
+def delete_saved_search(search_id):
+    """删除订阅及其匹配记录"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': '请先登录'})
+    user_id = session['user_id']
 
-    return jsonify({'is_favorite': favorite is not None})
+    deleted = SavedSearch.query.filter_by(id=search_id, user_id=user_id).delete(synchronize_session=False)
+    if deleted:
+        SavedSearchMatch.query.filter_by(search_id=search_id).delete(synchronize_session=False)
+        # 批量删除不经过 flush，需显式记录写入，刷新后的订阅列表才能读到删除结果
+        record_write()
+    db.session.commit()
+    return jsonify({'success': bool(deleted), 'message': '已取消订阅' if deleted else '订阅不存在'})
+
+@app.route('/saved-searches')
+def saved_searches_page():
+    """我的订阅：订阅列表和新房源动态"""
+    if 'user_id' not in session:
+        flash('请先登录才能查看订阅', 'warning')
+        return redirect(url_for('login'))
+
+    user_id = session['user_id']
+    before = request.args.get('before', type=int)
+    searches = SavedSearch.query.filter_by(user_id=user_id).order_by(SavedSearch.id.desc()).all()
+    feed, next_before = saved_search_feed(user_id, before)
+    favorite_ids = favorite_house_ids(user_id, [house.id for _, _, house in feed])
+
+    return render_template('saved_searches.html', searches=searches, feed=feed,
+                           before=before, next_before=next_before, favorite_ids=favorite_ids)
+
+@app.route('/api/favorites/status')
+def favorite_status():
+    """批量检查收藏状态：ids 为逗号分隔的房源ID，返回其中已收藏的ID"""
+    house_ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()]
+    if len(house_ids) > FAVORITE_STATUS_LIMIT:
+        return jsonify({'success': False, 'message': f'一次最多查询{FAVORITE_STATUS_LIMIT}个房源'}), 400
+
+    if 'user_id' not in session:
+        return jsonify({'success': True, 'favorite_ids': []})
+
+    favorite_ids = favorite_house_ids(session['user_id'], house_ids)
+    return jsonify({'success': True, 'favorite_ids': sorted(favorite_ids)})
+
+@app.route('/api/price-percentiles')
+def price_percentiles_api():
+    """租金分位数：region/rooms 为空时为全市/全部户型；给出 price 时同时返回该租金的排名"""
+    region = request.args.get('region', '')
+    rooms = request.args.get('rooms', '')
+    price = request.args.get('price', type=int)
+    if rooms and not region:
+        return jsonify({'success': False, 'message': '按户型查询时需要指定区域'}), 400
+
+    try:
+        sketch = price_sketches().get((region or None, rooms or None))
+        if sketch is None:
+            return jsonify({'success': True, 'region': region or None, 'rooms': rooms or None,
+                            'count': 0, 'percentiles': {}})
+        return jsonify({
+            'success': True,
+            'region': region or None,
+            'rooms': rooms or None,
+            'count': sketch.total,
+            'relative_error': RELATIVE_ACCURACY,
+            **price_summary(sketch, price)
+        })
+    except Exception as e:
+        print(f"Price percentiles error: {e}")
+        return jsonify({'success': False, 'message': '租金分位数获取失败'})
+
+@app.route('/api/trending')
+def trending_api():
+    """热门房源榜：region 为空时为全市榜，score 为按半衰期衰减后的浏览次数"""
+    region = request.args.get('region', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), TRENDING_MAX_LIMIT)
+    try:
+        houses = trending_houses(region, limit)
+        return jsonify({
+            'success': True,
+            'region': region or None,
+            'half_life_hours': TRENDING_HALF_LIFE / 3600,
+            'houses': [{
+                'id': house.id,
+                'title': house.title,
+                'price': house.price,
+                'rooms': house.rooms,
+                'area': house.area,
+                'region': house.region,
+                'score': score
+            } for house, score in houses]
+        })
+    except Exception as e:
+        print(f"Trending error: {e}")
+        return jsonify({'success': False, 'message': '热门房源获取失败'})
 
 @app.route('/favorites')
 def favorites_page():
@@ -440,12 +1130,16 @@ def favorites_page():
         return redirect(url_for('login'))
 
     user_id = session['user_id']
+    cursor = request.args.get('cursor')
 
-    favorites = db.session.query(HouseInfo).join(
-        Favorite, HouseInfo.id == Favorite.house_id
-    ).filter(Favorite.user_id == user_id).all()
+    favorites, next_cursor = favorite_page(user_id, cursor)
 
-    return render_template('favorites.html', houses=favorites)
+    # 收藏页中的房源都已收藏，无需再查询
+    return render_template('favorites.html', houses=favorites,
+                           favorite_ids={house.id for house in favorites},
+                           total=favorite_count(user_id),
+                           cursor=cursor,
+                           next_cursor=next_cursor)
 
 @app.route('/browse-history')
 def browse_history_page():
@@ -458,42 +1152,64 @@ def browse_history_page():
     page = request.args.get('page', 1, type=int)
     per_page = 20
 
-    # 获取用户的浏览记录，按访问时间倒序排列
+    # 获取用户的浏览记录，按访问时间倒序排列；只查保留期内的数据，只扫描最近几个月的分区
     browse_records = db.session.query(BrowseHistory, HouseInfo).join(
         HouseInfo, BrowseHistory.house_id == HouseInfo.id
     ).filter(
-        BrowseHistory.user_id == user_id
+        BrowseHistory.user_id == user_id,
+        BrowseHistory.visit_time >= retention_cutoff()
     ).order_by(BrowseHistory.visit_time.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
 
-    return render_template('browse_history.html', browse_records=browse_records)
+    favorite_ids = favorite_house_ids(user_id, [house.id for _, house in browse_records.items])
+
+    return render_template('browse_history.html', browse_records=browse_records,
+                           favorite_ids=favorite_ids)
 
 @app.route('/api/house-analysis/<int:house_id>')
 def house_analysis(house_id):
     """房源分析API"""
     try:
-        house = HouseInfo.query.get_or_404(house_id)
+        house = get_house_or_404(house_id)
         house_price = int(house.price) if house.price else 0
         house_area = int(house.area) if house.area else 0
 
-        # 1. 同区域房源价格分析
-        region_houses = HouseInfo.query.filter(
-            HouseInfo.region == house.region,
-            HouseInfo.id != house_id
-        ).all()
+        own = listing_values(house)  # 当前房源在汇总表中的贡献，统计时扣除
 
-        region_prices = [int(h.price) for h in region_houses if h.price and h.price.isdigit()]
+        # 1. 同区域房源价格分析
+        region_total = db.session.query(
+            db.func.sum(HouseRollup.valid_count),
+            db.func.sum(HouseRollup.price_sum)
+        ).filter(HouseRollup.region == (house.region or '')).one()
+        region_count = int(region_total[0] or 0)
+        region_price_sum = float(region_total[1] or 0)
+        if own:
+            region_count -= 1
+            region_price_sum -= own[0]
+
+        # 区域、区域内同户型、全市的租金草图（相对误差不超过1%），排名为二分查找
+        sketches = price_sketches()
+        region_sketch = sketches.get((house.region or '', None))
+
+        if region_count > 0 and region_sketch is not None:
+            region_summary = price_summary(region_sketch, house_price, bool(own))
+            cheaper_count = min(region_summary.get('cheaper_count', 0), region_count)
 
-        if region_prices:
-            avg_price = sum(region_prices) / len(region_prices)
             price_comparison = {
                 'current': house_price,
-                'average': round(avg_price, 0),
-                'cheaper_count': len([p for p in region_prices if p < house_price]),
-                'total_count': len(region_prices),
-                'percentage': round((len([p for p in region_prices if p >= house_price]) / len(region_prices)) * 100, 1)
+                'average': round(region_price_sum / region_count, 0),
+                'cheaper_count': cheaper_count,
+                'total_count': region_count,
+                'percentage': round((region_count - cheaper_count) / region_count * 100, 1),
+                'percentiles': region_summary['percentiles']
             }
+            rooms_sketch = sketches.get((house.region or '', house.rooms or ''))
+            if rooms_sketch is not None:
+                price_comparison['same_rooms'] = price_summary(rooms_sketch, house_price, bool(own))
+            city_sketch = sketches.get((None, None))
+            if city_sketch is not None:
+                price_comparison['citywide'] = price_summary(city_sketch, house_price, bool(own))
         else:
             price_comparison = {
                 'current': house_price,
@@ -504,42 +1220,46 @@ def house_analysis(house_id):
             }
 
         # 2. 同类型房源分析
-        same_type_houses = HouseInfo.query.filter(
-            HouseInfo.rooms == house.rooms,
-            HouseInfo.rent_type == house.rent_type,
-            HouseInfo.id != house_id
-        ).all()
+        same_type_regions = db.session.query(
+            HouseRollup.region,
+            db.func.sum(HouseRollup.listing_count)
+        ).filter(
+            HouseRollup.rooms == (house.rooms or ''),
+            HouseRollup.rent_type == (house.rent_type or '')
+        ).group_by(HouseRollup.region).all()
+
+        regions = {region: int(count) for region, count in same_type_regions}
+        own_region = house.region or ''
+        if regions.get(own_region):
+            regions[own_region] -= 1
+        regions = {region: count for region, count in regions.items() if count > 0}
 
         type_analysis = {
-            'total': len(same_type_houses),
-            'regions': {}
+            'total': sum(regions.values()),
+            'regions': regions
         }
 
-        for h in same_type_houses:
-            if h.region not in type_analysis['regions']:
-                type_analysis['regions'][h.region] = 0
-            type_analysis['regions'][h.region] += 1
-
         # 3. 性价比分析
         if house_area > 0:
             price_per_sqm = house_price / house_area
 
-            # 同区域同面积范围的房源
-            similar_houses = HouseInfo.query.filter(
-                HouseInfo.region == house.region,
-                HouseInfo.id != house_id
-            ).all()
-
-            similar_prices_per_sqm = []
-            for h in similar_houses:
-                if h.price and h.area and h.price.isdigit() and h.area.isdigit():
-                    h_area = int(h.area)
-                    h_price = int(h.price)
-                    if h_area > 0 and abs(h_area - house_area) <= 20:  # 面积相差不超过20平米
-                        similar_prices_per_sqm.append(h_price / h_area)
-
-            if similar_prices_per_sqm:
-                avg_price_per_sqm = sum(similar_prices_per_sqm) / len(similar_prices_per_sqm)
+            # 同区域同面积范围（相差不超过20平米，按面积分桶估算）的房源
+            similar = db.session.query(
+                db.func.sum(HouseAreaHistogram.listing_count),
+                db.func.sum(HouseAreaHistogram.unit_price_sum)
+            ).filter(
+                HouseAreaHistogram.region == (house.region or ''),
+                HouseAreaHistogram.bucket.between((house_area - 20) // AREA_BUCKET_WIDTH,
+                                                  (house_area + 20) // AREA_BUCKET_WIDTH)
+            ).one()
+            similar_count = int(similar[0] or 0)
+            similar_unit_sum = float(similar[1] or 0)
+            if own:
+                similar_count -= 1
+                similar_unit_sum -= own[0] / own[1]
+
+            if similar_count > 0:
+                avg_price_per_sqm = similar_unit_sum / similar_count
                 value_score = max(0, min(100, (avg_price_per_sqm - price_per_sqm) / avg_price_per_sqm * 100 + 50))
             else:
                 value_score = 50
@@ -730,24 +1450,14 @@ def profile():
         flash('用户不存在，请重新登录', 'error')
         return redirect(url_for('login'))
 
-    # 获取用户收藏数量
-    favorite_count = Favorite.query.filter_by(user_id=user.id).count()
-
-    # 获取用户浏览记录统计
-    browse_count = BrowseHistory.query.filter_by(user_id=user.id).count()
-
-    # 获取最近30天的浏览数量
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_browse_count = BrowseHistory.query.filter(
-        BrowseHistory.user_id == user.id,
-        BrowseHistory.visit_time >= thirty_days_ago
-    ).count()
+    # 收藏数和浏览数读计数表，最近30天的浏览数读按天分桶的计数
+    counter = db.session.get(UserCounter, user.id)
 
     return render_template('profile.html',
                          user=user,
-                         favorite_count=favorite_count,
-                         browse_count=browse_count,
-                         recent_browse_count=recent_browse_count)
+                         favorite_count=counter.favorite_count if counter else 0,
+                         browse_count=counter.browse_count if counter else 0,
+                         recent_browse_count=recent_view_count(user.id))
 
 @app.route('/api/nearby-houses')
 def nearby_houses():
@@ -787,15 +1497,22 @@ def nearby_houses():
             HouseInfo.longitude.isnot(None)
         )
 
+        # 快照中先用 R-tree 取出边界框内的候选（R-tree 坐标向外取整，上面的条件再精确过滤）
+        if serving_snapshot():
+            houses_query = houses_query.filter(HouseInfo.id.in_(
+                db.text("SELECT id FROM house_rtree WHERE max_lat >= :min_lat AND min_lat <= :max_lat "
+                        "AND max_lng >= :min_lon AND min_lng <= :max_lon").bindparams(**bounds)
+            ))
+
         # 添加租赁类型筛选
         if rent_type:
             houses_query = houses_query.filter(HouseInfo.rent_type == rent_type)
 
         # 添加价格范围筛选
         if min_price is not None:
-            houses_query = houses_query.filter(db.cast(HouseInfo.price, db.Integer) >= min_price)
+            houses_query = houses_query.filter(house_price_value() >= min_price)
         if max_price is not None:
-            houses_query = houses_query.filter(db.cast(HouseInfo.price, db.Integer) <= max_price)
+            houses_query = houses_query.filter(house_price_value() <= max_price)
 
         # 添加房间数筛选
         if rooms:
@@ -892,25 +1609,114 @@ def map_search_page():
 
 # 附近房源页面已删除 - 功能已整合到地图找房
 
+def query_chart_stats(house, house_id):
+    """从统计汇总表查询区域图表数据（快照不可用时使用）"""
+    region = house.region or ''
+    own = listing_values(house)  # 当前房源在汇总表中的贡献，统计时扣除
+
+    # 1. 区域房源户型分布
+    room_distribution = db.session.query(
+        HouseRollup.rooms,
+        db.func.sum(HouseRollup.listing_count).label('count')
+    ).filter(
+        HouseRollup.region == region,
+        HouseRollup.rooms != ''
+    ).group_by(HouseRollup.rooms).having(db.text('count > 0')).order_by(db.desc('count')).limit(8).all()
+
+    # 2. 计算同区域平均单价和全市平均单价
+    region_units = db.session.query(
+        db.func.sum(HouseRollup.valid_count),
+        db.func.sum(HouseRollup.unit_price_sum)
+    ).filter(HouseRollup.region == region).one()
+    region_count = int(region_units[0] or 0)
+    region_unit_sum = float(region_units[1] or 0)
+    if own:
+        region_count -= 1
+        region_unit_sum -= own[0] / own[1]
+
+    region_avg_unit_price = round(region_unit_sum / region_count, 2) if region_count > 0 else 0
+
+    city_count, city_unit_sum = db.session.query(
+        db.func.sum(HouseRollup.valid_count),
+        db.func.sum(HouseRollup.unit_price_sum)
+    ).one()
+    city_avg_unit_price = round(float(city_unit_sum) / int(city_count), 2) if city_count else 0
+
+    # 3. 朝向分布数据
+    direction_distribution = db.session.query(
+        HouseRollup.direction,
+        db.func.sum(HouseRollup.listing_count).label('count')
+    ).filter(
+        HouseRollup.region == region,
+        HouseRollup.direction != ''
+    ).group_by(HouseRollup.direction).having(db.text('count > 0')).order_by(db.desc('count')).limit(8).all()
+
+    # 4. 价格分布数据：汇总分桶的边界与价格区间边界对齐，按分桶起点归入区间
+    price_buckets = db.session.query(
+        HousePriceHistogram.bucket,
+        db.func.sum(HousePriceHistogram.listing_count)
+    ).filter(
+        HousePriceHistogram.region == region
+    ).group_by(HousePriceHistogram.bucket).all()
+
+    price_bins = [2000, 4000, 6000, 8000, 10000, 15000]
+    price_histogram = [0] * (len(price_bins) + 1)
+    for bucket, count in price_buckets:
+        bucket_start = bucket * PRICE_BUCKET_WIDTH
+        price_histogram[sum(1 for b in price_bins if bucket_start >= b)] += int(count)
+
+    # 5. 面积-价格散点图数据
+    scatter_houses = db.session.query(
+        HouseInfo.area,
+        HouseInfo.price,
+        HouseInfo.rooms
+    ).filter(
+        HouseInfo.region == house.region,
+        HouseInfo.price.regexp_match('^[0-9]+$'),
+        HouseInfo.area.regexp_match('^[0-9]+$'),
+        HouseInfo.id != house_id
+    ).limit(200).all()  # 限制200个点，避免过于密集
+
+    scatter_data = []
+    for area, price, rooms in scatter_houses:
+        try:
+            a = int(area)
+            p = int(price)
+            if a > 0 and a < 300 and p > 0 and p < 50000:  # 过滤异常值
+                scatter_data.append({
+                    'area': a,
+                    'price': p,
+                    'rooms': rooms or '未知'
+                })
+        except:
+            continue
+
+    return {
+        'room_distribution': room_distribution,
+        'region_avg_unit_price': region_avg_unit_price,
+        'city_avg_unit_price': city_avg_unit_price,
+        'direction_distribution': direction_distribution,
+        'price_histogram': price_histogram,
+        'scatter_data': scatter_data
+    }
+
 @app.route('/api/house-charts/<int:house_id>')
 def house_charts(house_id):
     """房源详情页图表数据API"""
     try:
-        house = HouseInfo.query.get_or_404(house_id)
+        house = get_house_or_404(house_id)
 
-        # 1. 区域房源户型分布（饼图数据）
-        room_distribution = db.session.query(
-            HouseInfo.rooms,
-            db.func.count(HouseInfo.id).label('count')
-        ).filter(
-            HouseInfo.region == house.region,
-            HouseInfo.rooms.isnot(None),
-            HouseInfo.rooms != ''
-        ).group_by(HouseInfo.rooms).order_by(db.desc('count')).limit(8).all()
+        # 优先使用列式快照，不存在时回退到统计汇总表
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            stats = region_chart_stats(snapshot, house.region, house_id)
+        else:
+            stats = query_chart_stats(house, house_id)
 
+        # 1. 区域房源户型分布（饼图数据）
         pie_data = [
             {'value': count, 'name': rooms or '未知户型'}
-            for rooms, count in room_distribution
+            for rooms, count in stats['room_distribution']
         ]
 
         # 2. 单价对比（条形图数据）
@@ -919,154 +1725,31 @@ def house_charts(house_id):
         current_area = int(house.area) if house.area and house.area.isdigit() else 0
         current_unit_price = round(current_price / current_area, 2) if current_area > 0 else 0
 
-        # 计算同区域平均单价
-        region_houses = db.session.query(
-            HouseInfo.price,
-            HouseInfo.area
-        ).filter(
-            HouseInfo.region == house.region,
-            HouseInfo.price.regexp_match('^[0-9]+$'),
-            HouseInfo.area.regexp_match('^[0-9]+$'),
-            HouseInfo.id != house_id
-        ).all()
-
-        valid_unit_prices = []
-        for price, area in region_houses:
-            try:
-                p = int(price)
-                a = int(area)
-                if a > 0 and p < 100000:  # 过滤异常值
-                    valid_unit_prices.append(p / a)
-            except:
-                continue
-
-        region_avg_unit_price = round(sum(valid_unit_prices) / len(valid_unit_prices), 2) if valid_unit_prices else 0
-
-        # 计算全市平均单价
-        city_houses = db.session.query(
-            HouseInfo.price,
-            HouseInfo.area
-        ).filter(
-            HouseInfo.price.regexp_match('^[0-9]+$'),
-            HouseInfo.area.regexp_match('^[0-9]+$')
-        ).limit(5000).all()  # 限制查询数量
-
-        city_valid_prices = []
-        for price, area in city_houses:
-            try:
-                p = int(price)
-                a = int(area)
-                if a > 0 and p < 100000:
-                    city_valid_prices.append(p / a)
-            except:
-                continue
-
-        city_avg_unit_price = round(sum(city_valid_prices) / len(city_valid_prices), 2) if city_valid_prices else 0
-
         bar_data = {
             'categories': ['当前房源', f'{house.region}平均', '全市平均'],
-            'values': [current_unit_price, region_avg_unit_price, city_avg_unit_price]
+            'values': [current_unit_price, stats['region_avg_unit_price'], stats['city_avg_unit_price']]
         }
 
         # 3. 朝向分布数据（玫瑰图）
-        direction_distribution = db.session.query(
-            HouseInfo.direction,
-            db.func.count(HouseInfo.id).label('count')
-        ).filter(
-            HouseInfo.region == house.region,
-            HouseInfo.direction.isnot(None),
-            HouseInfo.direction != ''
-        ).group_by(HouseInfo.direction).order_by(db.desc('count')).limit(8).all()
-
         rose_data = [
             {'value': count, 'name': direction or '未知朝向'}
-            for direction, count in direction_distribution
+            for direction, count in stats['direction_distribution']
         ]
 
         # 4. 价格分布数据（直方图）
-        # 获取同区域所有房源价格
-        region_prices_query = db.session.query(
-            HouseInfo.price
-        ).filter(
-            HouseInfo.region == house.region,
-            HouseInfo.price.regexp_match('^[0-9]+$')
-        ).all()
-
-        prices_list = []
-        for (price_str,) in region_prices_query:
-            try:
-                p = int(price_str)
-                if p < 100000:  # 过滤异常值
-                    prices_list.append(p)
-            except:
-                continue
-
-        # 按价格区间分组
-        price_ranges = {
-            '< 2000': 0,
-            '2000-4000': 0,
-            '4000-6000': 0,
-            '6000-8000': 0,
-            '8000-10000': 0,
-            '10000-15000': 0,
-            '>= 15000': 0
-        }
-
-        for p in prices_list:
-            if p < 2000:
-                price_ranges['< 2000'] += 1
-            elif p < 4000:
-                price_ranges['2000-4000'] += 1
-            elif p < 6000:
-                price_ranges['4000-6000'] += 1
-            elif p < 8000:
-                price_ranges['6000-8000'] += 1
-            elif p < 10000:
-                price_ranges['8000-10000'] += 1
-            elif p < 15000:
-                price_ranges['10000-15000'] += 1
-            else:
-                price_ranges['>= 15000'] += 1
-
         histogram_data = {
-            'categories': list(price_ranges.keys()),
-            'values': list(price_ranges.values()),
+            'categories': ['< 2000', '2000-4000', '4000-6000', '6000-8000', '8000-10000', '10000-15000', '>= 15000'],
+            'values': stats['price_histogram'],
             'current_price': current_price
         }
 
-        # 5. 面积-价格散点图数据
-        scatter_houses = db.session.query(
-            HouseInfo.area,
-            HouseInfo.price,
-            HouseInfo.rooms
-        ).filter(
-            HouseInfo.region == house.region,
-            HouseInfo.price.regexp_match('^[0-9]+$'),
-            HouseInfo.area.regexp_match('^[0-9]+$'),
-            HouseInfo.id != house_id
-        ).limit(200).all()  # 限制200个点，避免过于密集
-
-        scatter_data = []
-        for area, price, rooms in scatter_houses:
-            try:
-                a = int(area)
-                p = int(price)
-                if a > 0 and a < 300 and p > 0 and p < 50000:  # 过滤异常值
-                    scatter_data.append({
-                        'area': a,
-                        'price': p,
-                        'rooms': rooms or '未知'
-                    })
-            except:
-                continue
-
         return jsonify({
             'success': True,
             'pie_data': pie_data,
             'bar_data': bar_data,
             'rose_data': rose_data,
             'histogram_data': histogram_data,
-            'scatter_data': scatter_data,
+            'scatter_data': stats['scatter_data'],
             'current_house': {
                 'price': current_price,
                 'area': current_area,
@@ -1083,6 +1766,66 @@ def house_charts(house_id):
         traceback.print_exc()
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/rent-trend')
+def rent_trend():
+    """租金走势API（按周/月，可按区域、户型筛选）"""
+    period = request.args.get('period', 'month')
+    region = request.args.get('region', '')
+    rooms = request.args.get('rooms', '')
+    window = request.args.get('window', 3, type=int)
+    days = request.args.get('days', type=int)  # 只返回最近若干天
+
+    if period not in ('week', 'month'):
+        return jsonify({'success': False, 'message': '统计周期只支持 week 或 month'})
+
+    try:
+        since = (datetime.now() - timedelta(days=days)).date() if days else None
+        series = trend_series(period, region=region or None, rooms=rooms or None,
+                              window=max(window, 1), since=since)
+        for point in series:
+            point['period_start'] = point['period_start'].isoformat()
+            for key in ('avg_price', 'std_price', 'avg_unit_price', 'moving_avg_price'):
+                if point[key] is not None:
+                    point[key] = round(point[key], 1)
+
+        return jsonify({
+            'success': True,
+            'period': period,
+            'region': region,
+            'rooms': rooms,
+            'series': series
+        })
+
+    except Exception as e:
+        print(f"Rent trend error: {e}")
+        return jsonify({'success': False, 'message': '租金走势获取失败'})
+
+def is_admin():
+    """当前登录用户是否为管理员（见 ADMIN_USERNAMES）"""
+    return 'user_id' in session and session.get('username') in app.config['ADMIN_USERNAMES']
+
+@app.route('/api/pool-stats')
+def pool_stats():
+    """数据库连接池监控：DatabaseManager 连接池与 SQLAlchemy 连接池的使用情况，以及收藏缓存命中率（仅管理员）"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+    if not is_admin():
+        return jsonify({'success': False, 'message': '没有权限'}), 403
+
+    engine_pool = db.engine.pool
+    return jsonify({
+        'success': True,
+        'database_manager': db_manager.get_pool_stats(),
+        'replicas': replica_router.get_stats(),
+        'favorite_cache': favorite_cache.get_stats(),
+        'trending': trending_board.get_stats(),
+        'sqlalchemy': {
+            'size': engine_pool.size() if hasattr(engine_pool, 'size') else None,
+            'checked_out': engine_pool.checkedout() if hasattr(engine_pool, 'checkedout') else None,
+            'status': engine_pool.status()
+        }
+    })
+
 def init_db():
     """初始化数据库表"""
     with app.app_context():
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地理编码吞吐量压测工具
+启动本地高德桩服务，对预置数据的 house_info 表运行 AmapGeocoder，
+统计每秒处理地址数、每条地址的API调用次数和数据库耗时，作为调优并发参数的基线
+
+用法:
+    python benchmark_geocoding.py --rows 5000 --latency 0.03 --failure-rate 0.02
+    python benchmark_geocoding.py --mysql --mysql-database house_bench --rows 20000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from amap_geocoding import AmapGeocoder
+from amap_stub_server import AmapStubServer
+from add_test_coordinates import BEIJING_REGIONS
+from db_engine import connect as connect_mysql, load_database_config
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE house_info (
+        id INTEGER PRIMARY KEY,
+        address VARCHAR(200),
+        region VARCHAR(100),
+        block VARCHAR(100),
+        latitude DECIMAL(10, 8) NULL,
+        longitude DECIMAL(11, 8) NULL
+    )
+"""
+
+# 与 migrations/0007_geocode_failed_blocks.sql 一致，小区模式记录无法解析的小区
+CREATE_FAILED_BLOCKS_SQL = """
+    CREATE TABLE geocode_failed_blocks (
+        region VARCHAR(100) NOT NULL DEFAULT '',
+        block VARCHAR(100) NOT NULL,
+        failed_at DATETIME NOT NULL,
+        PRIMARY KEY (region, block)
+    )
+"""
+
+
+class SQLiteCursor:
+    """把 %s 占位符转换为 SQLite 的 ? 占位符，使 AmapGeocoder 的SQL可直接运行"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=()):
+        return self.cursor.execute(sql.replace('%s', '?'), params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor.executemany(sql.replace('%s', '?'), seq_of_params)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 连接的轻量包装"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class BenchmarkGeocoder(AmapGeocoder):
+    """连接压测库并统计数据库耗时的地理编码器"""
+
+    def __init__(self, api_key, base_url, connect):
+        super().__init__(api_key, base_url=base_url)
+        self.connect = connect
+        self.db_time = 0.0
+
+    def get_db_connection(self):
+        return self.connect()
+
+    # 压测不读写当日进度文件，避免影响真实任务
+    def load_progress(self):
+        pass
+
+    def save_progress(self):
+        pass
+
+    def get_addresses_batch(self, offset=0, limit=1000):
+        start = time.perf_counter()
+        try:
+            return super().get_addresses_batch(offset, limit)
+        finally:
+            self.db_time += time.perf_counter() - start
+
+    def update_coordinates_batch(self, coordinates):
+        start = time.perf_counter()
+        try:
+            return super().update_coordinates_batch(coordinates)
+        finally:
+            self.db_time += time.perf_counter() - start
+
+    def get_remaining_count(self):
+        start = time.perf_counter()
+        try:
+            return super().get_remaining_count()
+        finally:
+            self.db_time += time.perf_counter() - start
+
+    def get_pending_blocks(self):
+        start = time.perf_counter()
+        try:
+            return super().get_pending_blocks()
+        finally:
+            self.db_time += time.perf_counter() - start
+
+    def record_failed_blocks(self, blocks):
+        start = time.perf_counter()
+        try:
+            return super().record_failed_blocks(blocks)
+        finally:
+            self.db_time += time.perf_counter() - start
+
+    def update_block_coordinates(self, coordinates):
+        start = time.perf_counter()
+        try:
+            return super().update_block_coordinates(coordinates)
+        finally:
+            self.db_time += time.perf_counter() - start
+
+
+def generate_rows(count, seed):
+    """生成压测用的地址数据"""
+    rng = random.Random(seed)
+    regions = list(BEIJING_REGIONS.keys())
+    rows = []
+    for house_id in range(1, count + 1):
+        region = rng.choice(regions)
+        block = f"测试小区{rng.randint(1, count // 20 + 1)}号院"
+        address = f"{region}{block}{rng.randint(1, 30)}号楼"
+        # 少量房源没有小区信息，只能逐条地址编码
+        if rng.random() < 0.05:
+            block = ''
+        rows.append((house_id, address, region, block))
+    return rows
+
+
+def seed_sqlite(path, rows):
+    """创建并填充 SQLite 压测库"""
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS house_info")
+    conn.execute("DROP TABLE IF EXISTS geocode_failed_blocks")
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_FAILED_BLOCKS_SQL)
+    conn.executemany("INSERT INTO house_info (id, address, region, block) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def seed_mysql(config, rows):
+    """创建并填充 MySQL 压测库（使用独立的数据库，不影响 house 库）"""
+    database = config['database']
+    conn = connect_mysql(**{**config, 'database': None})
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARSET utf8mb4")
+    cursor.execute(f"USE `{database}`")
+    cursor.execute("DROP TABLE IF EXISTS house_info")
+    cursor.execute("DROP TABLE IF EXISTS geocode_failed_blocks")
+    cursor.execute(CREATE_TABLE_SQL)
+    cursor.execute(CREATE_FAILED_BLOCKS_SQL)
+    cursor.executemany("INSERT INTO house_info (id, address, region, block) VALUES (%s, %s, %s, %s)", rows)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def run_benchmark(args):
+    """运行一次压测并返回统计结果"""
+    rows = generate_rows(args.rows, args.seed)
+
+    if args.mysql:
+        config = {
+            'host': args.mysql_host,
+            'port': args.mysql_port,
+            'user': args.mysql_user,
+            'password': args.mysql_password,
+            'database': args.mysql_database,
+            'charset': 'utf8mb4'
+        }
+        seed_mysql(config, rows)
+        connect = lambda: connect_mysql(**config)
+    else:
+        db_path = args.sqlite or os.path.join(tempfile.mkdtemp(), 'geocoding_bench.db')
+        seed_sqlite(db_path, rows)
+        connect = lambda: SQLiteConnection(db_path)
+
+    server = AmapStubServer(('127.0.0.1', 0),
+                            latency=args.latency,
+                            qps_limit=args.qps_limit,
+                            failure_rate=args.failure_rate,
+                            error_rate=args.error_rate,
+                            seed=args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    geocoder = BenchmarkGeocoder('benchmark', server.base_url, connect)
+    geocoder.requests_per_second = args.rps
+    geocoder.delay = 1.0 / args.rps if args.rps else 0
+    geocoder.retry_delay = args.retry_delay
+    if args.batch_size:
+        geocoder.batch_size = args.batch_size
+
+    start = time.perf_counter()
+    try:
+        if args.mode == 'block':
+            geocoder.process_block_geocoding()
+        else:
+            geocoder.process_geocoding()
+    finally:
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+    # 小区模式下一次编码会写入多条房源，按表中剩余未编码的房源统计结果
+    db_time = geocoder.db_time
+    remaining = geocoder.get_remaining_count()
+    return {
+        'mode': args.mode,
+        'rows': args.rows,
+        'elapsed': elapsed,
+        'addresses': args.rows,
+        'success': args.rows - remaining,
+        'failed': remaining,
+        'api_calls': geocoder.api_calls,
+        'db_time': db_time,
+        'stub': server.get_stats()
+    }
+
+
+def print_report(result):
+    """输出压测报告"""
+    elapsed = max(result['elapsed'], 1e-9)
+    addresses = max(result['addresses'], 1)
+
+    print("=" * 60)
+    print("地理编码压测结果")
+    print("=" * 60)
+    print(f"编码模式: {result['mode']}")
+    print(f"数据行数: {result['rows']:,}")
+    print(f"处理地址: {result['addresses']:,} (成功 {result['success']:,}, 失败 {result['failed']:,})")
+    print(f"总耗时: {result['elapsed']:.2f} 秒")
+    print(f"吞吐量: {result['addresses'] / elapsed:.1f} 条地址/秒")
+    print(f"API调用: {result['api_calls']:,} 次, 平均 {result['api_calls'] / addresses:.3f} 次/地址")
+    print(f"数据库耗时: {result['db_time']:.2f} 秒 ({result['db_time'] / elapsed * 100:.1f}%)")
+    stub = result['stub']
+    print(f"桩服务: 请求 {stub['requests']:,}, QPS拒绝 {stub['qps_rejected']:,}, "
+          f"配额拒绝 {stub['quota_rejected']:,}, HTTP错误 {stub['http_errors']:,}")
+    print("=" * 60)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='地理编码吞吐量压测')
+    parser.add_argument('--rows', type=int, default=2000, help='预置的房源数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+    parser.add_argument('--rps', type=float, default=0, help='客户端每秒请求数，0 表示不限速')
+    parser.add_argument('--mode', choices=['address', 'block'], default='address', help='地理编码模式')
+    parser.add_argument('--batch-size', type=int, default=None, help='每次请求打包的地址数')
+    parser.add_argument('--retry-delay', type=float, default=0.1, help='失败重试等待（秒）')
+    parser.add_argument('--latency', type=float, default=0.0, help='桩服务响应延迟（秒）')
+    parser.add_argument('--qps-limit', type=int, default=None, help='桩服务每秒请求上限')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='单条地址解析失败概率')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 错误概率')
+    parser.add_argument('--sqlite', default=None, help='SQLite 压测库路径，默认使用临时文件')
+    parser.add_argument('--mysql', action='store_true', help='使用 MySQL 作为压测库')
+    db_config = load_database_config()
+    parser.add_argument('--mysql-host', default=db_config['host'])
+    parser.add_argument('--mysql-port', type=int, default=db_config['port'])
+    parser.add_argument('--mysql-user', default=db_config['user'])
+    parser.add_argument('--mysql-password', default=db_config['password'])
+    parser.add_argument('--mysql-database', default='house_bench')
+    parser.add_argument('--verbose', action='store_true', help='输出地理编码逐条日志')
+    args = parser.parse_args()
+
+    if args.mysql and args.mysql_database == 'house':
+        parser.error('压测会重建 house_info 等表，请不要使用业务库 house')
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    print_report(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
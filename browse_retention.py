@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览记录分区维护与过期清理
+browse_history 按 visit_time 做 RANGE 分区（migrations/0004_browse_history_partitioning.sql），
+每个自然月一个分区 pYYYYMM，最后是兜底的 pmax。本脚本定期运行（如每天一次）：
+  - 提前创建之后 history_future_partitions 个月的分区（从 pmax 中拆出，pmax 始终为空或很小）
+  - 早于保留期（history_retention_months 个月）的分区先汇总为每个房源每天的浏览量
+    （house_daily_views），再整个分区 DROP，不需要逐行 DELETE
+  - 清理 user_daily_views 中超过 USER_DAILY_VIEW_DAYS 天的计数
+
+保留期可在 config.json 的 database 段或用 HOUSE_HISTORY_RETENTION_MONTHS 环境变量配置，
+app.py 的浏览记录页只查询保留期内的数据，查询只会扫描最近几个月的分区。
+
+用法:
+    python browse_retention.py              # 创建后续分区并清理过期分区
+    python browse_retention.py --dry-run    # 只显示将要执行的操作
+    python browse_retention.py --status     # 查看各分区的行数
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+from db_engine import connect, load_database_config
+
+# user_daily_views 只用于统计最近 30 天的浏览量，多保留一天避免跨日时少算
+USER_DAILY_VIEW_DAYS = 31
+
+TABLE = 'browse_history'
+CATCH_ALL_PARTITION = 'pmax'
+
+LIST_PARTITIONS_SQL = """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS row_count
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+# 按天汇总一个分区，分区边界是月初，同一天的记录都在同一分区内，重复执行结果相同
+ROLLUP_PARTITION_SQL = """
+    INSERT INTO house_daily_views (house_id, day, view_count, visitor_count)
+    SELECT house_id, DATE(visit_time), COUNT(*),
+           COUNT(DISTINCT COALESCE(CONCAT('u', user_id), CONCAT('ip', ip_address)))
+    FROM browse_history PARTITION ({partition})
+    GROUP BY house_id, DATE(visit_time)
+    ON DUPLICATE KEY UPDATE view_count = VALUES(view_count), visitor_count = VALUES(visitor_count)
+"""
+
+
+def month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt, months):
+    """月初日期加减若干个月"""
+    index = dt.year * 12 + dt.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """保存该月数据的分区名，如 p202410"""
+    return f"p{month:%Y%m}"
+
+
+def retention_cutoff(months=None, now=None):
+    """保留期的起点：当前月之前 months 个月的月初，早于该时间的记录会被汇总后删除
+
+    Args:
+        months: 保留的月数，默认使用配置的 history_retention_months
+        now: 当前时间（UTC），默认 datetime.utcnow()
+    """
+    if months is None:
+        months = load_database_config()['history_retention_months']
+    return add_months(month_start(now or datetime.utcnow()), -months)
+
+
+def list_partitions(conn):
+    """browse_history 的分区：[(分区名, 上界 datetime，pmax 为 None, 估算行数)]"""
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(LIST_PARTITIONS_SQL, (TABLE,))
+        rows = cursor.fetchall()
+    if not rows or rows[0]['name'] is None:
+        raise RuntimeError(f"{TABLE} 尚未分区，请先运行 python migrate.py")
+
+    partitions = []
+    for row in rows:
+        bound = row['bound'].strip("'")
+        partitions.append((row['name'],
+                           None if bound == 'MAXVALUE' else datetime.strptime(bound, '%Y-%m-%d %H:%M:%S'),
+                           row['row_count'] or 0))
+    return partitions
+
+
+def plan_new_partitions(conn, partitions, ahead, now=None):
+    """需要从 pmax 中拆出的月份分区：[(分区名, 上界)]
+
+    已有按月分区时从最后一个分区的下个月开始；还没有时从 pmax 中最早的记录所在月份开始，
+    一直到当前月之后 ahead 个月。
+    """
+    monthly = [bound for _, bound, _ in partitions if bound is not None]
+    if monthly:
+        first = monthly[-1]
+    else:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT MIN(visit_time) FROM {TABLE}")
+            earliest = cursor.fetchone()[0]
+        first = month_start(earliest or now or datetime.utcnow())
+
+    last = add_months(month_start(now or datetime.utcnow()), ahead)
+    planned = []
+    month = first
+    while month <= last:
+        planned.append((partition_name(month), add_months(month, 1)))
+        month = add_months(month, 1)
+    return planned
+
+
+def ensure_partitions(conn, partitions, ahead, dry_run=False, now=None):
+    """提前创建后续月份的分区，返回新建的分区名列表"""
+    planned = plan_new_partitions(conn, partitions, ahead, now)
+    if not planned:
+        return []
+
+    definitions = [f"PARTITION {name} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}')" for name, bound in planned]
+    definitions.append(f"PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    sql = (f"ALTER TABLE {TABLE} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO "
+           f"({', '.join(definitions)})")
+    if not dry_run:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+    return [name for name, _ in planned]
+
+
+def expire_partitions(conn, partitions, cutoff, dry_run=False):
+    """汇总并删除上界不晚于 cutoff 的分区
+
+    Returns:
+        [(分区名, 估算行数)]
+    """
+    expired = [(name, row_count) for name, bound, row_count in partitions
+               if bound is not None and bound <= cutoff]
+    if dry_run:
+        return expired
+
+    for name, _ in expired:
+        # 先提交汇总再删除分区；中途失败时重新运行会重新汇总同一分区，结果相同
+        with conn.cursor() as cursor:
+            cursor.execute(ROLLUP_PARTITION_SQL.format(partition=name))
+        conn.commit()
+        with conn.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+    return expired
+
+
+def prune_user_daily_views(conn, now=None, dry_run=False):
+    """删除 user_daily_views 中超过 USER_DAILY_VIEW_DAYS 天的计数，返回删除的行数"""
+    day = (now or datetime.utcnow()).date() - timedelta(days=USER_DAILY_VIEW_DAYS)
+    with conn.cursor() as cursor:
+        if dry_run:
+            cursor.execute("SELECT COUNT(*) FROM user_daily_views WHERE day < %s", (day,))
+            return cursor.fetchone()[0]
+        deleted = cursor.execute("DELETE FROM user_daily_views WHERE day < %s", (day,))
+    conn.commit()
+    return deleted
+
+
+def run_retention(months=None, ahead=None, dry_run=False):
+    """创建后续分区并清理过期数据
+
+    Args:
+        months: 保留的月数，默认使用配置的 history_retention_months
+        ahead: 提前创建的月数，默认使用配置的 history_future_partitions
+        dry_run: 只计算将要执行的操作，不修改数据
+
+    Returns:
+        {'created': [...], 'expired': [(分区名, 行数)], 'cutoff': datetime, 'daily_views_pruned': int}
+    """
+    config = load_database_config()
+    months = config['history_retention_months'] if months is None else months
+    ahead = config['history_future_partitions'] if ahead is None else ahead
+    now = datetime.utcnow()
+    cutoff = retention_cutoff(months, now)
+
+    # 分区操作和全分区汇总耗时较长，不使用语句超时
+    conn = connect(init_command=None)
+    try:
+        created = ensure_partitions(conn, list_partitions(conn), ahead, dry_run, now)
+        expired = expire_partitions(conn, list_partitions(conn), cutoff, dry_run)
+        pruned = prune_user_daily_views(conn, now, dry_run)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {'created': created, 'expired': expired, 'cutoff': cutoff, 'daily_views_pruned': pruned}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='浏览记录分区维护与过期清理')
+    parser.add_argument('--months', type=int, default=None, help='保留的月数，默认使用配置')
+    parser.add_argument('--ahead', type=int, default=None, help='提前创建的月数，默认使用配置')
+    parser.add_argument('--dry-run', action='store_true', help='只显示将要执行的操作')
+    parser.add_argument('--status', action='store_true', help='查看各分区的行数')
+    args = parser.parse_args()
+
+    if args.status:
+        conn = connect()
+        try:
+            for name, bound, row_count in list_partitions(conn):
+                label = '之后全部' if bound is None else f"< {bound:%Y-%m-%d}"
+                print(f"{name}: {label}, 约 {row_count:,} 行")
+        finally:
+            conn.close()
+        return
+
+    start = time.time()
+    result = run_retention(args.months, args.ahead, args.dry_run)
+    prefix = '[dry-run] ' if args.dry_run else ''
+    print(f"{prefix}保留 {result['cutoff']:%Y-%m-%d} 之后的浏览记录")
+    if result['created']:
+        print(f"{prefix}新建分区: {', '.join(result['created'])}")
+    for name, row_count in result['expired']:
+        print(f"{prefix}汇总并删除分区 {name}（约 {row_count:,} 行）")
+    print(f"{prefix}清理 user_daily_views {result['daily_views_pruned']:,} 行")
+    print(f"✅ 完成, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
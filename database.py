@@ -1,25 +1,264 @@
 """
 数据库连接和操作模块
 """
+import random
+import threading
+import time
+from decimal import Decimal
 import pymysql
+import pymysql.cursors
 import pandas as pd
+from sqlalchemy import event
+from db_engine import connect, get_engine, get_router, load_database_config
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+
+# 数据分析使用的有效数据条件：价格、面积为纯数字且在合理范围内
+VALID_LISTING_CONDITION = """
+    price REGEXP '^[0-9]+$' AND area REGEXP '^[0-9]+$'
+    AND CAST(price AS UNSIGNED) > 0 AND CAST(price AS UNSIGNED) < 100000
+    AND CAST(area AS UNSIGNED) > 0 AND CAST(area AS UNSIGNED) < 1000
+"""
+
+# 统计汇总表（house_rollup.py 维护）的维度和分桶宽度
+ROLLUP_DIMENSIONS = ('region', 'rooms', 'rent_type', 'direction')
+PRICE_BUCKET_WIDTH = 500  # 元，house_charts() 的价格区间边界都是它的整数倍
+AREA_BUCKET_WIDTH = 10  # 平方米
+
+# 流式读取时转换为 category 类型的低基数文本列
+CATEGORICAL_COLUMNS = ('region', 'rent_type', 'rooms', 'direction')
+
+# 列表页和流式扫描默认读取的房源字段
+HOUSE_LIST_COLUMNS = """
+    id, title, rooms, area, price, direction, rent_type,
+    region, block, address, traffic, facilities, highlights,
+    page_views, landlord, phone_num
+"""
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """压缩 DataFrame 的内存占用
+
+    区域、租赁类型、户型、朝向转换为 category，整数和浮点数向下转换到能容纳数据的最小类型，
+    DECIMAL（如经纬度）转换为 float64。
+    """
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            downcast = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+            df[column] = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='float')
+        elif series.dtype == object:
+            first = series.first_valid_index()
+            if first is not None and isinstance(series[first], Decimal):
+                df[column] = series.astype('float64')
+    return df
+
+
+def build_house_filters(search: str = '',
+                        region: str = '',
+                        rent_type: str = '',
+                        rooms: str = '',
+                        min_price: Optional[int] = None,
+                        max_price: Optional[int] = None) -> tuple:
+    """构建房源筛选条件
+
+    Returns:
+        (WHERE 子句（无条件时为空字符串）, 参数列表)
+    """
+    conditions = []
+    params = []
+
+    if search:
+        conditions.append("(title LIKE %s OR address LIKE %s OR block LIKE %s)")
+        search_pattern = f'%{search}%'
+        params.extend([search_pattern, search_pattern, search_pattern])
+
+    if region:
+        conditions.append("region LIKE %s")
+        params.append(f'%{region}%')
+
+    if rent_type:
+        conditions.append("rent_type = %s")
+        params.append(rent_type)
+
+    if rooms:
+        conditions.append("rooms LIKE %s")
+        params.append(f'%{rooms}%')
+
+    if min_price:
+        conditions.append("CAST(price AS UNSIGNED) >= %s")
+        params.append(min_price)
+
+    if max_price:
+        conditions.append("CAST(price AS UNSIGNED) <= %s")
+        params.append(max_price)
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
 
 class DatabaseManager:
     def __init__(self):
-        self.config = {
-            'host': '127.0.0.1',
-            'port': 3306,
-            'user': 'root',
-            'password': '',
-            'database': 'house',
-            'charset': 'utf8mb4'
-        }
+        self.config = load_database_config()
+        self._stats_lock = threading.Lock()
+        self._in_use = {}  # 连接池 -> 借出中的连接数（由连接池事件维护）
+        self._checkouts = 0
+        self._connects = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @property
+    def engine(self):
+        return get_engine()
 
     def get_connection(self):
-        """获取数据库连接"""
-        return pymysql.connect(**self.config)
+        """从主库连接池获取数据库连接，close() 时归还（归还时自动回滚未提交的事务）"""
+        return self._checkout(self.engine)
+
+    def get_read_connection(self, user_id: Optional[str] = None):
+        """获取只读查询使用的连接
+
+        优先使用健康的只读副本；没有可用副本，或该用户刚写入过数据（读到自己的写入）时使用主库。
+        """
+        router = get_router()
+        if not router.is_sticky(user_id):
+            replica = router.choose()
+            if replica is not None:
+                return self._checkout(replica)
+        return self.get_connection()
+
+    @property
+    def pool_capacity(self) -> Optional[int]:
+        """每个连接池最多同时借出的连接数，max_overflow 为负数（不限制）时为 None"""
+        if self.config['max_overflow'] < 0:
+            return None
+        return self.config['pool_size'] + self.config['max_overflow']
+
+    def _watch_pool(self, pool):
+        """在连接池上注册 checkout / checkin / connect 事件，统计借出中的连接数和新建的连接数"""
+        with self._stats_lock:
+            if pool in self._in_use:
+                return
+            # 注册前已借出的连接（例如批处理脚本直接使用共享引擎）归还时同样会触发 checkin
+            self._in_use[pool] = pool.checkedout() if hasattr(pool, 'checkedout') else 0
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._stats_lock:
+                self._in_use[pool] += 1
+
+        def on_checkin(dbapi_connection, connection_record):
+            with self._stats_lock:
+                self._in_use[pool] = max(self._in_use[pool] - 1, 0)
+
+        def on_connect(dbapi_connection, connection_record):
+            with self._stats_lock:
+                self._connects += 1
+
+        event.listen(pool, 'checkout', on_checkout)
+        event.listen(pool, 'checkin', on_checkin)
+        event.listen(pool, 'connect', on_connect)
+
+    def _checkout(self, engine):
+        """从引擎的连接池借出连接
+
+        借出时连接池的连接已全部借出（按连接池事件统计）的请求需要排队，计为一次等待并记录等待时间；
+        连接池未满时即使需要新建连接也不计入等待。
+        """
+        pool = engine.pool
+        self._watch_pool(pool)
+        capacity = self.pool_capacity
+        with self._stats_lock:
+            exhausted = capacity is not None and self._in_use[pool] >= capacity
+        start = time.monotonic()
+        try:
+            return engine.raw_connection()
+        finally:
+            wait_time = time.monotonic() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                if exhausted:
+                    # 等待超时（pool_timeout）同样计入
+                    self._waits += 1
+                    self._wait_time += wait_time
+                    self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def get_pool_stats(self) -> Dict:
+        """获取连接池使用情况
+
+        waits 为借出时连接池已满、需要排队的次数（主库和副本合计），avg_wait_ms / max_wait_ms 为这些请求的等待时间；
+        connects 为新建的数据库连接数。
+        """
+        pool = self.engine.pool
+        capacity = self.pool_capacity or self.config['pool_size']
+        with self._stats_lock:
+            return {
+                'pool_size': pool.size(),
+                'max_size': capacity,
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'utilization': pool.checkedout() / capacity if capacity else 0,
+                'checkouts': self._checkouts,
+                'connects': self._connects,
+                'waits': self._waits,
+                'avg_wait_ms': self._wait_time / self._waits * 1000 if self._waits else 0,
+                'max_wait_ms': self._max_wait_time * 1000,
+                'replicas': get_router().get_stats()
+            }
+
+    def fetch_value(self, query: str, params: Optional[list] = None, user_id: Optional[str] = None) -> Any:
+        """执行只读查询并返回第一行第一列，不经过 pandas；无结果时返回 None"""
+        conn = self.get_read_connection(user_id)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                return row[0] if row else None
+        finally:
+            conn.close()
+
+    def fetch_rows(self, query: str, params: Optional[list] = None, user_id: Optional[str] = None) -> List[Dict]:
+        """执行小结果集的只读查询，以字典列表返回，不经过 pandas"""
+        conn = self.get_read_connection(user_id)
+        try:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(query, params)
+                return list(cursor.fetchall())
+        finally:
+            conn.close()
+
+    def iter_query(self, query: str, params: Optional[list] = None,
+                   chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+        """流式执行查询，按块返回压缩过类型的 DataFrame
+
+        使用服务端游标（SSCursor），结果集不会一次性加载到客户端，峰值内存只与 chunk_size 有关。
+        全表扫描耗时较长，使用不经过连接池、不设语句超时的独立连接；中途退出时直接断开，不再读取剩余结果。
+        各块的 category 取值可能不同，需要合并时先转换回字符串或使用 union_categoricals。
+        """
+        conn = connect(init_command=None)
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield compact_dtypes(pd.DataFrame.from_records(rows, columns=columns))
+        finally:
+            conn.close()
+
+    def iter_houses(self, columns: str = HOUSE_LIST_COLUMNS, chunk_size: int = 50000,
+                    **filters) -> Iterator[pd.DataFrame]:
+        """按主键顺序流式扫描符合条件的房源，筛选参数与 get_houses 相同"""
+        where, params = build_house_filters(**filters)
+        query = f"SELECT {columns} FROM house_info{where} ORDER BY id"
+        return self.iter_query(query, params, chunk_size=chunk_size)
 
     def get_houses(self,
                    search: str = '',
@@ -33,48 +272,13 @@ class DatabaseManager:
         """
         获取房源列表
         """
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         try:
             # 构建查询条件
-            conditions = []
-            params = []
-
-            if search:
-                conditions.append("(title LIKE %s OR address LIKE %s OR block LIKE %s)")
-                search_pattern = f'%{search}%'
-                params.extend([search_pattern, search_pattern, search_pattern])
-
-            if region:
-                conditions.append("region LIKE %s")
-                params.append(f'%{region}%')
-
-            if rent_type:
-                conditions.append("rent_type = %s")
-                params.append(rent_type)
-
-            if rooms:
-                conditions.append("rooms LIKE %s")
-                params.append(f'%{rooms}%')
-
-            if min_price:
-                conditions.append("CAST(price AS UNSIGNED) >= %s")
-                params.append(min_price)
-
-            if max_price:
-                conditions.append("CAST(price AS UNSIGNED) <= %s")
-                params.append(max_price)
+            where, params = build_house_filters(search, region, rent_type, rooms, min_price, max_price)
 
             # 构建SQL查询
-            base_query = """
-                SELECT id, title, rooms, area, price, direction, rent_type,
-                       region, block, address, traffic, facilities, highlights,
-                       page_views, landlord, phone_num
-                FROM house_info
-            """
-
-            if conditions:
-                base_query += " WHERE " + " AND ".join(conditions)
-
+            base_query = f"SELECT {HOUSE_LIST_COLUMNS} FROM house_info{where}"
             base_query += " ORDER BY id DESC LIMIT %s OFFSET %s"
             params.extend([limit, offset])
 
@@ -89,21 +293,20 @@ class DatabaseManager:
         """获取房源详情"""
         conn = self.get_connection()
         try:
-            query = "SELECT * FROM house_info WHERE id = %s"
-            df = pd.read_sql(query, conn, params=[house_id])
-
-            if len(df) > 0:
-                # 更新浏览次数
-                update_query = """
-                    UPDATE house_info
-                    SET page_views = COALESCE(page_views, 0) + 1
-                    WHERE id = %s
-                """
-                with conn.cursor() as cursor:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("SELECT * FROM house_info WHERE id = %s", [house_id])
+                house = cursor.fetchone()
+
+                if house:
+                    # 更新浏览次数
+                    update_query = """
+                        UPDATE house_info
+                        SET page_views = COALESCE(page_views, 0) + 1
+                        WHERE id = %s
+                    """
                     cursor.execute(update_query, [house_id])
                     conn.commit()
-
-                return df.iloc[0].to_dict()
+                    return house
             return {}
 
         finally:
@@ -111,75 +314,32 @@ class DatabaseManager:
 
     def get_regions(self) -> List[str]:
         """获取所有区域"""
-        conn = self.get_connection()
-        try:
-            query = "SELECT DISTINCT region FROM house_info WHERE region IS NOT NULL AND region != '' ORDER BY region"
-            df = pd.read_sql(query, conn)
-            return df['region'].tolist()
-        finally:
-            conn.close()
+        query = "SELECT DISTINCT region FROM house_info WHERE region IS NOT NULL AND region != '' ORDER BY region"
+        return [row['region'] for row in self.fetch_rows(query)]
 
     def get_total_count(self, **filters) -> int:
         """获取符合条件的房源总数"""
-        conn = self.get_connection()
-        try:
-            conditions = []
-            params = []
-
-            # 复用get_houses的筛选逻辑
-            if filters.get('search'):
-                conditions.append("(title LIKE %s OR address LIKE %s OR block LIKE %s)")
-                search_pattern = f'%{filters["search"]}%'
-                params.extend([search_pattern, search_pattern, search_pattern])
-
-            if filters.get('region'):
-                conditions.append("region LIKE %s")
-                params.append(f'%{filters["region"]}%')
-
-            if filters.get('rent_type'):
-                conditions.append("rent_type = %s")
-                params.append(filters['rent_type'])
-
-            if filters.get('rooms'):
-                conditions.append("rooms LIKE %s")
-                params.append(f'%{filters["rooms"]}%')
-
-            if filters.get('min_price'):
-                conditions.append("CAST(price AS UNSIGNED) >= %s")
-                params.append(filters['min_price'])
-
-            if filters.get('max_price'):
-                conditions.append("CAST(price AS UNSIGNED) <= %s")
-                params.append(filters['max_price'])
-
-            query = "SELECT COUNT(*) as count FROM house_info"
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-
-            df = pd.read_sql(query, conn, params=params)
-            return df.iloc[0]['count']
-        finally:
-            conn.close()
+        # 复用get_houses的筛选逻辑（忽略分页等其他参数）
+        keys = ('search', 'region', 'rent_type', 'rooms', 'min_price', 'max_price')
+        where, params = build_house_filters(**{k: v for k, v in filters.items() if k in keys})
+        return self.fetch_value(f"SELECT COUNT(*) FROM house_info{where}", params)
 
     def add_favorite(self, user_id: str, house_id: int) -> bool:
-        """添加收藏"""
+        """添加收藏，已收藏时返回 False
+
+        单条幂等写入：(user_id, house_id) 唯一约束使重复插入被忽略，不存在先查后写的竞争。
+        """
         conn = self.get_connection()
         try:
             with conn.cursor() as cursor:
-                # 检查是否已收藏
-                check_query = "SELECT id FROM favorites WHERE user_id = %s AND house_id = %s"
-                cursor.execute(check_query, [user_id, house_id])
-                if cursor.fetchone():
-                    return False  # 已收藏
-
-                # 添加收藏
                 insert_query = """
-                    INSERT INTO favorites (user_id, house_id, created_at)
+                    INSERT IGNORE INTO favorites (user_id, house_id, created_at)
                     VALUES (%s, %s, %s)
                 """
-                cursor.execute(insert_query, [user_id, house_id, datetime.now()])
+                created = cursor.execute(insert_query, [user_id, house_id, datetime.now()]) > 0
                 conn.commit()
-                return True
+                get_router().record_write(user_id)
+                return created
         finally:
             conn.close()
 
@@ -191,35 +351,223 @@ class DatabaseManager:
                 delete_query = "DELETE FROM favorites WHERE user_id = %s AND house_id = %s"
                 result = cursor.execute(delete_query, [user_id, house_id])
                 conn.commit()
+                get_router().record_write(user_id)
                 return result > 0
         finally:
             conn.close()
 
-    def get_favorites(self, user_id: str) -> pd.DataFrame:
-        """获取用户收藏列表"""
-        conn = self.get_connection()
+    def get_favorites(self, user_id: str, limit: int = 20,
+                      before: Optional[Tuple[datetime, int]] = None) -> pd.DataFrame:
+        """获取用户收藏列表，按收藏时间倒序分页
+
+        Args:
+            before: 上一页最后一条的 (created_at, favorite_id)，为空时从最新的收藏开始
+        """
+        where = "f.user_id = %s"
+        params = [user_id]
+        if before is not None:
+            where += " AND (f.created_at < %s OR (f.created_at = %s AND f.id < %s))"
+            params += [before[0], before[0], before[1]]
+
+        query = f"""
+            SELECT f.id AS favorite_id, f.created_at,
+                   h.id, h.title, h.rooms, h.area, h.price, h.direction,
+                   h.rent_type, h.region, h.address, h.page_views
+            FROM favorites f
+            INNER JOIN house_info h ON h.id = f.house_id
+            WHERE {where}
+            ORDER BY f.created_at DESC, f.id DESC
+            LIMIT %s
+        """
+        conn = self.get_read_connection(user_id)
         try:
-            query = """
-                SELECT h.id, h.title, h.rooms, h.area, h.price, h.direction,
-                       h.rent_type, h.region, h.address, h.page_views
-                FROM house_info h
-                INNER JOIN favorites f ON h.id = f.house_id
-                WHERE f.user_id = %s
-                ORDER BY f.created_at DESC
-            """
-            df = pd.read_sql(query, conn, params=[user_id])
-            return df
+            return pd.read_sql(query, conn, params=params + [limit])
         finally:
             conn.close()
 
+    def get_favorite_count(self, user_id: str) -> int:
+        """用户的收藏总数（读 user_counters 计数表）"""
+        query = "SELECT favorite_count FROM user_counters WHERE user_id = %s"
+        return self.fetch_value(query, [user_id], user_id=user_id) or 0
+
     def is_favorite(self, user_id: str, house_id: int) -> bool:
         """检查是否已收藏"""
-        conn = self.get_connection()
+        query = "SELECT id FROM favorites WHERE user_id = %s AND house_id = %s"
+        return self.fetch_value(query, [user_id, house_id], user_id=user_id) is not None
+
+    def get_analytics_summary(self) -> Dict:
+        """获取全量有效房源的汇总指标（数量、平均租金、平均面积、平均单价）"""
+        conn = self.get_read_connection()
+        try:
+            query = """
+                SELECT SUM(valid_count) AS total,
+                       SUM(price_sum) / SUM(valid_count) AS avg_price,
+                       SUM(area_sum) / SUM(valid_count) AS avg_area,
+                       SUM(unit_price_sum) / SUM(valid_count) AS avg_unit_price
+                FROM house_rollup
+            """
+            df = pd.read_sql(query, conn)
+            summary = df.iloc[0].to_dict()
+            summary['total'] = summary['total'] or 0
+            return summary
+        finally:
+            conn.close()
+
+    def get_histogram(self, column: str, bins: int = 30) -> pd.DataFrame:
+        """从汇总分桶中统计价格或面积分布
+
+        汇总表按固定宽度分桶，这里把相邻分桶合并为不超过 bins 个区间。
+
+        Args:
+            column: 'price' 或 'area'
+            bins: 区间数量
+
+        Returns:
+            包含 bucket_start、bucket_end、count 的DataFrame
+        """
+        if column not in ('price', 'area'):
+            raise ValueError(f"不支持的统计字段: {column}")
+
+        table, width = {
+            'price': ('house_price_histogram', PRICE_BUCKET_WIDTH),
+            'area': ('house_area_histogram', AREA_BUCKET_WIDTH)
+        }[column]
+
+        conn = self.get_read_connection()
+        try:
+            query = f"""
+                SELECT bucket, SUM(listing_count) AS count
+                FROM {table}
+                GROUP BY bucket
+                HAVING count > 0
+                ORDER BY bucket
+            """
+            df = pd.read_sql(query, conn)
+        finally:
+            conn.close()
+
+        if df.empty:
+            return pd.DataFrame(columns=['bucket_start', 'bucket_end', 'count'])
+
+        low = int(df['bucket'].min())
+        span = int(df['bucket'].max()) - low + 1
+        group = -(-span // bins)
+        df['bucket'] = (df['bucket'] - low) // group
+        df = df.groupby('bucket', as_index=False)['count'].sum()
+        df['bucket_start'] = (low + df['bucket'] * group) * width
+        df['bucket_end'] = df['bucket_start'] + group * width
+        return df[['bucket_start', 'bucket_end', 'count']]
+
+    def get_value_counts(self, column: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """统计区域、租赁类型、户型或朝向的有效房源数量（按数量降序）"""
+        if column not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"不支持的统计字段: {column}")
+
+        conn = self.get_read_connection()
+        try:
+            query = f"""
+                SELECT {column}, SUM(valid_count) AS count
+                FROM house_rollup
+                WHERE {column} != ''
+                GROUP BY {column}
+                HAVING count > 0
+                ORDER BY count DESC
+            """
+            params = []
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
+            return pd.read_sql(query, conn, params=params)
+        finally:
+            conn.close()
+
+    def get_room_price_stats(self, min_count: int = 10) -> pd.DataFrame:
+        """按户型统计平均租金，只返回房源数量不少于 min_count 的户型"""
+        conn = self.get_read_connection()
+        try:
+            query = """
+                SELECT rooms, SUM(price_sum) / SUM(valid_count) AS mean, SUM(valid_count) AS count
+                FROM house_rollup
+                WHERE rooms != ''
+                GROUP BY rooms
+                HAVING count >= %s AND count > 0
+                ORDER BY rooms
+            """
+            return pd.read_sql(query, conn, params=[min_count])
+        finally:
+            conn.close()
+
+    def get_region_stats(self, regions: List[str]) -> pd.DataFrame:
+        """获取指定区域的房源数量、平均租金、平均面积和平均单价"""
+        if not regions:
+            return pd.DataFrame(columns=['region', 'count', 'avg_price', 'avg_area', 'avg_unit_price'])
+
+        conn = self.get_read_connection()
+        try:
+            placeholders = ', '.join(['%s'] * len(regions))
+            query = f"""
+                SELECT region, SUM(valid_count) AS count,
+                       SUM(price_sum) / SUM(valid_count) AS avg_price,
+                       SUM(area_sum) / SUM(valid_count) AS avg_area,
+                       SUM(unit_price_sum) / SUM(valid_count) AS avg_unit_price
+                FROM house_rollup
+                WHERE region IN ({placeholders})
+                GROUP BY region
+                HAVING count > 0
+            """
+            return pd.read_sql(query, conn, params=list(regions))
+        finally:
+            conn.close()
+
+    def get_region_room_counts(self, regions: List[str]) -> pd.DataFrame:
+        """获取指定区域内各户型的有效房源数量"""
+        if not regions:
+            return pd.DataFrame(columns=['region', 'rooms', 'count'])
+
+        conn = self.get_read_connection()
+        try:
+            placeholders = ', '.join(['%s'] * len(regions))
+            query = f"""
+                SELECT region, rooms, SUM(valid_count) AS count
+                FROM house_rollup
+                WHERE region IN ({placeholders})
+                AND rooms != ''
+                GROUP BY region, rooms
+                HAVING count > 0
+                ORDER BY region, count DESC
+            """
+            return pd.read_sql(query, conn, params=list(regions))
+        finally:
+            conn.close()
+
+    def get_sample_listings(self, size: int = 1000) -> pd.DataFrame:
+        """随机抽样有效房源，用于散点图
+
+        按主键随机取ID，避免 ORDER BY RAND() 扫描全表。
+        """
+        conn = self.get_read_connection()
         try:
             with conn.cursor() as cursor:
-                query = "SELECT id FROM favorites WHERE user_id = %s AND house_id = %s"
-                cursor.execute(query, [user_id, house_id])
-                return cursor.fetchone() is not None
+                cursor.execute("SELECT MIN(id), MAX(id) FROM house_info")
+                min_id, max_id = cursor.fetchone()
+
+            if min_id is None:
+                return pd.DataFrame(columns=['title', 'rooms', 'region', 'price_numeric', 'area_numeric'])
+
+            # 多取一些ID，弥补空洞和无效数据
+            candidate_count = min(size * 2, max_id - min_id + 1)
+            ids = random.sample(range(min_id, max_id + 1), candidate_count)
+            placeholders = ', '.join(['%s'] * len(ids))
+            query = f"""
+                SELECT title, rooms, region,
+                       CAST(price AS UNSIGNED) AS price_numeric,
+                       CAST(area AS UNSIGNED) AS area_numeric
+                FROM house_info
+                WHERE id IN ({placeholders})
+                AND {VALID_LISTING_CONDITION}
+                LIMIT %s
+            """
+            return pd.read_sql(query, conn, params=ids + [size])
         finally:
             conn.close()
 
@@ -0,0 +1,356 @@
+"""
+数据库引擎工厂
+Flask-SQLAlchemy、DatabaseManager 和批处理脚本共用同一份连接配置：
+config.json 的 database 段提供默认值，环境变量可以覆盖（部署时不必修改配置文件）。
+
+环境变量:
+    HOUSE_CONFIG                配置文件路径，默认为项目目录下的 config.json
+    HOUSE_DB_HOST / HOUSE_DB_PORT / HOUSE_DB_USER / HOUSE_DB_PASSWORD / HOUSE_DB_NAME
+    HOUSE_DB_POOL_SIZE          每个引擎常驻的连接数
+    HOUSE_DB_MAX_OVERFLOW       高峰时允许额外创建的连接数
+    HOUSE_DB_POOL_TIMEOUT       等待空闲连接的最长时间（秒）
+    HOUSE_DB_POOL_RECYCLE       连接使用超过该时间（秒）后重建，需小于 MySQL 的 wait_timeout
+    HOUSE_DB_POOL_PRE_PING      借出连接前是否先 ping（1/0）
+    HOUSE_DB_STATEMENT_TIMEOUT  单条 SELECT 的最长执行时间（毫秒），0 表示不限制
+    HOUSE_DB_ISOLATION_LEVEL    事务隔离级别，如 READ COMMITTED
+    HOUSE_DB_REPLICAS           只读副本的连接地址，多个用逗号分隔（覆盖 config.json 的 replicas）
+    HOUSE_DB_MAX_REPLICA_LAG    副本延迟超过该秒数时不再路由读请求，改读主库
+    HOUSE_DB_STICKY_SECONDS     用户写入后该时间（秒）内的读请求仍走主库，保证读到自己的写入
+    HOUSE_READ_SNAPSHOT         本地只读 SQLite 快照文件（house_sqlite.py 导出），房源读请求直接查该文件
+    HOUSE_HISTORY_RETENTION_MONTHS  浏览记录明细保留的月数，更早的分区由 browse_retention.py 汇总后删除
+
+只读副本必须是 MySQL 实例（DatabaseManager 和路由会话会把任意 MySQL 查询发给副本）；
+SQLite 快照只能通过 read_snapshot 配置，仅承接房源相关的查询。
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote_plus
+
+import pymysql
+
+CONFIG_PATH = os.environ.get('HOUSE_CONFIG',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'))
+
+DEFAULT_DATABASE_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 3306,
+    'user': 'root',
+    'password': '',
+    'database': 'house',
+    'charset': 'utf8mb4',
+    'pool_size': 10,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 3600,
+    'pool_pre_ping': True,
+    'statement_timeout_ms': 30000,
+    'isolation_level': 'READ COMMITTED',
+    'replicas': [],
+    'max_replica_lag': 5,
+    'replica_check_interval': 5,
+    'sticky_seconds': 5,
+    'read_snapshot': '',
+    'history_retention_months': 6,
+    'history_future_partitions': 2
+}
+
+# 环境变量 -> (配置项, 类型)
+ENV_OVERRIDES = {
+    'HOUSE_DB_HOST': ('host', str),
+    'HOUSE_DB_PORT': ('port', int),
+    'HOUSE_DB_USER': ('user', str),
+    'HOUSE_DB_PASSWORD': ('password', str),
+    'HOUSE_DB_NAME': ('database', str),
+    'HOUSE_DB_POOL_SIZE': ('pool_size', int),
+    'HOUSE_DB_MAX_OVERFLOW': ('max_overflow', int),
+    'HOUSE_DB_POOL_TIMEOUT': ('pool_timeout', int),
+    'HOUSE_DB_POOL_RECYCLE': ('pool_recycle', int),
+    'HOUSE_DB_POOL_PRE_PING': ('pool_pre_ping', lambda v: v.lower() in ('1', 'true', 'yes')),
+    'HOUSE_DB_STATEMENT_TIMEOUT': ('statement_timeout_ms', int),
+    'HOUSE_DB_ISOLATION_LEVEL': ('isolation_level', str),
+    'HOUSE_DB_REPLICAS': ('replicas', lambda v: [url.strip() for url in v.split(',') if url.strip()]),
+    'HOUSE_DB_MAX_REPLICA_LAG': ('max_replica_lag', float),
+    'HOUSE_DB_STICKY_SECONDS': ('sticky_seconds', float),
+    'HOUSE_READ_SNAPSHOT': ('read_snapshot', str),
+    'HOUSE_HISTORY_RETENTION_MONTHS': ('history_retention_months', int)
+}
+
+READ_SNAPSHOT_BIND = 'read_snapshot'
+
+_config = None
+_engine = None
+_replica_engines = None
+_router = None
+
+
+def load_database_config(path: Optional[str] = None) -> Dict:
+    """读取数据库配置：默认值 < config.json 的 database 段 < 环境变量"""
+    global _config
+    if _config is not None and path is None:
+        return dict(_config)
+
+    config = dict(DEFAULT_DATABASE_CONFIG)
+    try:
+        with open(path or CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config.update(json.load(f).get('database', {}))
+    except FileNotFoundError:
+        pass
+
+    for env, (key, cast) in ENV_OVERRIDES.items():
+        value = os.environ.get(env)
+        if value is not None and value != '':
+            config[key] = cast(value)
+
+    for replica in config.get('replicas') or []:
+        if isinstance(replica, str) and not replica.startswith('mysql'):
+            raise ValueError(f"只读副本必须是 MySQL 连接地址（SQLite 快照请配置 read_snapshot）: {replica}")
+
+    if path is None:
+        _config = config
+    return dict(config)
+
+
+def _init_command(config: Dict) -> Optional[str]:
+    """连接建立后执行的会话设置（SELECT 超时）"""
+    if config.get('statement_timeout_ms'):
+        return f"SET SESSION max_execution_time = {int(config['statement_timeout_ms'])}"
+    return None
+
+
+def database_url(config: Optional[Dict] = None) -> str:
+    """SQLAlchemy 连接地址"""
+    config = config or load_database_config()
+    return (f"mysql+pymysql://{quote_plus(config['user'])}:{quote_plus(config['password'])}"
+            f"@{config['host']}:{config['port']}/{config['database']}?charset={config['charset']}")
+
+
+def replica_urls(config: Optional[Dict] = None) -> List[str]:
+    """只读副本的连接地址；replicas 中的字典表示在主库配置基础上覆盖 host/port 等字段"""
+    config = config or load_database_config()
+    urls = []
+    for replica in config.get('replicas') or []:
+        if isinstance(replica, dict):
+            urls.append(database_url({**config, **replica}))
+        else:
+            urls.append(replica)
+    return urls
+
+
+def read_snapshot_path(config: Optional[Dict] = None) -> Optional[str]:
+    """本地只读 SQLite 快照的绝对路径，未配置时返回 None（相对路径相对于项目目录）"""
+    config = config or load_database_config()
+    path = config.get('read_snapshot')
+    if not path:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def read_snapshot_url(path: str) -> str:
+    """只读快照的连接地址
+
+    以 immutable 方式打开：快照发布后不会再被修改（更新时整体替换文件），SQLite 可以跳过文件锁。
+    """
+    return f"sqlite:///file:{path.replace(os.sep, '/')}?immutable=1&uri=true"
+
+
+def engine_options(config: Optional[Dict] = None) -> Dict:
+    """create_engine / SQLALCHEMY_ENGINE_OPTIONS 使用的连接池和会话参数"""
+    config = config or load_database_config()
+    options = {
+        'pool_size': config['pool_size'],
+        'max_overflow': config['max_overflow'],
+        'pool_timeout': config['pool_timeout'],
+        'pool_recycle': config['pool_recycle'],
+        'pool_pre_ping': config['pool_pre_ping'],
+        'connect_args': {}
+    }
+    if config.get('isolation_level'):
+        options['isolation_level'] = config['isolation_level']
+    init_command = _init_command(config)
+    if init_command:
+        options['connect_args']['init_command'] = init_command
+    return options
+
+
+def configure_flask_app(app, config: Optional[Dict] = None):
+    """把连接配置写入 Flask-SQLAlchemy 的配置项
+
+    只读副本注册为 replica_0、replica_1 ... 等 bind，由路由会话选择使用。
+    配置了本地快照时另注册 read_snapshot bind。快照不使用连接池，每次查询重新打开文件，
+    导出任务替换文件后之后的查询自动读到新版本。
+
+    Returns:
+        副本 bind 名称列表（不含 read_snapshot）
+    """
+    config = config or load_database_config()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config)
+    binds = {}
+    for i, url in enumerate(replica_urls(config)):
+        binds[f'replica_{i}'] = {'url': url, **engine_options(config)}
+    snapshot = read_snapshot_path(config)
+    if snapshot:
+        from sqlalchemy.pool import NullPool
+        binds[READ_SNAPSHOT_BIND] = {'url': read_snapshot_url(snapshot), 'poolclass': NullPool}
+    app.config['SQLALCHEMY_BINDS'] = binds
+    return [key for key in binds if key != READ_SNAPSHOT_BIND]
+
+
+def get_engine():
+    """进程内共享的 SQLAlchemy 引擎（DatabaseManager 和批处理脚本使用）"""
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+        _engine = create_engine(database_url(), **engine_options())
+    return _engine
+
+
+def get_replica_engines():
+    """进程内共享的只读副本引擎列表，未配置副本时为空"""
+    global _replica_engines
+    if _replica_engines is None:
+        from sqlalchemy import create_engine
+        config = load_database_config()
+        _replica_engines = [create_engine(url, **engine_options(config)) for url in replica_urls(config)]
+    return _replica_engines
+
+
+def get_router():
+    """DatabaseManager 使用的副本路由器"""
+    global _router
+    if _router is None:
+        _router = ReplicaRouter(get_replica_engines)
+    return _router
+
+
+class ReplicaRouter:
+    """在健康的只读副本之间轮询分配读请求
+
+    每个副本的复制延迟按 replica_check_interval 缓存；延迟超过 max_replica_lag、
+    复制中断或无法连接的副本暂不使用。没有可用副本时 choose() 返回 None，由调用方改读主库。
+
+    Args:
+        engines: 返回副本引擎列表的函数（Flask-SQLAlchemy 的引擎需要在应用上下文中获取）
+    """
+
+    def __init__(self, engines, config: Optional[Dict] = None):
+        config = config or load_database_config()
+        self.engines = engines
+        self.max_lag = config['max_replica_lag']
+        self.check_interval = config['replica_check_interval']
+        self.sticky_seconds = config['sticky_seconds']
+        self._lock = threading.Lock()
+        self._status = {}  # engine.url -> (延迟秒数或 None, 检查时间)
+        self._counter = itertools.count()
+        self._last_write = {}  # 用户 -> 最近写入时间
+        self.fallbacks = 0
+
+    @staticmethod
+    def replica_lag(engine) -> Optional[float]:
+        """查询副本的复制延迟（秒）；复制中断或无法连接时返回 None
+
+        未配置复制的独立只读实例视为没有延迟。
+        """
+        from sqlalchemy import text
+
+        try:
+            with engine.connect() as conn:
+                for sql, column in (("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),
+                                    ("SHOW SLAVE STATUS", 'Seconds_Behind_Master')):
+                    try:
+                        row = conn.execute(text(sql)).mappings().first()
+                    except Exception:
+                        continue
+                    if row is None:
+                        return 0.0
+                    lag = row.get(column)
+                    return float(lag) if lag is not None else None
+        except Exception as e:
+            print(f"Replica check error ({engine.url.host}): {e}")
+        return None
+
+    def is_healthy(self, engine) -> bool:
+        key = str(engine.url)
+        now = time.monotonic()
+        with self._lock:
+            status = self._status.get(key)
+        if status is None or now - status[1] >= self.check_interval:
+            status = (self.replica_lag(engine), now)
+            with self._lock:
+                self._status[key] = status
+        lag = status[0]
+        return lag is not None and lag <= self.max_lag
+
+    def choose(self):
+        """选择一个健康的副本引擎，没有可用副本时返回 None"""
+        engines = self.engines()
+        if not engines:
+            return None
+        start = next(self._counter)
+        for i in range(len(engines)):
+            engine = engines[(start + i) % len(engines)]
+            if self.is_healthy(engine):
+                return engine
+        self.fallbacks += 1
+        return None
+
+    def record_write(self, key):
+        """记录用户的写入，之后 sticky_seconds 内该用户的读请求走主库"""
+        if key is not None:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._last_write) > 10000:
+                    self._last_write = {k: t for k, t in self._last_write.items()
+                                        if now - t < self.sticky_seconds}
+                self._last_write[key] = now
+
+    def is_sticky(self, key) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            written = self._last_write.get(key)
+            if written is not None and time.monotonic() - written >= self.sticky_seconds:
+                del self._last_write[key]
+                written = None
+        return written is not None
+
+    def get_stats(self) -> Dict:
+        """副本状态，用于监控
+
+        副本按配置顺序记为 replica-1、replica-2 ...，不返回连接地址（其中包含主机、用户名和密码）。
+        """
+        keys = [str(engine.url) for engine in self.engines()]
+        with self._lock:
+            replicas = {}
+            for i, key in enumerate(keys, 1):
+                if key in self._status:
+                    lag = self._status[key][0]
+                    replicas[f"replica-{i}"] = {'lag': lag, 'healthy': lag is not None and lag <= self.max_lag}
+            return {
+                'replicas': replicas,
+                'fallbacks': self.fallbacks,
+                'sticky_users': len(self._last_write)
+            }
+
+
+def connect(**overrides):
+    """按同一份配置直接建立一个不经过连接池的 PyMySQL 连接
+
+    用于需要特殊连接参数的批处理任务，例如不指定数据库先建库、开启 local_infile 等。
+    """
+    config = load_database_config()
+    params = {
+        'host': config['host'],
+        'port': config['port'],
+        'user': config['user'],
+        'password': config['password'],
+        'database': config['database'],
+        'charset': config['charset'],
+        'init_command': _init_command(config)
+    }
+    params.update(overrides)
+    return pymysql.connect(**params)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户收藏集合缓存
+每个用户的收藏房源ID集合缓存在进程内存中，收藏状态检查直接查集合，不再访问数据库。
+
+失效规则:
+  - 本进程内的收藏写入直接使该用户的缓存失效
+  - 多进程部署时，写入请求在用户会话中记录写入时间，其他进程发现缓存早于该时间时重新加载
+  - 其他途径（后台脚本等）的修改最迟在 ttl 秒后生效
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable
+
+
+class FavoriteCache:
+    """按用户缓存收藏的房源ID集合（线程安全，超过 max_users 时淘汰最久未使用的用户）
+
+    Args:
+        loader: 从数据库加载某个用户全部收藏房源ID的函数
+        ttl: 缓存有效期（秒）
+        max_users: 最多缓存的用户数
+    """
+
+    def __init__(self, loader: Callable[[int], Iterable[int]], ttl: float = 300, max_users: int = 10000):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (房源ID集合, 加载时间)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, changed_at: float = 0) -> FrozenSet[int]:
+        """获取用户的收藏集合
+
+        Args:
+            user_id: 用户ID
+            changed_at: 该用户最近一次修改收藏的时间（time.time()），缓存早于该时间时重新加载
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > changed_at and now - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 加载时不持有锁，同一用户的并发加载结果相同，后写入的覆盖先写入的
+        house_ids = frozenset(self.loader(user_id))
+        with self._lock:
+            self._entries[user_id] = (house_ids, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return house_ids
+
+    def contains(self, user_id: int, house_id: int, changed_at: float = 0) -> bool:
+        return house_id in self.get(user_id, changed_at)
+
+    def invalidate(self, user_id: int):
+        """用户修改收藏后调用"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def get_stats(self) -> Dict:
+        """缓存命中情况，用于监控"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'users': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0
+            }
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大规模模拟数据生成工具
+按接近真实的区域/价格/面积/户型分布生成 house_info、users、favorites、browse_history 数据，
+用于在本地以生产规模（500万~1000万房源）测试各项性能优化
+
+数据通过 LOAD DATA LOCAL INFILE（默认）或多行 INSERT 批量导入，指定 --seed 可复现同一份数据
+
+用法:
+    python generate_dataset.py --houses 5000000 --users 200000 --seed 42
+    python generate_dataset.py --houses 100000 --method insert --truncate
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+
+from add_test_coordinates import BEIJING_REGIONS
+from db_engine import connect, load_database_config
+from migrate import apply_migrations
+
+# 各区域房源占比
+REGION_WEIGHTS = {
+    '朝阳区': 0.30,
+    '海淀区': 0.22,
+    '丰台区': 0.18,
+    '西城区': 0.10,
+    '东城区': 0.08,
+    '石景山区': 0.12
+}
+
+# 各区域整租单价（元/㎡/月）
+REGION_UNIT_PRICE = {
+    '朝阳区': 120,
+    '海淀区': 130,
+    '丰台区': 90,
+    '西城区': 150,
+    '东城区': 140,
+    '石景山区': 80
+}
+
+# 户型: (占比, 整租面积中位数㎡)
+ROOM_LAYOUTS = {
+    '1室0厅1卫': (0.07, 30),
+    '1室1厅1卫': (0.25, 48),
+    '2室1厅1卫': (0.35, 72),
+    '3室1厅1卫': (0.15, 95),
+    '3室2厅2卫': (0.08, 125),
+    '4室2厅2卫': (0.07, 160),
+    '5室2厅3卫': (0.03, 220)
+}
+
+RENT_TYPES = {'整租': 0.55, '合租主卧': 0.20, '合租次卧': 0.25}
+
+DIRECTIONS = {'南': 0.30, '南北': 0.25, '东南': 0.10, '西南': 0.08, '东': 0.10, '西': 0.07, '北': 0.10}
+
+FACILITIES = ['洗衣机', '空调', '衣柜', '电视', '冰箱', '热水器', '床', '暖气', '宽带', '天然气']
+
+SUBWAY_LINES = ['1号线', '2号线', '4号线', '5号线', '6号线', '10号线', '13号线', '14号线', '15号线', '八通线']
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 MicroMessenger/8.0',
+    'Mozilla/5.0 (Linux; Android 13; Mi 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Mobile Safari/537.36',
+]
+
+HOUSE_COLUMNS = ['id', 'title', 'rooms', 'area', 'price', 'direction', 'rent_type', 'region', 'block',
+                 'address', 'traffic', 'publish_time', 'facilities', 'highlights', 'matching', 'travel',
+                 'page_views', 'landlord', 'phone_num', 'house_num', 'latitude', 'longitude']
+USER_COLUMNS = ['id', 'username', 'email', 'password_hash', 'created_at']
+FAVORITE_COLUMNS = ['user_id', 'house_id', 'created_at']
+HISTORY_COLUMNS = ['user_id', 'house_id', 'ip_address', 'visit_time', 'user_agent_id']
+
+# 迁移之前的基础表（与 house.sql + add_location_fields.sql、app.py 的 User 模型一致）；
+# 其余的表、索引和触发器都由 migrations/ 创建，结构只有迁移文件一个来源
+BASE_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS house_info (
+        id INT PRIMARY KEY,
+        title VARCHAR(100), rooms VARCHAR(100), area VARCHAR(100), price VARCHAR(100),
+        direction VARCHAR(100), rent_type VARCHAR(100), region VARCHAR(100), block VARCHAR(100),
+        address VARCHAR(200), traffic VARCHAR(100), publish_time INT,
+        facilities TEXT, highlights TEXT, matching TEXT, travel TEXT,
+        page_views INT, landlord VARCHAR(30), phone_num VARCHAR(100), house_num VARCHAR(100),
+        latitude DECIMAL(10, 8) NULL, longitude DECIMAL(11, 8) NULL,
+        INDEX idx_location (latitude, longitude)
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(80) NOT NULL UNIQUE,
+        email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        created_at DATETIME
+    ) DEFAULT CHARSET=utf8mb4
+    """
+]
+
+# 测试账号的统一密码
+DEFAULT_PASSWORD = 'password123'
+
+
+def weighted_choice(rng, options, size):
+    """按占比从字典的键中抽样，返回下标数组和选项列表"""
+    keys = list(options.keys())
+    weights = np.array([options[k] if not isinstance(options[k], tuple) else options[k][0] for k in keys])
+    return rng.choice(len(keys), size=size, p=weights / weights.sum()), keys
+
+
+class BlockPool:
+    """每个区域的小区池，同一小区的房源坐标集中在小区中心附近"""
+
+    def __init__(self, rng, houses):
+        self.names = {}
+        self.centers = {}
+        for region, data in BEIJING_REGIONS.items():
+            # 平均每个小区约40套房源
+            count = max(1, int(houses * REGION_WEIGHTS[region] / 40))
+            short = region.rstrip('区')
+            self.names[region] = [f"{short}{i}号小区" for i in range(1, count + 1)]
+            lat = rng.uniform(*data['lat_range'], size=count)
+            lng = rng.uniform(*data['lng_range'], size=count)
+            self.centers[region] = np.column_stack([lat, lng])
+
+
+def generate_houses(rng, blocks, start_id, count, now_ts):
+    """生成一批房源记录"""
+    regions = list(REGION_WEIGHTS.keys())
+    region_idx, _ = weighted_choice(rng, REGION_WEIGHTS, count)
+    room_idx, room_keys = weighted_choice(rng, ROOM_LAYOUTS, count)
+    rent_idx, rent_keys = weighted_choice(rng, RENT_TYPES, count)
+    dir_idx, dir_keys = weighted_choice(rng, DIRECTIONS, count)
+
+    median_area = np.array([ROOM_LAYOUTS[k][1] for k in room_keys])[room_idx]
+    is_shared = np.array([k != '整租' for k in rent_keys])[rent_idx]
+
+    # 面积与价格均服从对数正态分布；合租按单间计算面积，单价略高
+    area = np.where(is_shared,
+                    rng.lognormal(np.log(15), 0.25, count),
+                    rng.lognormal(np.log(median_area), 0.2, count))
+    area = np.clip(np.round(area), 8, 500).astype(np.int64)
+    unit_price = np.array([REGION_UNIT_PRICE[r] for r in regions])[region_idx]
+    unit_price = unit_price * np.where(is_shared, 1.6, 1.0) * rng.lognormal(0, 0.2, count)
+    price = np.clip(np.round(area * unit_price / 100) * 100, 500, 99900).astype(np.int64)
+
+    # 发布时间集中在最近两年，越近越多
+    age_days = np.minimum(rng.exponential(180, count), 730)
+    publish_time = (now_ts - age_days * 86400).astype(np.int64)
+    page_views = rng.zipf(1.8, count).clip(max=100000) - 1
+    landlord_idx = rng.integers(0, 1000, count)
+    phone_tail = rng.integers(0, 100000000, count)
+    facility_masks = rng.random((count, len(FACILITIES))) < 0.6
+    subway_idx = rng.integers(0, len(SUBWAY_LINES), count)
+    subway_dist = rng.integers(100, 2000, count)
+    building = rng.integers(1, 30, count)
+
+    # 小区在所属区域的小区池中均匀抽取，坐标在小区中心附近小幅抖动
+    block_counts = np.array([len(blocks.names[r]) for r in regions])
+    block_idx = (rng.random(count) * block_counts[region_idx]).astype(np.int64)
+    jitter = rng.normal(0, 0.0008, (count, 2))
+
+    rows = []
+    for i in range(count):
+        region = regions[region_idx[i]]
+        b = block_idx[i]
+        block = blocks.names[region][b]
+        lat, lng = blocks.centers[region][b] + jitter[i]
+        rooms = room_keys[room_idx[i]]
+        rent_type = rent_keys[rent_idx[i]]
+        direction = dir_keys[dir_idx[i]]
+        house_id = start_id + i
+
+        rows.append((
+            house_id,
+            f"{rent_type}·{block} {rooms} {direction}",
+            rooms,
+            str(area[i]),
+            str(price[i]),
+            direction,
+            rent_type,
+            region,
+            block,
+            f"{region}{block}{building[i]}号楼",
+            f"距{SUBWAY_LINES[subway_idx[i]]}{subway_dist[i]}米",
+            int(publish_time[i]),
+            '-'.join(f for f, on in zip(FACILITIES, facility_masks[i]) if on),
+            f"{block}{rooms}，{direction}向，拎包入住",
+            f"超市：{block}底商\n医院：{region}社区医院",
+            f"步行{subway_dist[i] // 80 + 1}分钟到{SUBWAY_LINES[subway_idx[i]]}",
+            int(page_views[i]),
+            f"经纪人{landlord_idx[i]:03d}",
+            f"13{phone_tail[i]:09d}",
+            f"BJ{house_id:010d}",
+            round(float(lat), 8),
+            round(float(lng), 8)
+        ))
+    return rows
+
+
+def generate_users(start_id, count, password_hash, rng, now):
+    """生成一批用户记录"""
+    days = rng.integers(0, 730, count)
+    return [
+        (user_id, f"user{user_id}", f"user{user_id}@example.com", password_hash,
+         now - timedelta(days=int(d)))
+        for user_id, d in zip(range(start_id, start_id + count), days)
+    ]
+
+
+def popular_house_ids(rng, total_houses, size):
+    """按热度抽样房源ID：90%均匀分布，10%集中在按Zipf分布排名的热门房源上"""
+    uniform = rng.integers(1, total_houses + 1, size)
+    # 用一个大质数打散排名，避免热门房源都集中在小ID上
+    ranks = rng.zipf(1.1, size) - 1
+    hot = (ranks * 2654435761) % total_houses + 1
+    return np.where(rng.random(size) < 0.1, hot, uniform)
+
+
+def generate_favorites(rng, user_ids, total_houses, mean_per_user, now):
+    """生成一批收藏记录，同一用户不会重复收藏同一房源"""
+    counts = rng.geometric(1.0 / (mean_per_user + 1), len(user_ids)) - 1
+    rows = []
+    for user_id, count in zip(user_ids, counts):
+        if count == 0:
+            continue
+        house_ids = np.unique(popular_house_ids(rng, total_houses, count))
+        days = rng.integers(0, 365, len(house_ids))
+        rows.extend((int(user_id), int(h), now - timedelta(days=int(d))) for h, d in zip(house_ids, days))
+    return rows
+
+
+def generate_history(rng, total_users, total_houses, count, now, ua_ids):
+    """生成一批浏览记录，约30%为匿名浏览
+
+    Args:
+        ua_ids: USER_AGENTS 中每一项在 user_agents 表中的ID
+    """
+    anonymous = rng.random(count) < 0.3
+    user_ids = rng.integers(1, total_users + 1, count) if total_users else np.zeros(count, dtype=np.int64)
+    house_ids = popular_house_ids(rng, total_houses, count)
+    seconds = rng.integers(0, 180 * 86400, count)
+    ips = rng.integers(0, 2 ** 24, count)
+    ua_idx = rng.integers(0, len(ua_ids), count)
+    return [
+        (None if anonymous[i] or not total_users else int(user_ids[i]),
+         int(house_ids[i]),
+         f"10.{ips[i] >> 16}.{(ips[i] >> 8) & 255}.{ips[i] & 255}",
+         now - timedelta(seconds=int(seconds[i])),
+         ua_ids[ua_idx[i]])
+        for i in range(count)
+    ]
+
+
+def escape_field(value):
+    """按 LOAD DATA 默认格式转义字段"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class BulkLoader:
+    """把生成的数据批量导入MySQL"""
+
+    def __init__(self, conn, method, insert_batch=5000):
+        self.conn = conn
+        self.method = method
+        self.insert_batch = insert_batch
+        self.tmp_dir = tempfile.mkdtemp(prefix='house_dataset_')
+
+    def load(self, table, columns, rows):
+        if not rows:
+            return
+        if self.method == 'load':
+            self._load_data(table, columns, rows)
+        else:
+            self._insert(table, columns, rows)
+
+    def _load_data(self, table, columns, rows):
+        path = os.path.join(self.tmp_dir, f"{table}.tsv")
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            for row in rows:
+                f.write('\t'.join(escape_field(v) for v in row))
+                f.write('\n')
+
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                f"({', '.join(columns)})",
+                [path]
+            )
+        self.conn.commit()
+        os.remove(path)
+
+    def _insert(self, table, columns, rows):
+        # PyMySQL 会把 INSERT ... VALUES 的 executemany 合并成多行 INSERT
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        with self.conn.cursor() as cursor:
+            for start in range(0, len(rows), self.insert_batch):
+                cursor.executemany(sql, rows[start:start + self.insert_batch])
+        self.conn.commit()
+
+
+def register_user_agents(conn):
+    """把 USER_AGENTS 写入 user_agents 维度表，返回对应的ID列表"""
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            "INSERT IGNORE INTO user_agents (ua_hash, user_agent) VALUES (SHA1(%s), %s)",
+            [(ua, ua) for ua in USER_AGENTS]
+        )
+        ids = []
+        for ua in USER_AGENTS:
+            cursor.execute("SELECT id FROM user_agents WHERE ua_hash = SHA1(%s)", (ua,))
+            ids.append(cursor.fetchone()[0])
+    conn.commit()
+    return ids
+
+
+def prepare_schema(conn, truncate):
+    """创建基础表并执行 migrations/ 中的迁移，可选清空已有数据
+
+    迁移在导入数据之前执行，计数触发器和统计汇总触发器随数据导入维护 user_counters、house_rollup 等表。
+    不清空时，已有房源在本次安装汇总触发器之前的部分需要导入后运行 house_rollup.py 等脚本全量重建。
+    """
+    with conn.cursor() as cursor:
+        for sql in BASE_SCHEMA_SQL:
+            cursor.execute(sql)
+    conn.commit()
+    executed = apply_migrations(conn)
+    if executed:
+        print(f"已执行迁移: {', '.join(f'{version:04d}' for version in executed)}")
+
+    with conn.cursor() as cursor:
+        if truncate:
+            # TRUNCATE 不触发计数触发器和统计汇总触发器，计数表和汇总表一并清空，导入时由触发器重新累计
+            for table in ('browse_history', 'favorites', 'user_counters', 'user_daily_views', 'users', 'house_info',
+                          'house_changes', 'house_rollup', 'house_price_histogram', 'house_area_histogram',
+                          'house_rent_trend', 'house_price_sketch'):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+    conn.commit()
+
+
+def generate_dataset(conn, houses, users, favorites_per_user, history, seed=None,
+                     method='load', chunk_size=100000):
+    """生成并导入全部模拟数据"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(microsecond=0)
+    now_ts = int(now.timestamp())
+    loader = BulkLoader(conn, method)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM house_info")
+        house_offset = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+        user_offset = cursor.fetchone()[0]
+
+    total_houses = house_offset + houses
+    total_users = user_offset + users
+
+    # 1. 房源
+    start = time.time()
+    blocks = BlockPool(rng, houses)
+    for offset in range(0, houses, chunk_size):
+        count = min(chunk_size, houses - offset)
+        loader.load('house_info', HOUSE_COLUMNS,
+                    generate_houses(rng, blocks, house_offset + offset + 1, count, now_ts))
+        print(f"房源: {offset + count:,}/{houses:,} ({time.time() - start:.0f}s)")
+
+    # 2. 用户（所有测试账号使用同一密码，只计算一次哈希）
+    password_hash = generate_password_hash(DEFAULT_PASSWORD)
+    for offset in range(0, users, chunk_size):
+        count = min(chunk_size, users - offset)
+        loader.load('users', USER_COLUMNS,
+                    generate_users(user_offset + offset + 1, count, password_hash, rng, now))
+        print(f"用户: {offset + count:,}/{users:,}")
+
+    # 3. 收藏
+    favorite_count = 0
+    for offset in range(0, users, chunk_size):
+        user_ids = np.arange(user_offset + offset + 1, user_offset + min(offset + chunk_size, users) + 1)
+        rows = generate_favorites(rng, user_ids, total_houses, favorites_per_user, now)
+        loader.load('favorites', FAVORITE_COLUMNS, rows)
+        favorite_count += len(rows)
+        print(f"收藏: {favorite_count:,} 条")
+
+    # 4. 浏览记录（导入后运行 browse_retention.py 按月拆分分区）
+    ua_ids = register_user_agents(conn)
+    for offset in range(0, history, chunk_size):
+        count = min(chunk_size, history - offset)
+        loader.load('browse_history', HISTORY_COLUMNS,
+                    generate_history(rng, total_users, total_houses, count, now, ua_ids))
+        print(f"浏览记录: {offset + count:,}/{history:,}")
+
+    return {
+        'houses': houses,
+        'users': users,
+        'favorites': favorite_count,
+        'history': history,
+        'elapsed': time.time() - start
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='大规模模拟数据生成工具')
+    parser.add_argument('--houses', type=int, default=1000000, help='房源数量')
+    parser.add_argument('--users', type=int, default=50000, help='用户数量')
+    parser.add_argument('--favorites-per-user', type=float, default=5, help='平均每个用户的收藏数')
+    parser.add_argument('--history', type=int, default=2000000, help='浏览记录数量')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子，相同种子生成相同数据')
+    parser.add_argument('--method', choices=['load', 'insert'], default='load',
+                        help='load: LOAD DATA LOCAL INFILE; insert: 多行INSERT')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='每批生成的记录数')
+    parser.add_argument('--truncate', action='store_true', help='导入前清空已有数据（含计数表和统计汇总表）')
+    db_config = load_database_config()
+    parser.add_argument('--host', default=db_config['host'])
+    parser.add_argument('--port', type=int, default=db_config['port'])
+    parser.add_argument('--user', default=db_config['user'])
+    parser.add_argument('--password', default=db_config['password'])
+    parser.add_argument('--database', default='house_bench', help='目标数据库，默认使用独立的压测库')
+    parser.add_argument('--force', action='store_true', help='允许写入业务库 house')
+    args = parser.parse_args()
+
+    if args.database == 'house' and not args.force:
+        parser.error('写入业务库 house 需要加 --force 参数')
+
+    conn = connect(host=args.host, port=args.port, user=args.user, password=args.password,
+                   database=None, local_infile=args.method == 'load')
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` DEFAULT CHARSET utf8mb4")
+        conn.select_db(args.database)
+        prepare_schema(conn, args.truncate)
+
+        print(f"=== 模拟数据生成: {args.database} ===")
+        stats = generate_dataset(conn, args.houses, args.users, args.favorites_per_user, args.history,
+                                 seed=args.seed, method=args.method, chunk_size=args.chunk_size)
+    finally:
+        conn.close()
+
+    print()
+    print(f"✅ 生成完成，用时 {stats['elapsed']:.0f} 秒")
+    print(f"   房源 {stats['houses']:,} 条, 用户 {stats['users']:,} 个, "
+          f"收藏 {stats['favorites']:,} 条, 浏览记录 {stats['history']:,} 条")
+    print(f"   测试账号密码: {DEFAULT_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+"看过此房源的用户还看了"推荐表
+从最近 days 天的 browse_history 统计房源两两之间的共同访客数（同一登录用户，匿名访客按IP），
+每套房源只保留相似度最高的 top_k 套，写入 house_covisit 表（每套房源一行，邻居ID用逗号分隔）。
+房源详情页只需按主键读取一行，不在请求中做任何统计。
+
+计算方式（NumPy 向量化）:
+  - 流式读取浏览记录，去重为 (访客, 房源) 对，按访客排序
+  - 按访客分批展开同一访客浏览过的房源对，每批 np.unique 计数后合并，内存占用与批大小成正比
+  - 浏览房源过多的访客（多为爬虫）不参与统计，避免 n² 个房源对
+  - 相似度为余弦相似度：共同访客数 / sqrt(访客数A × 访客数B)，抑制热门房源与所有房源都相似
+
+结果写入临时表后 RENAME 原子替换，构建期间详情页继续读旧数据。建议每天运行一次，
+运行后重新导出 SQLite 快照（house_sqlite.py）使各节点读到新的推荐表。
+
+用法:
+    python house_covisit.py                   # 最近90天，每套房源保留10个
+    python house_covisit.py --days 30 --top-k 20
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pymysql
+
+from db_engine import connect
+
+DEFAULT_DAYS = 90
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 20  # neighbor_ids 为 VARCHAR(255)
+
+# 共同访客少于该值的房源对视为偶然，不作推荐
+DEFAULT_MIN_COVISITS = 2
+
+# 浏览过超过该数量房源的访客不参与统计
+MAX_HOUSES_PER_VISITOR = 200
+
+CHUNK_SIZE = 100000
+
+# 每批展开的房源对数量上限
+PAIR_BATCH_SIZE = 20000000
+
+LOAD_VISITS_SQL = """
+    SELECT COALESCE(CONCAT('u', user_id), CONCAT('ip', ip_address)), house_id
+    FROM browse_history
+    WHERE visit_time >= %s AND (user_id IS NOT NULL OR ip_address IS NOT NULL)
+"""
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE {table} (
+        house_id INT PRIMARY KEY,
+        neighbor_ids VARCHAR(255) NOT NULL
+    ) DEFAULT CHARSET=utf8mb4
+"""
+
+
+def load_visits(source, since):
+    """流式读取 since 之后的浏览记录
+
+    Returns:
+        (访客编号数组, 房源ID数组)，(访客, 房源) 去重并按访客排序
+    """
+    visitor_index = {}
+    visitor_parts, house_parts = [], []
+    cursor = source.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(LOAD_VISITS_SQL, (since,))
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            visitor_parts.append(np.fromiter(
+                (visitor_index.setdefault(visitor, len(visitor_index)) for visitor, _ in rows),
+                dtype=np.int64, count=len(rows)))
+            house_parts.append(np.fromiter((house_id for _, house_id in rows), dtype=np.int64, count=len(rows)))
+    finally:
+        cursor.close()
+
+    if not visitor_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    visitors = np.concatenate(visitor_parts)
+    houses = np.concatenate(house_parts)
+    modulus = int(houses.max()) + 1
+    keys = np.unique(visitors * modulus + houses)
+    return keys // modulus, keys % modulus
+
+
+def _segment_offsets(lengths):
+    """每个元素在所属分段内的序号，如 [2, 3] -> [0, 1, 0, 1, 2]"""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+
+
+def _merge_counts(parts):
+    """合并多批 (房源对编码, 次数)，相同编码的次数相加"""
+    keys = np.concatenate([part[0] for part in parts])
+    counts = np.concatenate([part[1] for part in parts])
+    order = np.argsort(keys, kind='stable')
+    keys, counts = keys[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(counts, starts)
+
+
+def count_pairs(visitors, houses, max_houses=MAX_HOUSES_PER_VISITOR, batch_size=PAIR_BATCH_SIZE):
+    """统计每对房源的共同访客数
+
+    Args:
+        visitors, houses: load_visits() 的结果
+        max_houses: 浏览过的房源超过该数量的访客不参与统计
+        batch_size: 每批展开的房源对数量上限
+
+    Returns:
+        (房源对编码 A * modulus + B, 共同访客数, modulus)，A、B 两个方向各一条
+    """
+    if len(houses) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 1
+    modulus = int(houses.max()) + 1
+
+    starts = np.flatnonzero(np.r_[True, visitors[1:] != visitors[:-1]])
+    sizes = np.diff(np.r_[starts, len(visitors)])
+    keep = (sizes >= 2) & (sizes <= max_houses)
+    starts, sizes = starts[keep], sizes[keep]
+
+    # 按展开后的房源对数量把访客分批
+    pair_totals = np.cumsum(sizes * sizes)
+    parts = []
+    pending = 0
+    begin = 0
+    while begin < len(starts):
+        base = pair_totals[begin - 1] if begin else 0
+        end = max(int(np.searchsorted(pair_totals, base + batch_size, side='right')), begin + 1)
+        group_starts, group_sizes = starts[begin:end], sizes[begin:end]
+
+        # 每个访客的每个房源与该访客的全部房源配对
+        first = np.repeat(group_starts, group_sizes)
+        elements = first + _segment_offsets(group_sizes)
+        repeats = np.repeat(group_sizes, group_sizes)
+        left = np.repeat(houses[elements], repeats)
+        right = houses[np.repeat(first, repeats) + _segment_offsets(repeats)]
+        mask = left != right
+        keys, counts = np.unique(left[mask] * modulus + right[mask], return_counts=True)
+        parts.append((keys, counts))
+
+        # 累积的批次过多时提前合并，控制内存
+        pending += len(keys)
+        if pending > batch_size:
+            parts = [_merge_counts(parts)]
+            pending = len(parts[0][0])
+        begin = end
+
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), modulus
+    keys, counts = _merge_counts(parts)
+    return keys, counts, modulus
+
+
+def top_neighbors(houses, keys, counts, modulus, top_k=DEFAULT_TOP_K, min_covisits=DEFAULT_MIN_COVISITS):
+    """每套房源相似度最高的 top_k 套房源
+
+    Returns:
+        {房源ID: [邻居房源ID, ...]}，按相似度降序
+    """
+    mask = counts >= min_covisits
+    if not mask.any():
+        return {}
+    popularity = np.bincount(houses, minlength=modulus).astype(np.float64)
+    source, target, covisits = keys[mask] // modulus, keys[mask] % modulus, counts[mask]
+    score = covisits / np.sqrt(popularity[source] * popularity[target])
+
+    # 按房源分组，组内按相似度、共同访客数、房源ID排序
+    order = np.lexsort((target, -covisits, -score, source))
+    source, target = source[order], target[order]
+    starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]])
+    ranks = _segment_offsets(np.diff(np.r_[starts, len(source)]))
+    keep = ranks < top_k
+    source, target = source[keep], target[keep]
+
+    neighbors = {}
+    bounds = np.flatnonzero(np.r_[True, source[1:] != source[:-1], True])
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        neighbors[int(source[begin])] = target[begin:end].tolist()
+    return neighbors
+
+
+def write_table(conn, neighbors):
+    """写入临时表后原子替换 house_covisit"""
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS house_covisit_new")
+        cursor.execute(CREATE_TABLE_SQL.format(table='house_covisit_new'))
+        rows = [(house_id, ','.join(map(str, ids))) for house_id, ids in neighbors.items()]
+        for start in range(0, len(rows), 5000):
+            cursor.executemany("INSERT INTO house_covisit_new (house_id, neighbor_ids) VALUES (%s, %s)",
+                               rows[start:start + 5000])
+        conn.commit()
+        cursor.execute("CREATE TABLE IF NOT EXISTS house_covisit LIKE house_covisit_new")
+        cursor.execute("RENAME TABLE house_covisit TO house_covisit_old, house_covisit_new TO house_covisit")
+        cursor.execute("DROP TABLE house_covisit_old")
+
+
+def build_covisit(days=DEFAULT_DAYS, top_k=DEFAULT_TOP_K, min_covisits=DEFAULT_MIN_COVISITS):
+    """从最近 days 天的浏览记录重建 house_covisit
+
+    Returns:
+        统计信息字典（visits/pairs/houses）
+    """
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k 需在 1~{MAX_TOP_K} 之间")
+    since = datetime.utcnow() - timedelta(days=days)
+
+    # 流式读取耗时较长，不使用语句超时
+    conn = connect(init_command=None)
+    try:
+        visitors, houses = load_visits(conn, since)
+        keys, counts, modulus = count_pairs(visitors, houses)
+        neighbors = top_neighbors(houses, keys, counts, modulus, top_k, min_covisits)
+        write_table(conn, neighbors)
+    finally:
+        conn.close()
+    return {'visits': len(houses), 'pairs': len(keys), 'houses': len(neighbors)}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='构建"看过此房源的用户还看了"推荐表')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='统计最近多少天的浏览记录')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='每套房源保留的推荐数')
+    parser.add_argument('--min-covisits', type=int, default=DEFAULT_MIN_COVISITS, help='最少共同访客数')
+    args = parser.parse_args()
+
+    start = time.time()
+    stats = build_covisit(args.days, args.top_k, args.min_covisits)
+    print(f"✅ 推荐表已更新: {stats['visits']:,} 条去重浏览, {stats['pairs']:,} 个房源对, "
+          f"{stats['houses']:,} 套房源有推荐, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
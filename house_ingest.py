@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+房源批量导入
+流式读取爬虫输出（CSV 或 JSON Lines，字段名与 house_info 的列名一致），规范化后按房源编号
+（house_num）批量 upsert 到 house_info。规范化规则:
+  - 租金：'3500元/月' -> '3500'，'1.2万' -> '12000'，'3000-3500' 取下限；'面议' 原样保留
+  - 面积：'89.5㎡'、'89.5平米' -> '90'
+  - 户型：'2室1厅1卫'、'两室一厅'、'2房1厅'、'2-1-1'、'2居' 统一为 'N室N厅N卫' 的形式，'开间' -> '1室0厅'
+  - 发布时间：Unix 时间戳（秒或毫秒）、'2024-05-01 12:00'、'05-01'、'3天前'、'昨天' -> Unix 时间戳（秒）
+  - 文本去掉首尾空白，空串记为 NULL，超过列宽的部分截断；设施列表用 '-' 连接
+
+每批（默认 5000 条）先按编号查出已有房源，与规范化后的记录逐列比较:
+  - 新房源插入（ID 由 AUTO_INCREMENT 分配），内容有变化的房源更新，内容相同的跳过（不写库、不触发触发器）
+  - 记录中缺失的字段不覆盖已有值；地址或小区变化且没有给出新坐标时清空坐标，等待重新地理编码
+  - 插入和更新由一条 INSERT ... ON DUPLICATE KEY UPDATE 完成，语句中不带 id，只按编号的唯一约束
+    匹配已有房源；写入后按编号读回房源ID，同一批的变更事件写入 house_changes，每批一个事务
+
+下游按 house_changes 的事件ID水位线只刷新受影响的房源：house_snapshot.py 增量刷新时就地更新
+修改过的房源；导入结束后对变更的房源执行订阅匹配（saved_search.match_house_ids）。
+同一时间只允许一个导入进程（GET_LOCK），避免两个导入交错合并同一房源。
+
+用法:
+    python house_ingest.py listings.jsonl
+    python house_ingest.py listings.csv --batch-size 2000
+    cat listings.jsonl | python house_ingest.py - --format jsonl
+    python house_ingest.py listings.csv --dry-run      # 只规范化和统计，不写库
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pymysql
+
+from db_engine import connect
+
+# 导入时写入的列（id 由 AUTO_INCREMENT 分配，page_views 由站内浏览累计，均不从爬虫数据更新）
+INGEST_COLUMNS = ('house_num', 'title', 'rooms', 'area', 'price', 'direction', 'rent_type', 'region',
+                  'block', 'address', 'traffic', 'publish_time', 'facilities', 'highlights', 'matching',
+                  'travel', 'landlord', 'phone_num', 'latitude', 'longitude')
+
+# 文本列的最大长度（与 house_info 的列宽一致），TEXT 列不限
+COLUMN_LIMITS = {
+    'house_num': 100, 'title': 100, 'rooms': 100, 'area': 100, 'price': 100, 'direction': 100,
+    'rent_type': 100, 'region': 100, 'block': 100, 'address': 200, 'traffic': 100,
+    'facilities': None, 'highlights': None, 'matching': None, 'travel': None,
+    'landlord': 30, 'phone_num': 100
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+LOCK_NAME = 'house_ingest'
+
+UPSERT_SQL = (
+    f"INSERT INTO house_info (page_views, {', '.join(INGEST_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * (len(INGEST_COLUMNS) + 1))}) "
+    f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in INGEST_COLUMNS)}"
+)
+
+CHANGE_SQL = "INSERT INTO house_changes (house_id, change_type, changed_at) VALUES (%s, %s, %s)"
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_CN_DIGITS = {'零': '0', '〇': '0', '一': '1', '二': '2', '两': '2', '三': '3', '四': '4',
+              '五': '5', '六': '6', '七': '7', '八': '8', '九': '9', '十': '10'}
+_LAYOUT = re.compile(r'(\d+)\s*[室房](?:\s*(\d+)\s*厅)?(?:\s*(\d+)\s*卫)?')
+_LAYOUT_DASHED = re.compile(r'^(\d+)-(\d+)(?:-(\d+))?$')
+_LAYOUT_JU = re.compile(r'(\d+)\s*居')
+_RELATIVE_TIME = re.compile(r'(\d+)\s*(分钟|小时|天|周|个月)前')
+_RELATIVE_UNITS = {'分钟': timedelta(minutes=1), '小时': timedelta(hours=1), '天': timedelta(days=1),
+                   '周': timedelta(weeks=1), '个月': timedelta(days=30)}
+_DAY_WORDS = {'今天': 0, '昨天': 1, '前天': 2}
+_DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S',
+                     '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y/%m/%d', '%Y年%m月%d日', '%Y.%m.%d')
+_MONTH_DAY_FORMATS = ('%m-%d', '%m月%d日', '%m/%d')
+
+
+def clean_text(value, limit: Optional[int] = None) -> Optional[str]:
+    """去掉首尾空白，空串记为 None；列表用 '-' 连接；按列宽截断"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = '-'.join(str(item).strip() for item in value if str(item).strip())
+    text = str(value).strip()
+    if not text:
+        return None
+    return text[:limit] if limit else text
+
+
+def _leading_number(text: str):
+    """第一个数字及其之后的文本，没有数字时返回 (None, '')"""
+    match = _NUMBER.search(text.replace(',', '').replace('，', ''))
+    if not match:
+        return None, ''
+    return float(match.group(0)), match.string[match.end():]
+
+
+def normalize_price(value) -> Optional[str]:
+    """月租金规范化为整数元的字符串；'面议' 原样保留，无法识别时为 None"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    number, rest = _leading_number(text)
+    if number is None:
+        return '面议' if '面议' in text else None
+    if rest.lstrip().startswith('万'):
+        number *= 10000
+    price = int(number + 0.5)
+    return str(price) if price > 0 else None
+
+
+def normalize_area(value) -> Optional[str]:
+    """面积规范化为整数平方米的字符串，无法识别时为 None"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    number, _ = _leading_number(text)
+    if number is None:
+        return None
+    area = int(number + 0.5)
+    return str(area) if area > 0 else None
+
+
+def normalize_rooms(value) -> Optional[str]:
+    """户型规范化为 'N室N厅N卫' 的形式（缺少的部分省略），无法识别时原样保留"""
+    text = clean_text(value, COLUMN_LIMITS['rooms'])
+    if text is None:
+        return None
+    if '开间' in text or '单间' in text:
+        return '1室0厅'
+    digits = ''.join(_CN_DIGITS.get(char, char) for char in text)
+
+    match = _LAYOUT.search(digits) or _LAYOUT_DASHED.match(digits)
+    if match:
+        rooms, halls, baths = match.groups()
+        return f"{int(rooms)}室" + (f"{int(halls)}厅" if halls else '') + (f"{int(baths)}卫" if baths else '')
+    match = _LAYOUT_JU.search(digits)
+    if match:
+        return f"{int(match.group(1))}室"
+    return text
+
+
+def normalize_publish_time(value, now: Optional[datetime] = None) -> Optional[int]:
+    """发布时间规范化为 Unix 时间戳（秒），相对时间以 now 为基准，无法识别时为 None"""
+    if value is None or isinstance(value, bool):
+        return None
+    now = now or datetime.now()
+    if isinstance(value, (int, float)):
+        text = str(int(value))
+    else:
+        text = str(value).strip()
+        if not text:
+            return None
+
+    if text.isdigit():
+        timestamp = int(text)
+        # 13 位为毫秒时间戳
+        return timestamp // 1000 if timestamp > 10 ** 11 else timestamp or None
+
+    if text == '刚刚':
+        return int(now.timestamp())
+    match = _RELATIVE_TIME.search(text)
+    if match:
+        return int((now - int(match.group(1)) * _RELATIVE_UNITS[match.group(2)]).timestamp())
+    for word, days in _DAY_WORDS.items():
+        if text.startswith(word):
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            return int((midnight - timedelta(days=days)).timestamp())
+
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return int(datetime.strptime(text, fmt).timestamp())
+        except ValueError:
+            continue
+    # 只有月日时取最近的过去日期
+    for fmt in _MONTH_DAY_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        try:
+            moment = parsed.replace(year=now.year)
+        except ValueError:  # 2月29日
+            return None
+        if moment > now:
+            moment = moment.replace(year=now.year - 1)
+        return int(moment.timestamp())
+    return None
+
+
+def normalize_coordinate(value, limit: float) -> Optional[float]:
+    """经纬度转为浮点数（保留8位小数），超出 ±limit 或无法识别时为 None"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or not -limit <= number <= limit or number == 0:
+        return None
+    return round(number, 8)
+
+
+def normalize_record(raw: Dict, now: Optional[datetime] = None) -> Optional[Dict]:
+    """把一条爬虫记录规范化为 INGEST_COLUMNS 的字典，没有房源编号时返回 None"""
+    record = {column: clean_text(raw.get(column), limit) for column, limit in COLUMN_LIMITS.items()}
+    if record['house_num'] is None:
+        return None
+    record['rooms'] = normalize_rooms(raw.get('rooms'))
+    record['area'] = normalize_area(raw.get('area'))
+    record['price'] = normalize_price(raw.get('price'))
+    record['publish_time'] = normalize_publish_time(raw.get('publish_time'), now)
+    record['latitude'] = normalize_coordinate(raw.get('latitude'), 90)
+    record['longitude'] = normalize_coordinate(raw.get('longitude'), 180)
+    if record['latitude'] is None or record['longitude'] is None:
+        record['latitude'] = record['longitude'] = None
+    return record
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """流式读取 CSV（首行为列名）或 JSON Lines 文件，path 为 '-' 时读标准输入"""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            for row in csv.DictReader(stream):
+                yield {key.strip(): value for key, value in row.items() if key}
+            return
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ 第 {line_no} 行不是有效的 JSON，已跳过: {e}")
+                continue
+            if isinstance(record, dict):
+                yield record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _comparable(column: str, value):
+    """比较用的值：数据库中的经纬度为 Decimal"""
+    if value is not None and column in ('latitude', 'longitude'):
+        return round(float(value), 8)
+    return value
+
+
+def merge_record(existing: Dict, record: Dict) -> Optional[Dict]:
+    """把新记录合并到已有房源上，内容没有变化时返回 None
+
+    记录中为 None 的字段保留原值；地址或小区变化且记录没有坐标时清空坐标。
+    """
+    merged = dict(existing)
+    for column in INGEST_COLUMNS:
+        if record[column] is not None:
+            merged[column] = record[column]
+    if record['latitude'] is None and (merged['address'] != existing['address']
+                                       or merged['block'] != existing['block']):
+        merged['latitude'] = merged['longitude'] = None
+    if all(_comparable(c, merged[c]) == _comparable(c, existing[c]) for c in INGEST_COLUMNS):
+        return None
+    return merged
+
+
+class HouseIngester:
+    """按批 upsert 房源并记录变更事件
+
+    Args:
+        conn: PyMySQL 连接（非连接池连接，持有导入锁）
+        batch_size: 每批处理的记录数
+    """
+
+    def __init__(self, conn, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.changed_ids = []
+        self.stats = {'read': 0, 'invalid': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    def run(self, records: Iterable[Dict], now: Optional[datetime] = None) -> Dict:
+        """规范化并导入全部记录，返回统计信息"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+            if cursor.fetchone()[0] != 1:
+                raise RuntimeError("另一个导入进程正在运行")
+        try:
+            batch = {}
+            for raw in records:
+                self.stats['read'] += 1
+                record = normalize_record(raw, now)
+                if record is None:
+                    self.stats['invalid'] += 1
+                    continue
+                # 同一批内重复的编号以最后一条为准
+                batch[record['house_num']] = record
+                if len(batch) >= self.batch_size:
+                    self.apply_batch(list(batch.values()))
+                    batch = {}
+            if batch:
+                self.apply_batch(list(batch.values()))
+        finally:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        return dict(self.stats)
+
+    def _house_ids(self, house_nums: List[str]) -> Dict[str, int]:
+        """按编号读取房源ID"""
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT house_num, id FROM house_info "
+                           f"WHERE house_num IN ({', '.join(['%s'] * len(house_nums))})", house_nums)
+            return dict(cursor.fetchall())
+
+    def _existing(self, house_nums: List[str]) -> Dict[str, Dict]:
+        with self.conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(f"SELECT id, page_views, {', '.join(INGEST_COLUMNS)} FROM house_info "
+                           f"WHERE house_num IN ({', '.join(['%s'] * len(house_nums))})", house_nums)
+            return {row['house_num']: row for row in cursor.fetchall()}
+
+    def apply_batch(self, records: List[Dict]):
+        """写入一批记录（单个事务）"""
+        existing = self._existing([record['house_num'] for record in records])
+        rows, changes = [], {}
+        now = datetime.utcnow()
+        for record in records:
+            current = existing.get(record['house_num'])
+            if current is None:
+                row, change = dict(record, page_views=0), 'insert'
+            else:
+                row, change = merge_record(current, record), 'update'
+                if row is None:
+                    self.stats['unchanged'] += 1
+                    continue
+            rows.append([row['page_views']] + [row[c] for c in INGEST_COLUMNS])
+            changes[row['house_num']] = change
+
+        if not rows:
+            return
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(UPSERT_SQL, rows)
+            # 新房源的ID在插入时才分配，在同一事务中按编号读回
+            house_ids = self._house_ids(list(changes))
+            events = [(house_ids[house_num], change, now) for house_num, change in changes.items()]
+            with self.conn.cursor() as cursor:
+                cursor.executemany(CHANGE_SQL, events)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for house_id, change, _ in events:
+            self.stats['inserted' if change == 'insert' else 'updated'] += 1
+            self.changed_ids.append(house_id)
+
+
+def ingest(path: str, fmt: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+           match: bool = True) -> Dict:
+    """导入文件中的房源
+
+    Args:
+        path: CSV 或 JSON Lines 文件，'-' 为标准输入
+        fmt: 'csv' 或 'jsonl'，默认按扩展名判断
+        batch_size: 每批处理的记录数
+        match: 导入后是否对变更的房源执行订阅匹配
+
+    Returns:
+        统计信息字典（read/invalid/inserted/updated/unchanged/matches）
+    """
+    # 导入锁是会话级的，使用独立连接而不是连接池
+    conn = connect()
+    try:
+        ingester = HouseIngester(conn, batch_size)
+        stats = ingester.run(read_records(path, fmt))
+    finally:
+        conn.close()
+
+    stats['matches'] = 0
+    if match and ingester.changed_ids:
+        from saved_search import match_house_ids
+        try:
+            stats['matches'] = match_house_ids(ingester.changed_ids)
+        except pymysql.err.ProgrammingError as e:
+            print(f"⚠️ 订阅匹配未执行（先运行 migrate.py 创建订阅表）: {e}")
+    return stats
+
+
+def dry_run(path: str, fmt: Optional[str] = None) -> Dict:
+    """只规范化并统计，不连接数据库"""
+    stats = {'read': 0, 'invalid': 0, 'house_nums': 0, 'no_price': 0, 'no_area': 0, 'no_publish_time': 0}
+    house_nums = set()
+    now = datetime.now()
+    for raw in read_records(path, fmt):
+        stats['read'] += 1
+        record = normalize_record(raw, now)
+        if record is None:
+            stats['invalid'] += 1
+            continue
+        house_nums.add(record['house_num'])
+        stats['no_price'] += record['price'] is None
+        stats['no_area'] += record['area'] is None
+        stats['no_publish_time'] += record['publish_time'] is None
+    stats['house_nums'] = len(house_nums)
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='房源批量导入（CSV / JSON Lines）')
+    parser.add_argument('path', help="爬虫输出文件，'-' 表示标准输入")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None, help='文件格式，默认按扩展名判断')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批处理的记录数')
+    parser.add_argument('--no-match', action='store_true', help='导入后不执行订阅匹配')
+    parser.add_argument('--dry-run', action='store_true', help='只规范化和统计，不写库')
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.dry_run:
+        stats = dry_run(args.path, args.format)
+        print(f"✅ 读取 {stats['read']:,} 条, 无编号 {stats['invalid']:,} 条, 不同编号 {stats['house_nums']:,} 个; "
+              f"无法识别租金 {stats['no_price']:,} 条, 面积 {stats['no_area']:,} 条, "
+              f"发布时间 {stats['no_publish_time']:,} 条, 用时 {time.time() - start:.1f} 秒")
+        return
+
+    stats = ingest(args.path, args.format, args.batch_size, not args.no_match)
+    print(f"✅ 读取 {stats['read']:,} 条: 新增 {stats['inserted']:,}, 更新 {stats['updated']:,}, "
+          f"未变化 {stats['unchanged']:,}, 无编号 {stats['invalid']:,}; "
+          f"订阅新增 {stats['matches']:,} 条匹配, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
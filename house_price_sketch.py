@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+租金分位数草图（DDSketch）
+house_analysis() 需要"某个租金在区域内排第几"、各分位数等统计。原有的 house_price_histogram
+每 PRICE_BUCKET_WIDTH 元一个分桶，低租金段过粗、高租金段过细。这里改用对数分桶：
+第 i 个分桶覆盖 (γ^(i-1), γ^i]，γ = (1+α)/(1-α)，任何分位数的相对误差不超过 α（默认 1%）。
+
+  - house_price_sketch 表按 区域 × 户型 保存每个分桶的房源数，由 house_info 上的触发器增量维护
+    （新增、删除和修改租金都只是某个分桶的计数加减，与 house_rollup.py 的方式相同）
+  - 分桶计数可以直接相加，区域草图和全市草图由 区域 × 户型 草图合并得到，不需要单独维护
+  - 有效租金小于 100000 元，分桶数不超过约 580 个，每个草图的内存有上界，查询为对分桶的二分查找
+
+草图表、存储过程和 house_info 上的触发器由迁移 migrations/0010_house_price_sketch.sql 创建，
+执行迁移后需要全量重建一次。只统计满足 database.VALID_LISTING_CONDITION 的有效房源，空值维度记为空字符串。
+
+用法:
+    python migrate.py                  # 创建草图表和触发器
+    python house_price_sketch.py       # 从 house_info 全量重建草图数据
+"""
+
+import argparse
+import bisect
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import db_manager
+
+# 分位数的相对误差
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# 分桶编号的 SQL 表达式，与 bin_index() 和迁移中的 house_price_sketch_apply 一致
+_BIN_SQL = f"CEIL(LN({{price}}) / {_LOG_GAMMA!r})"
+
+# 重建期间 house_info 加读锁、草图表加写锁，房源写入及其触发器等待重建完成（见 house_rollup.py）
+LOCK_TABLES_SQL = "LOCK TABLES house_info READ, house_price_sketch WRITE"
+
+REBUILD_SQL = [
+    "DELETE FROM house_price_sketch",
+    f"""
+    INSERT INTO house_price_sketch (region, rooms, bin, listing_count)
+    SELECT COALESCE(region, '') AS g_region, COALESCE(rooms, '') AS g_rooms,
+           {_BIN_SQL.format(price='CAST(price AS UNSIGNED)')} AS g_bin, COUNT(*)
+    FROM house_info
+    WHERE price REGEXP '^[0-9]+$' AND area REGEXP '^[0-9]+$'
+      AND CAST(price AS UNSIGNED) > 0 AND CAST(price AS UNSIGNED) < 100000
+      AND CAST(area AS UNSIGNED) > 0 AND CAST(area AS UNSIGNED) < 1000
+    GROUP BY g_region, g_rooms, g_bin
+    """
+]
+
+
+def bin_index(value: float) -> int:
+    """租金所在的分桶编号"""
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bin_value(index: int) -> float:
+    """分桶的代表值：相对分桶两端的误差都不超过 RELATIVE_ACCURACY"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def bin_bounds(index: int) -> Tuple[float, float]:
+    """分桶覆盖的租金区间 (下界, 上界]"""
+    return GAMMA ** (index - 1), GAMMA ** index
+
+
+class PriceSketch:
+    """对数分桶的分位数草图，可以合并；build() 后可查询
+
+    Args:
+        counts: 分桶编号 -> 房源数
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts = dict(counts or {})
+        self._bins = None
+        self._cumulative = None
+
+    def add(self, value: float, count: int = 1):
+        index = bin_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self._bins = None
+
+    def merge(self, other: 'PriceSketch'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self._bins = None
+
+    def build(self):
+        """生成有序分桶和累计计数，之后的查询为二分查找"""
+        self._bins = sorted(index for index, count in self.counts.items() if count > 0)
+        self._cumulative = []
+        total = 0
+        for index in self._bins:
+            total += self.counts[index]
+            self._cumulative.append(total)
+        return self
+
+    def _ensure_built(self):
+        if self._bins is None:
+            self.build()
+
+    @property
+    def total(self) -> int:
+        self._ensure_built()
+        return self._cumulative[-1] if self._cumulative else 0
+
+    def count_below(self, value: float) -> Tuple[int, int]:
+        """租金所在分桶之前的房源数，以及同一分桶内的房源数"""
+        self._ensure_built()
+        index = bin_index(value)
+        position = bisect.bisect_left(self._bins, index)
+        below = self._cumulative[position - 1] if position else 0
+        same = self.counts.get(index, 0) if position < len(self._bins) and self._bins[position] == index else 0
+        return below, same
+
+    def quantile(self, q: float) -> Optional[float]:
+        """第 q 分位数（0~1），空草图返回 None"""
+        self._ensure_built()
+        if not self._cumulative:
+            return None
+        rank = q * (self.total - 1)
+        position = bisect.bisect_right(self._cumulative, rank)
+        return bin_value(self._bins[min(position, len(self._bins) - 1)])
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+
+
+def load_sketches(rows: Iterable[Tuple[str, str, int, int]]) -> Dict[Tuple[Optional[str], Optional[str]], PriceSketch]:
+    """从 house_price_sketch 的行构建全部草图
+
+    Args:
+        rows: (region, rooms, bin, listing_count)
+
+    Returns:
+        {(区域, 户型): 草图}，户型为 None 表示该区域全部户型，(None, None) 为全市
+    """
+    sketches = {}
+    for region, rooms, index, count in rows:
+        if not count:
+            continue
+        for key in ((region, rooms), (region, None), (None, None)):
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = PriceSketch()
+            sketch.counts[index] = sketch.counts.get(index, 0) + count
+    return {key: sketch.build() for key, sketch in sketches.items()}
+
+
+def rebuild_sketch():
+    """从 house_info 全量重建草图表（单个事务，重建期间锁住 house_info 和草图表）
+
+    Returns:
+        草图表的行数
+    """
+    conn = db_manager.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            # LOCK TABLES 会隐式提交当前事务，先关闭自动提交，由 COMMIT 提交重建结果后再释放锁
+            cursor.execute("SET autocommit = 0")
+            cursor.execute(LOCK_TABLES_SQL)
+            try:
+                for sql in REBUILD_SQL:
+                    cursor.execute(sql)
+                cursor.execute("SELECT COUNT(*) FROM house_price_sketch")
+                rows = cursor.fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.execute("UNLOCK TABLES")
+        return rows
+    finally:
+        conn.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从 house_info 全量重建租金分位数草图（表和触发器由 migrate.py 创建）')
+    parser.parse_args()
+
+    start = time.time()
+    rows = rebuild_sketch()
+    print(f"✅ 草图表重建完成: {rows:,} 行, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+房源统计汇总表（区域 × 户型 × 租赁类型 × 朝向）
+数据分析页面、house_analysis() 和 house_charts() 需要的分组统计都从这里读取，不再扫描 house_info：
+  - house_rollup: 每个维度组合的房源数量，以及租金、面积、单价的和与平方和
+  - house_price_histogram: 租金分布（每 PRICE_BUCKET_WIDTH 元一个分桶）
+  - house_area_histogram: 面积分布（每 AREA_BUCKET_WIDTH 平方米一个分桶），附带单价之和
+
+汇总表、存储过程和 house_info 上的触发器由迁移 migrations/0008_house_rollup.sql 创建，
+触发器在新增、修改、删除房源时增量维护汇总表，只修改浏览量、坐标等无关字段时不做任何处理。
+汇总表可以随时从 house_info 全量重建（执行迁移后需要重建一次）。
+空值维度统一记为空字符串；租金、面积只统计满足 database.VALID_LISTING_CONDITION 的有效房源。
+
+用法:
+    python migrate.py            # 创建汇总表和触发器
+    python house_rollup.py       # 从 house_info 全量重建汇总数据
+"""
+
+import argparse
+import time
+
+from database import db_manager, PRICE_BUCKET_WIDTH, AREA_BUCKET_WIDTH
+
+# 全量重建的数据来源：与触发器相同的有效性判断，先用正则过滤再转换数值
+_SOURCE_SQL = """
+    SELECT region, rooms, rent_type, direction, valid,
+           IF(valid, CAST(price AS UNSIGNED), 0) AS price_value,
+           IF(valid, CAST(area AS UNSIGNED), 0) AS area_value
+    FROM (
+        SELECT COALESCE(region, '') AS region, COALESCE(rooms, '') AS rooms,
+               COALESCE(rent_type, '') AS rent_type, COALESCE(direction, '') AS direction,
+               price, area,
+               CASE WHEN price REGEXP '^[0-9]+$' AND area REGEXP '^[0-9]+$'
+                         AND CAST(price AS UNSIGNED) > 0 AND CAST(price AS UNSIGNED) < 100000
+                         AND CAST(area AS UNSIGNED) > 0 AND CAST(area AS UNSIGNED) < 1000
+                    THEN 1 ELSE 0 END AS valid
+        FROM house_info
+    ) h
+"""
+
+# 重建期间 house_info 加读锁、汇总表加写锁，房源写入及其触发器等待重建完成，
+# 否则重建过程中触发器写入的增量会被 DELETE 清掉或与 INSERT ... SELECT 的结果重复计算
+LOCK_TABLES_SQL = ("LOCK TABLES house_info READ, house_rollup WRITE, "
+                   "house_price_histogram WRITE, house_area_histogram WRITE")
+
+REBUILD_SQL = [
+    "DELETE FROM house_rollup",
+    "DELETE FROM house_price_histogram",
+    "DELETE FROM house_area_histogram",
+    f"""
+    INSERT INTO house_rollup
+        (region, rooms, rent_type, direction, listing_count, valid_count,
+         price_sum, price_sq_sum, area_sum, area_sq_sum, unit_price_sum, unit_price_sq_sum)
+    SELECT region, rooms, rent_type, direction, COUNT(*), SUM(valid),
+           SUM(price_value), SUM(price_value * price_value),
+           SUM(area_value), SUM(area_value * area_value),
+           SUM(IF(valid, price_value / area_value, 0)),
+           SUM(IF(valid, (price_value / area_value) * (price_value / area_value), 0))
+    FROM ({_SOURCE_SQL}) s
+    GROUP BY region, rooms, rent_type, direction
+    """,
+    f"""
+    INSERT INTO house_price_histogram (region, rooms, rent_type, direction, bucket, listing_count)
+    SELECT region, rooms, rent_type, direction, FLOOR(price_value / {PRICE_BUCKET_WIDTH}) AS bucket, COUNT(*)
+    FROM ({_SOURCE_SQL}) s
+    WHERE valid = 1
+    GROUP BY region, rooms, rent_type, direction, bucket
+    """,
+    f"""
+    INSERT INTO house_area_histogram
+        (region, rooms, rent_type, direction, bucket, listing_count, unit_price_sum)
+    SELECT region, rooms, rent_type, direction, FLOOR(area_value / {AREA_BUCKET_WIDTH}) AS bucket,
+           COUNT(*), SUM(price_value / area_value)
+    FROM ({_SOURCE_SQL}) s
+    WHERE valid = 1
+    GROUP BY region, rooms, rent_type, direction, bucket
+    """
+]
+
+
+def rebuild_rollup():
+    """从 house_info 全量重建汇总表
+
+    在同一个事务中清空并重新写入，并在整个重建期间锁住 house_info 和汇总表（见 LOCK_TABLES_SQL），
+    房源写入和汇总表的读取等待重建完成，不会看到空表或重复计算的数据。
+
+    Returns:
+        汇总后的维度组合数量
+    """
+    conn = db_manager.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            # LOCK TABLES 会隐式提交当前事务，先关闭自动提交，由 COMMIT 提交重建结果后再释放锁
+            cursor.execute("SET autocommit = 0")
+            cursor.execute(LOCK_TABLES_SQL)
+            try:
+                for sql in REBUILD_SQL:
+                    cursor.execute(sql)
+                cursor.execute("SELECT COUNT(*) FROM house_rollup")
+                groups = cursor.fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                # 连接会归还连接池，出错时也必须释放表锁
+                cursor.execute("UNLOCK TABLES")
+        return groups
+    finally:
+        conn.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从 house_info 全量重建房源统计汇总表（表和触发器由 migrate.py 创建）')
+    parser.parse_args()
+
+    start = time.time()
+    groups = rebuild_rollup()
+    print(f"✅ 汇总表重建完成: {groups:,} 个维度组合, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+house_info 列式快照
+把分析常用的列导出为内存映射的 NumPy .npy 文件：
+  - 区域/租赁类型/户型/朝向做字典编码（int16，-1 表示空值）
+  - 价格/面积预先解析为数值（非纯数字记为 NaN）
+数据分析页面和 house_charts() 直接以 mmap 方式加载，多个工作进程共享操作系统页缓存，
+每次请求无需再读行存储
+
+快照按版本目录存放，CURRENT 文件指向当前版本，刷新时写入新版本后原子替换 CURRENT。
+增量刷新以最大ID为水位线追加新房源，并按 house_changes 的事件水位线（house_ingest.py 写入）
+就地更新修改过的房源；删除需要定期全量重建。
+
+用法:
+    python house_snapshot.py            # 增量刷新（不存在快照时全量构建）
+    python house_snapshot.py --full     # 全量重建
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pymysql
+
+from database import db_manager
+
+SNAPSHOT_DIR = os.environ.get('HOUSE_SNAPSHOT_DIR',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot'))
+
+# 字典编码的分类列
+CATEGORICAL_COLUMNS = ['region', 'rent_type', 'rooms', 'direction']
+
+# 列名 -> 数据类型
+COLUMN_DTYPES = {
+    'id': np.int32,
+    'region': np.int16,
+    'rent_type': np.int16,
+    'rooms': np.int16,
+    'direction': np.int16,
+    'price': np.float32,
+    'area': np.float32,
+    'publish_time': np.int64,
+    'page_views': np.int32,
+    'latitude': np.float64,
+    'longitude': np.float64
+}
+
+_SELECT_COLUMNS = """
+    SELECT id, region, rent_type, rooms, direction, price, area,
+           publish_time, page_views, latitude, longitude
+    FROM house_info
+"""
+
+SELECT_SQL = _SELECT_COLUMNS + """
+    WHERE id > %s AND id <= %s
+    ORDER BY id
+    LIMIT %s
+"""
+
+# (after, upto] 范围内被修改过的房源
+CHANGED_IDS_SQL = """
+    SELECT DISTINCT house_id FROM house_changes
+    WHERE id > %s AND id <= %s AND change_type = 'update' AND house_id <= %s
+"""
+
+CHUNK_SIZE = 50000
+
+
+def _parse_number(value):
+    """解析纯数字字符串，与SQL中 REGEXP '^[0-9]+$' 的判断一致"""
+    if value and value.isdigit():
+        return float(value)
+    return np.nan
+
+
+class HouseSnapshot:
+    """只读的列式快照，列数据均为内存映射数组"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.version = meta['version']
+        self.rows = meta['rows']
+        self.watermark = meta['watermark']
+        self.change_watermark = meta.get('change_watermark')
+        self.built_at = meta['built_at']
+        self.dictionaries = meta['dictionaries']
+        self._lookup = {col: {v: i for i, v in enumerate(values)}
+                        for col, values in self.dictionaries.items()}
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')[:self.rows]
+            for name in COLUMN_DTYPES
+        }
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, column, value):
+        """获取分类值的编码，不存在时返回 -1"""
+        return self._lookup[column].get(value, -1)
+
+    def decode(self, column, codes):
+        """把编码数组转换为分类值列表"""
+        values = self.dictionaries[column]
+        return [values[c] if c >= 0 else None for c in codes]
+
+    def categorical(self, column):
+        """以 pandas Categorical 形式返回分类列（共享编码数组，不复制数据）"""
+        import pandas as pd
+        return pd.Categorical.from_codes(self.columns[column], categories=self.dictionaries[column])
+
+    def to_dataframe(self, columns=None):
+        """转换为 DataFrame，分类列为 category 类型"""
+        import pandas as pd
+        data = {}
+        for name in columns or COLUMN_DTYPES:
+            data[name] = self.categorical(name) if name in CATEGORICAL_COLUMNS else self.columns[name]
+        return pd.DataFrame(data)
+
+
+def _read_chunks(conn, after_id, max_id):
+    """按主键分块读取 (after_id, max_id] 范围内的房源"""
+    last_id = after_id
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(SELECT_SQL, (last_id, max_id, CHUNK_SIZE))
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _change_watermark(conn):
+    """house_changes 的最大事件ID，表不存在（未执行迁移）时返回 None"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM house_changes")
+            return cursor.fetchone()[0]
+    except pymysql.err.ProgrammingError:
+        return None
+
+
+def _read_changed(conn, after, upto, max_id):
+    """读取事件范围 (after, upto] 内被修改过、且ID不超过 max_id 的房源"""
+    with conn.cursor() as cursor:
+        cursor.execute(CHANGED_IDS_SQL, (after, upto, max_id))
+        house_ids = sorted(row[0] for row in cursor.fetchall())
+    for start in range(0, len(house_ids), CHUNK_SIZE):
+        batch = house_ids[start:start + CHUNK_SIZE]
+        with conn.cursor() as cursor:
+            cursor.execute(f"{_SELECT_COLUMNS} WHERE id IN ({', '.join(['%s'] * len(batch))}) ORDER BY id", batch)
+            rows = cursor.fetchall()
+        if rows:
+            yield rows
+
+
+def _encode_chunk(rows, lookups, dictionaries):
+    """把一块行数据转换为列数组，新出现的分类值追加到字典末尾"""
+    count = len(rows)
+    arrays = {name: np.empty(count, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+
+    for i, (house_id, region, rent_type, rooms, direction, price, area,
+            publish_time, page_views, latitude, longitude) in enumerate(rows):
+        arrays['id'][i] = house_id
+        for name, value in (('region', region), ('rent_type', rent_type),
+                            ('rooms', rooms), ('direction', direction)):
+            if not value:
+                arrays[name][i] = -1
+                continue
+            code = lookups[name].get(value)
+            if code is None:
+                code = len(dictionaries[name])
+                dictionaries[name].append(value)
+                lookups[name][value] = code
+            arrays[name][i] = code
+        arrays['price'][i] = _parse_number(price)
+        arrays['area'][i] = _parse_number(area)
+        arrays['publish_time'][i] = publish_time or 0
+        arrays['page_views'][i] = page_views or 0
+        arrays['latitude'][i] = float(latitude) if latitude is not None else np.nan
+        arrays['longitude'][i] = float(longitude) if longitude is not None else np.nan
+
+    return arrays
+
+
+def _current_version(directory):
+    """读取当前快照版本名，不存在时返回 None"""
+    try:
+        with open(os.path.join(directory, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _publish(directory, version, keep):
+    """原子切换 CURRENT 指针，并清理旧版本（保留 keep 指定的上一个版本）"""
+    tmp = os.path.join(directory, 'CURRENT.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(directory, 'CURRENT'))
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('v') and name not in (version, keep) and os.path.isdir(path):
+            # 其他进程可能仍映射着旧文件，Windows 下删除失败时留待下次清理
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def refresh_snapshot(directory=None, full=False):
+    """刷新快照
+
+    Args:
+        directory: 快照目录，默认 SNAPSHOT_DIR
+        full: 是否全量重建；否则以上个版本的最大ID为水位线追加新房源，并更新之后修改过的房源
+
+    Returns:
+        新版本的 HouseSnapshot
+    """
+    directory = directory or SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    previous = None
+    current = _current_version(directory)
+    if current and not full:
+        previous = HouseSnapshot(os.path.join(directory, current))
+
+    after_id = previous.watermark if previous else 0
+    dictionaries = {col: list(previous.dictionaries[col]) if previous else []
+                    for col in CATEGORICAL_COLUMNS}
+    lookups = {col: {v: i for i, v in enumerate(values)} for col, values in dictionaries.items()}
+
+    conn = db_manager.get_connection()
+    try:
+        # 先取事件水位线再读数据，读取期间的修改留到下次刷新重新应用
+        change_watermark = _change_watermark(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM house_info WHERE id > %s", (after_id,))
+            max_id, new_rows = cursor.fetchone()
+
+        # 上个版本没有事件水位线时无法得知之前的修改，从本次开始跟踪
+        changed = []
+        if previous and previous.change_watermark is not None and change_watermark is not None:
+            changed = list(_read_changed(conn, previous.change_watermark, change_watermark, after_id))
+
+        if previous and new_rows == 0 and not changed and change_watermark == previous.change_watermark:
+            return previous
+
+        version = f"v{int(time.time() * 1000)}"
+        path = os.path.join(directory, version)
+        os.makedirs(path)
+
+        base_rows = previous.rows if previous else 0
+        capacity = base_rows + new_rows
+        outputs = {
+            name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode='w+',
+                                            dtype=dtype, shape=(capacity,))
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+
+        # 复制上个版本的数据，就地更新修改过的房源，再追加新房源
+        if previous:
+            for name in COLUMN_DTYPES:
+                outputs[name][:base_rows] = previous[name]
+        for rows in changed:
+            arrays = _encode_chunk(rows, lookups, dictionaries)
+            positions = np.searchsorted(outputs['id'][:base_rows], arrays['id'])
+            # 快照之后被删除的房源不在快照中，跳过
+            found = positions < base_rows
+            found[found] = outputs['id'][positions[found]] == arrays['id'][found]
+            for name in COLUMN_DTYPES:
+                outputs[name][positions[found]] = arrays[name][found]
+
+        written = base_rows
+        for rows in _read_chunks(conn, after_id, max_id):
+            arrays = _encode_chunk(rows, lookups, dictionaries)
+            # 构建期间有房源被删除时，实际行数可能少于统计值
+            count = min(len(rows), capacity - written)
+            for name in COLUMN_DTYPES:
+                outputs[name][written:written + count] = arrays[name][:count]
+            written += count
+    finally:
+        conn.close()
+
+    for array in outputs.values():
+        array.flush()
+    del outputs
+
+    meta = {
+        'version': version,
+        'rows': written,
+        'watermark': int(max_id) if new_rows else after_id,
+        'change_watermark': int(change_watermark) if change_watermark is not None else None,
+        'built_at': int(time.time()),
+        'dictionaries': dictionaries
+    }
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    _publish(directory, version, keep=current)
+    return HouseSnapshot(path)
+
+
+_loaded = {}
+
+
+def get_snapshot(directory=None):
+    """获取当前版本的快照，版本切换后自动重新加载；快照不存在时返回 None"""
+    directory = directory or SNAPSHOT_DIR
+    version = _current_version(directory)
+    if not version:
+        return None
+
+    snapshot = _loaded.get(directory)
+    if snapshot is None or snapshot.version != version:
+        try:
+            snapshot = HouseSnapshot(os.path.join(directory, version))
+        except (OSError, ValueError) as e:
+            print(f"Snapshot load error: {e}")
+            return None
+        _loaded[directory] = snapshot
+    return snapshot
+
+
+def valid_listing_mask(snapshot):
+    """与 database.VALID_LISTING_CONDITION 一致的有效房源掩码"""
+    price = snapshot['price']
+    area = snapshot['area']
+    return (price > 0) & (price < 100000) & (area > 0) & (area < 1000)
+
+
+def _top_counts(snapshot, column, mask, limit=None):
+    """统计 mask 范围内分类列的取值数量，按数量降序返回 [(值, 数量), ...]"""
+    codes = snapshot[column][mask]
+    codes = codes[codes >= 0]
+    counts = np.bincount(codes, minlength=len(snapshot.dictionaries[column]))
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    if limit:
+        order = order[:limit]
+    return [(snapshot.dictionaries[column][i], int(counts[i])) for i in order]
+
+
+def region_chart_stats(snapshot, region, house_id):
+    """按 house_charts() 的口径计算区域图表数据"""
+    region_code = snapshot.code('region', region)
+    in_region = snapshot['region'] == region_code
+    not_self = snapshot['id'] != house_id
+    price = snapshot['price']
+    area = snapshot['area']
+    numeric = ~np.isnan(price) & ~np.isnan(area)
+
+    # 单价：价格<100000 且面积>0
+    unit_valid = numeric & (area > 0) & (price < 100000)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit_price = price / area
+    region_units = unit_price[unit_valid & in_region & not_self]
+    city_units = unit_price[unit_valid]
+
+    region_prices = price[in_region & ~np.isnan(price) & (price < 100000)]
+    bins = [2000, 4000, 6000, 8000, 10000, 15000]
+    histogram = np.bincount(np.digitize(region_prices, bins), minlength=len(bins) + 1)
+
+    # 散点图：先取前200条再过滤异常值，与SQL版本一致
+    scatter_idx = np.flatnonzero(in_region & not_self & numeric)[:200]
+    scatter = []
+    for i in scatter_idx:
+        a, p = float(area[i]), float(price[i])
+        if 0 < a < 300 and 0 < p < 50000:
+            rooms_code = snapshot['rooms'][i]
+            scatter.append({
+                'area': int(a),
+                'price': int(p),
+                'rooms': snapshot.dictionaries['rooms'][rooms_code] if rooms_code >= 0 else '未知'
+            })
+
+    return {
+        'room_distribution': _top_counts(snapshot, 'rooms', in_region, limit=8),
+        'region_avg_unit_price': round(float(region_units.mean()), 2) if len(region_units) else 0,
+        'city_avg_unit_price': round(float(city_units.mean()), 2) if len(city_units) else 0,
+        'direction_distribution': _top_counts(snapshot, 'direction', in_region, limit=8),
+        'price_histogram': [int(c) for c in histogram],
+        'scatter_data': scatter
+    }
+
+
+def analytics_summary(snapshot, bins=30, top=10, sample_size=1000):
+    """按数据分析页面的口径计算统计结果，返回结构与 SQL 版本一致"""
+    import pandas as pd
+
+    valid = valid_listing_mask(snapshot)
+    price = np.asarray(snapshot['price'][valid], dtype=np.float64)
+    area = np.asarray(snapshot['area'][valid], dtype=np.float64)
+    unit = price / area
+
+    def histogram(values):
+        if not len(values):
+            return pd.DataFrame(columns=['bucket_start', 'bucket_end', 'count'])
+        low, high = values.min(), values.max()
+        width = max((high - low) / bins, 1)
+        buckets = np.minimum(np.floor((values - low) / width), bins - 1).astype(np.int64)
+        counts = np.bincount(buckets)
+        present = np.flatnonzero(counts)
+        return pd.DataFrame({
+            'bucket_start': low + present * width,
+            'bucket_end': low + (present + 1) * width,
+            'count': counts[present]
+        })
+
+    region_counts = pd.DataFrame(_top_counts(snapshot, 'region', valid, limit=top), columns=['region', 'count'])
+    top_regions = region_counts['region'].head(5).tolist()
+
+    frame = pd.DataFrame({
+        'region': snapshot.categorical('region')[valid],
+        'rooms': snapshot.categorical('rooms')[valid],
+        'price': price,
+        'area': area,
+        'unit': unit
+    })
+
+    room_price = frame.dropna(subset=['rooms']).groupby('rooms', observed=True)['price'].agg(['mean', 'count'])
+    room_price = room_price[room_price['count'] >= 10].reset_index()
+
+    top_frame = frame[frame['region'].isin(top_regions)]
+    region_stats = top_frame.groupby('region', observed=True).agg(
+        count=('price', 'size'), avg_price=('price', 'mean'),
+        avg_area=('area', 'mean'), avg_unit_price=('unit', 'mean')
+    ).reset_index()
+    region_rooms = top_frame.dropna(subset=['rooms']).groupby(['region', 'rooms'], observed=True).size()
+    region_rooms = region_rooms.rename('count').reset_index().sort_values(['region', 'count'], ascending=[True, False])
+
+    sample_idx = np.random.default_rng().choice(len(frame), size=min(sample_size, len(frame)), replace=False)
+    sample = frame.iloc[sample_idx][['region', 'rooms', 'price', 'area']].rename(
+        columns={'price': 'price_numeric', 'area': 'area_numeric'})
+
+    return {
+        'summary': {
+            'total': int(valid.sum()),
+            'avg_price': float(price.mean()) if len(price) else None,
+            'avg_area': float(area.mean()) if len(area) else None,
+            'avg_unit_price': float(unit.mean()) if len(unit) else None
+        },
+        'price_hist': histogram(price),
+        'area_hist': histogram(area),
+        'region_counts': region_counts,
+        'rent_type_counts': pd.DataFrame(_top_counts(snapshot, 'rent_type', valid), columns=['rent_type', 'count']),
+        'room_price': room_price,
+        'region_stats': region_stats,
+        'region_rooms': region_rooms,
+        'top_regions': top_regions,
+        'sample': sample
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='house_info 列式快照')
+    parser.add_argument('--full', action='store_true', help='全量重建快照')
+    parser.add_argument('--dir', default=None, help='快照目录')
+    args = parser.parse_args()
+
+    start = time.time()
+    snapshot = refresh_snapshot(args.dir, full=args.full)
+    print(f"✅ 快照版本 {snapshot.version}: {snapshot.rows:,} 条房源, "
+          f"水位线 ID={snapshot.watermark}, 用时 {time.time() - start:.1f} 秒")
+    print(f"   目录: {snapshot.path}")
+
+
+if __name__ == "__main__":
+    main()
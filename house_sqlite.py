@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+house_info 只读 SQLite 快照
+把 house_info 和统计汇总表导出为单个 SQLite 文件，分发到各应用节点后，
+首页、房源详情、搜索、附近房源和图表接口的读请求直接查本地文件，不再访问中心 MySQL；
+用户相关的读写（收藏、浏览记录、登录等）仍走 MySQL。
+
+快照内容:
+  - house_info：与 MySQL 相同的列，另加预先转换的数值列 price_num/area_num（带索引）
+  - house_fts：title/address/block 的 FTS5 全文索引（trigram 分词，支持中文子串搜索）
+  - house_rtree：经纬度的 R-tree 空间索引
+  - house_rollup 等统计汇总表、house_price_sketch 租金草图、house_covisit 推荐表（存在时）
+  - snapshot_meta：构建时间、行数、水位线、实际导出的表
+
+导出时先写入同目录下的临时文件，完成后 os.replace 原子替换；应用节点每次查询都重新打开文件，
+正在执行的查询继续读旧文件，之后的查询读新文件，无需重启。
+
+用法:
+    python house_sqlite.py                        # 导出到配置的 read_snapshot 路径
+    python house_sqlite.py --output /data/house.db
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+import pymysql
+
+from db_engine import connect, read_snapshot_path
+
+# 房源表的列（与 MySQL house_info 一致）
+HOUSE_COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY'),
+    ('title', 'TEXT'),
+    ('rooms', 'TEXT'),
+    ('area', 'TEXT'),
+    ('price', 'TEXT'),
+    ('direction', 'TEXT'),
+    ('rent_type', 'TEXT'),
+    ('region', 'TEXT'),
+    ('block', 'TEXT'),
+    ('address', 'TEXT'),
+    ('traffic', 'TEXT'),
+    ('publish_time', 'INTEGER'),
+    ('facilities', 'TEXT'),
+    ('highlights', 'TEXT'),
+    ('matching', 'TEXT'),
+    ('travel', 'TEXT'),
+    ('page_views', 'INTEGER'),
+    ('landlord', 'TEXT'),
+    ('phone_num', 'TEXT'),
+    ('house_num', 'TEXT'),
+    ('latitude', 'REAL'),
+    ('longitude', 'REAL')
+]
+
+# 快照中可能包含的表；汇总表在 MySQL 中不存在时不导出，实际包含的表见 snapshot_tables()
+SNAPSHOT_TABLES = ('house_info', 'house_rollup', 'house_price_histogram', 'house_area_histogram',
+                   'house_price_sketch', 'house_covisit')
+
+# 随快照导出的汇总表及其主键（MySQL 中不存在时跳过）
+ROLLUP_TABLES = {
+    'house_rollup': ('region', 'rooms', 'rent_type', 'direction'),
+    'house_price_histogram': ('region', 'rooms', 'rent_type', 'direction', 'bucket'),
+    'house_area_histogram': ('region', 'rooms', 'rent_type', 'direction', 'bucket'),
+    'house_price_sketch': ('region', 'rooms', 'bin'),
+    'house_covisit': ('house_id',)
+}
+
+CREATE_SQL = [
+    f"CREATE TABLE house_info ({', '.join(f'{name} {kind}' for name, kind in HOUSE_COLUMNS)}, "
+    "price_num INTEGER, area_num INTEGER)",
+    "CREATE INDEX idx_house_region_price ON house_info (region, price_num)",
+    "CREATE INDEX idx_house_rent_type_price ON house_info (rent_type, price_num)",
+    "CREATE INDEX idx_house_rooms ON house_info (rooms)",
+    "CREATE INDEX idx_house_price ON house_info (price_num)",
+    "CREATE VIRTUAL TABLE house_fts USING fts5("
+    "title, address, block, content='house_info', content_rowid='id', tokenize='trigram')",
+    "CREATE VIRTUAL TABLE house_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    "CREATE TABLE snapshot_meta (key TEXT PRIMARY KEY, value TEXT)"
+]
+
+# 数据写完后再建全文和空间索引，比逐行维护快得多
+INDEX_SQL = [
+    "INSERT INTO house_fts (house_fts) VALUES ('rebuild')",
+    "INSERT INTO house_rtree (id, min_lat, max_lat, min_lng, max_lng) "
+    "SELECT id, latitude, latitude, longitude, longitude FROM house_info "
+    "WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+    "ANALYZE"
+]
+
+CHUNK_SIZE = 10000
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot', 'house.db')
+
+_LEADING_INT = re.compile(r'\s*([+-]?\d+)')
+
+
+def _cast_int(value):
+    """按 MySQL CAST(... AS SIGNED) 的规则取字符串开头的整数，无法解析时为 0
+
+    与 app.py 中 db.cast(HouseInfo.price, db.Integer) 的结果一致，价格筛选不因读库不同而变化。
+    """
+    if value is None:
+        return None
+    match = _LEADING_INT.match(value)
+    return int(match.group(1)) if match else 0
+
+
+def fts_phrase(keyword, columns=None):
+    """把搜索关键词转换为 FTS5 查询，按子串匹配
+
+    trigram 分词至少需要 3 个字符，更短的关键词返回 None，由调用方改用 LIKE。
+
+    Args:
+        keyword: 用户输入的关键词
+        columns: 限定搜索的列，默认全部（title/address/block）
+    """
+    if len(keyword) < 3:
+        return None
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    if columns:
+        return '{' + ' '.join(columns) + '} : ' + phrase
+    return phrase
+
+
+def snapshot_available(path=None):
+    """快照文件是否已导出"""
+    path = path or read_snapshot_path()
+    return bool(path) and os.path.isfile(path)
+
+
+_tables_cache = {}  # 快照路径 -> ((mtime, inode), 表名集合)
+
+
+def snapshot_tables(path=None):
+    """快照中实际导出的表，读取 snapshot_meta 后按文件缓存，文件被替换后重新读取
+
+    快照不存在或无法读取时返回空集合。
+    """
+    path = path or read_snapshot_path()
+    try:
+        stat = os.stat(path)
+    except (TypeError, OSError):
+        return frozenset()
+    version = (stat.st_mtime_ns, stat.st_ino)
+    cached = _tables_cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            row = conn.execute("SELECT value FROM snapshot_meta WHERE key = 'tables'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return frozenset()
+    # 早期导出的快照没有记录表名，只确定包含 house_info
+    tables = frozenset(row[0].split(',')) if row else frozenset(['house_info'])
+    _tables_cache[path] = (version, tables)
+    return tables
+
+
+def _copy_houses(source, target):
+    """流式读取 MySQL 的 house_info 写入快照，返回 (行数, 最大ID)"""
+    names = [name for name, _ in HOUSE_COLUMNS]
+    insert_sql = (f"INSERT INTO house_info ({', '.join(names)}, price_num, area_num) "
+                  f"VALUES ({', '.join('?' * (len(names) + 2))})")
+    price_index, area_index = names.index('price'), names.index('area')
+    lat_index, lng_index = names.index('latitude'), names.index('longitude')
+
+    rows_written = 0
+    max_id = 0
+    cursor = source.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(f"SELECT {', '.join(names)} FROM house_info ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            batch = []
+            for row in rows:
+                row = list(row)
+                # Decimal 经纬度转为浮点数，SQLite 不能直接绑定 Decimal
+                for i in (lat_index, lng_index):
+                    if row[i] is not None:
+                        row[i] = float(row[i])
+                batch.append(row + [_cast_int(row[price_index]), _cast_int(row[area_index])])
+            target.executemany(insert_sql, batch)
+            rows_written += len(batch)
+            max_id = batch[-1][0]
+    finally:
+        cursor.close()
+    return rows_written, max_id
+
+
+def _copy_rollups(source, target):
+    """复制统计汇总表，返回已复制的表名"""
+    copied = []
+    for table, key in ROLLUP_TABLES.items():
+        with source.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE %s", (table,))
+            if cursor.fetchone() is None:
+                print(f"⚠️ MySQL 中没有 {table}，快照中不包含该表（先运行 migrate.py，再运行 house_rollup.py / house_price_sketch.py / house_covisit.py）")
+                continue
+            cursor.execute(f"SELECT * FROM {table}")
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+        target.execute(f"CREATE TABLE {table} ({', '.join(columns)}, PRIMARY KEY ({', '.join(key)}))")
+        target.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+        copied.append(table)
+    return copied
+
+
+def build_sqlite_snapshot(path=None):
+    """从 MySQL 导出快照并原子替换
+
+    Args:
+        path: 快照文件路径，默认为配置的 read_snapshot，未配置时为 snapshot/house.db
+
+    Returns:
+        快照信息字典（rows/watermark/tables/built_at/path）
+    """
+    path = os.path.abspath(path or read_snapshot_path() or DEFAULT_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    # 全表扫描耗时较长，不使用语句超时
+    source = connect(init_command=None)
+    target = sqlite3.connect(tmp)
+    try:
+        # 临时文件写失败直接丢弃，不需要日志
+        target.execute("PRAGMA journal_mode = OFF")
+        target.execute("PRAGMA synchronous = OFF")
+        for sql in CREATE_SQL:
+            target.execute(sql)
+        rows, max_id = _copy_houses(source, target)
+        tables = ['house_info'] + _copy_rollups(source, target)
+        for sql in INDEX_SQL:
+            target.execute(sql)
+
+        info = {'rows': rows, 'watermark': max_id, 'tables': tables,
+                'built_at': int(time.time()), 'path': path}
+        target.executemany("INSERT INTO snapshot_meta (key, value) VALUES (?, ?)",
+                           [(key, str(info[key])) for key in ('rows', 'watermark', 'built_at')]
+                           + [('tables', ','.join(tables))])
+        target.commit()
+    except Exception:
+        target.close()
+        os.remove(tmp)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    os.replace(tmp, path)
+    return info
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='导出 house_info 只读 SQLite 快照')
+    parser.add_argument('--output', default=None, help='快照文件路径，默认使用配置的 read_snapshot')
+    args = parser.parse_args()
+
+    start = time.time()
+    info = build_sqlite_snapshot(args.output)
+    print(f"✅ SQLite 快照已导出: {info['rows']:,} 条房源, 水位线 ID={info['watermark']}, "
+          f"用时 {time.time() - start:.1f} 秒")
+    print(f"   表: {', '.join(info['tables'])}")
+    print(f"   文件: {info['path']}")
+
+
+if __name__ == "__main__":
+    main()
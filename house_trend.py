@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+租金走势时间序列
+按发布时间（publish_time）把房源汇总到 house_rent_trend 表，粒度为周和月，维度为区域 × 户型。
+除了具体的区域/户型组合，还预先汇总了 '*'（全部）维度，任何走势查询都是一次主键范围扫描，
+不需要扫描历史房源。
+
+走势表、存储过程和 house_info 上的触发器由迁移 migrations/0009_house_rent_trend.sql 创建，
+触发器在新增、修改、删除房源时增量维护走势表（与 house_rollup.py 的方式相同），
+只修改浏览量、坐标等无关字段时不做任何处理。走势表可以随时从 house_info 全量重建（执行迁移后需要重建一次）。
+租金只统计满足 database.VALID_LISTING_CONDITION 的有效房源。
+
+用法:
+    python migrate.py           # 创建走势表和触发器
+    python house_trend.py       # 从 house_info 全量重建走势数据
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from database import db_manager
+
+# 表示"全部"的维度取值
+ALL = '*'
+
+TREND_PERIODS = ('week', 'month')
+
+# 周从周一开始，月从1日开始（与迁移中的 house_trend_apply 一致）
+_PERIOD_START_SQL = {
+    'week': "DATE(FROM_UNIXTIME({ts})) - INTERVAL WEEKDAY(FROM_UNIXTIME({ts})) DAY",
+    'month': "DATE_FORMAT(FROM_UNIXTIME({ts}), '%Y-%m-01')"
+}
+
+# 每条房源计入的维度组合：具体组合、按区域、按户型、全市
+_DIMENSION_COMBOS = [
+    ('region', 'rooms'),
+    ('region', f"'{ALL}'"),
+    (f"'{ALL}'", 'rooms'),
+    (f"'{ALL}'", f"'{ALL}'")
+]
+
+# 全量重建的数据来源：与触发器相同的有效性判断，先用正则过滤再转换数值
+_SOURCE_SQL = """
+    SELECT region, rooms, publish_time, valid,
+           IF(valid, CAST(price AS UNSIGNED), 0) AS price_value,
+           IF(valid, CAST(area AS UNSIGNED), 0) AS area_value
+    FROM (
+        SELECT COALESCE(region, '') AS region, COALESCE(rooms, '') AS rooms, publish_time,
+               price, area,
+               CASE WHEN price REGEXP '^[0-9]+$' AND area REGEXP '^[0-9]+$'
+                         AND CAST(price AS UNSIGNED) > 0 AND CAST(price AS UNSIGNED) < 100000
+                         AND CAST(area AS UNSIGNED) > 0 AND CAST(area AS UNSIGNED) < 1000
+                    THEN 1 ELSE 0 END AS valid
+        FROM house_info
+        WHERE publish_time > 0
+    ) h
+"""
+
+# 重建期间 house_info 加读锁、走势表加写锁，房源写入及其触发器等待重建完成（见 house_rollup.py）
+LOCK_TABLES_SQL = "LOCK TABLES house_info READ, house_rent_trend WRITE"
+
+
+def _rebuild_statements():
+    """生成全量重建语句：每个周期、每个维度组合各一条 INSERT ... SELECT"""
+    statements = ["DELETE FROM house_rent_trend"]
+    for period in TREND_PERIODS:
+        period_start = _PERIOD_START_SQL[period].format(ts='publish_time')
+        for region, rooms in _DIMENSION_COMBOS:
+            statements.append(f"""
+                INSERT INTO house_rent_trend
+                    (period_type, region, rooms, period_start, listing_count, valid_count,
+                     price_sum, price_sq_sum, unit_price_sum)
+                SELECT '{period}', {region} AS g_region, {rooms} AS g_rooms, {period_start} AS g_start,
+                       COUNT(*), SUM(valid), SUM(price_value), SUM(price_value * price_value),
+                       SUM(IF(valid, price_value / area_value, 0))
+                FROM ({_SOURCE_SQL}) s
+                GROUP BY g_region, g_rooms, g_start
+            """)
+    return statements
+
+
+def rebuild_trend():
+    """从 house_info 全量重建走势表（单个事务，重建期间锁住 house_info 和走势表）
+
+    Returns:
+        走势表的行数
+    """
+    conn = db_manager.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            # LOCK TABLES 会隐式提交当前事务，先关闭自动提交，由 COMMIT 提交重建结果后再释放锁
+            cursor.execute("SET autocommit = 0")
+            cursor.execute(LOCK_TABLES_SQL)
+            try:
+                for sql in _rebuild_statements():
+                    cursor.execute(sql)
+                cursor.execute("SELECT COUNT(*) FROM house_rent_trend")
+                rows = cursor.fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.execute("UNLOCK TABLES")
+        return rows
+    finally:
+        conn.close()
+
+
+def _next_period(day, period):
+    """下一个周期的开始日期"""
+    if period == 'week':
+        return day + timedelta(days=7)
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+def trend_series(period='month', region=None, rooms=None, window=3, since=None):
+    """查询租金走势
+
+    Args:
+        period: 'week' 或 'month'
+        region: 区域，None 表示全市
+        rooms: 户型，None 表示全部户型
+        window: 移动平均的周期数
+        since: 只返回该日期（date）之后的周期
+
+    Returns:
+        按周期排列的字典列表，包含 period_start、count、avg_price、std_price、avg_unit_price、
+        moving_avg_price（最近 window 个周期按房源数加权的平均租金）。没有房源的周期补零。
+    """
+    if period not in TREND_PERIODS:
+        raise ValueError(f"不支持的统计周期: {period}")
+
+    query = """
+        SELECT period_start, listing_count, valid_count, price_sum, price_sq_sum, unit_price_sum
+        FROM house_rent_trend
+        WHERE period_type = %s AND region = %s AND rooms = %s
+    """
+    params = [period, region or ALL, rooms or ALL]
+    if since:
+        # 多取 window - 1 个周期，保证返回的第一个周期也有完整的移动平均
+        query += " AND period_start >= %s"
+        days = 7 if period == 'week' else 31
+        params.append(since - timedelta(days=days * max(window - 1, 0)))
+    query += " ORDER BY period_start"
+
+    rows = {row['period_start']: row for row in db_manager.fetch_rows(query, params)}
+    if not rows:
+        return []
+
+    series = []
+    day, last = min(rows), max(rows)
+    while day <= last:
+        row = rows.get(day)
+        count = int(row['valid_count']) if row else 0
+        price_sum = float(row['price_sum']) if row else 0.0
+        price_sq_sum = float(row['price_sq_sum']) if row else 0.0
+        avg_price = price_sum / count if count else None
+        series.append({
+            'period_start': day,
+            'listings': int(row['listing_count']) if row else 0,
+            'count': count,
+            'price_sum': price_sum,
+            'avg_price': avg_price,
+            'std_price': max(price_sq_sum / count - avg_price ** 2, 0) ** 0.5 if count else None,
+            'avg_unit_price': float(row['unit_price_sum']) / count if count else None
+        })
+        day = _next_period(day, period)
+
+    # 按房源数加权的移动平均，空周期不会把均值拉向0
+    for i, point in enumerate(series):
+        recent = series[max(0, i - window + 1):i + 1]
+        count = sum(p['count'] for p in recent)
+        point['moving_avg_price'] = sum(p['price_sum'] for p in recent) / count if count else None
+
+    if since:
+        series = [p for p in series if p['period_start'] >= since]
+    for point in series:
+        del point['price_sum']
+    return series
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从 house_info 全量重建租金走势表（表和触发器由 migrate.py 创建）')
+    parser.parse_args()
+
+    start = time.time()
+    rows = rebuild_trend()
+    print(f"✅ 走势表重建完成: {rows:,} 行, 用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
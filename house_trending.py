@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时热门房源榜
+page_views 是累计浏览量，不反映最近的热度。热门榜对每次浏览按时间指数衰减计分
+（half_life 秒后权重减半），按区域和全市各保留得分最高的 top_n 套房源，全部在进程内存中维护。
+
+计分方式:
+  每次浏览的得分为 2^((t - t0) / half_life)，t0 为基准时间，房源得分为其全部浏览的得分之和。
+  所有房源的得分同比例衰减，排名不随时间变化，新的浏览到来时只需给一套房源加分，
+  展示时再乘以 2^((t0 - now) / half_life) 换算为"衰减后的浏览次数"。
+  得分只增不减，每个榜单只需比较新得分与榜单中的最小值即可保持精确的 top_n。
+  基准时间过旧（得分过大）时整体平移一次，同时丢弃已经衰减到可以忽略的房源。
+
+数据来源:
+  浏览记录写入 browse_history，榜单按自增ID从该表追加读取新的浏览记录（loader），
+  多进程部署时每个进程读到的是同一份事件流，榜单结果一致；启动时只读取最近几个半衰期内的记录，
+  查询始终带 visit_time 下界，只涉及最近的分区，不需要对全表 GROUP BY。
+  自增ID在分配时确定、在提交时才可见，较小的ID可能晚于较大的ID提交（读副本时更明显），
+  因此每次追加读取都从水位线之前 late_window 个ID处开始，用已读ID集合去重，晚提交的记录不会遗漏。
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1)
+
+# 冷启动时读取最近多少个半衰期的浏览记录（更早的浏览权重不足 1/2^8）
+WARMUP_HALF_LIVES = 8
+
+# 衰减后得分低于该值（约等于一次浏览衰减 7 个半衰期）的房源在平移基准时丢弃
+PRUNE_SCORE = 0.01
+
+# 得分的指数超过该值时平移基准时间，避免浮点溢出
+REBASE_EXPONENT = 40
+
+CITYWIDE = None
+
+
+def to_timestamp(value) -> float:
+    """visit_time（UTC 的 naive datetime）转换为秒数"""
+    if isinstance(value, datetime):
+        return (value - EPOCH).total_seconds()
+    return float(value)
+
+
+class TrendingBoard:
+    """按时间衰减的热门房源榜（线程安全）
+
+    Args:
+        loader: loader(last_id, since) 返回 ID 大于 last_id、时间不早于 since（datetime）的浏览记录，
+            每条为 (id, house_id, visit_time, region)，按 ID 升序，每次最多返回 batch_size 条
+        half_life: 半衰期（秒）
+        top_n: 每个榜单保留的房源数
+        sync_interval: 两次追加读取之间的最短间隔（秒）
+        batch_size: loader 单次返回的最大条数，返回条数等于该值时继续读取
+        late_window: 每次追加读取时重新读取水位线之前的ID个数，用于补上晚提交的浏览记录
+    """
+
+    def __init__(self, loader: Callable[[int, datetime], Iterable[Tuple]], half_life: float = 6 * 3600,
+                 top_n: int = 50, sync_interval: float = 5, batch_size: int = 5000, late_window: int = 1000):
+        self.loader = loader
+        self.half_life = half_life
+        self.top_n = top_n
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.late_window = late_window
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._t0 = time.time()
+        self._scores = {}   # house_id -> 相对 t0 的得分
+        self._regions = {}  # house_id -> 区域
+        self._boards = {CITYWIDE: {}}  # 区域（全市为 None） -> {house_id: 得分}，最多 top_n 个
+        self._last_id = 0
+        self._seen = set()  # 水位线之前 late_window 内已计入的浏览记录ID
+        self._synced_at = 0
+        self.events = 0
+        self.rebases = 0
+
+    def _weight(self, timestamp: float) -> float:
+        return 2 ** ((timestamp - self._t0) / self.half_life)
+
+    def _offer(self, board: Dict[int, float], house_id: int, score: float):
+        """得分增加后更新榜单：已在榜单中直接更新，否则超过榜单最小值时替换"""
+        if house_id in board or len(board) < self.top_n:
+            board[house_id] = score
+            return
+        lowest = min(board, key=board.get)
+        if score > board[lowest]:
+            del board[lowest]
+            board[house_id] = score
+
+    def _rebase(self, t0: float):
+        """把基准时间平移到 t0，丢弃可以忽略的房源并重建榜单（很少执行）"""
+        factor = 2 ** ((self._t0 - t0) / self.half_life)
+        self._t0 = t0
+        self._scores = {house_id: score * factor for house_id, score in self._scores.items()
+                        if score * factor >= PRUNE_SCORE}
+        self._regions = {house_id: self._regions[house_id] for house_id in self._scores}
+        grouped = {CITYWIDE: list(self._scores)}
+        for house_id, region in self._regions.items():
+            grouped.setdefault(region, []).append(house_id)
+        self._boards = {
+            region: {house_id: self._scores[house_id]
+                     for house_id in heapq.nlargest(self.top_n, house_ids, key=self._scores.get)}
+            for region, house_ids in grouped.items()
+        }
+        self.rebases += 1
+
+    def add(self, house_id: int, region: Optional[str], visit_time):
+        """记录一次浏览"""
+        timestamp = to_timestamp(visit_time)
+        region = region or ''  # None 表示全市榜，区域为空的房源单独归为一组
+        with self._lock:
+            if (timestamp - self._t0) / self.half_life > REBASE_EXPONENT:
+                self._rebase(timestamp)
+            score = self._scores.get(house_id, 0) + self._weight(timestamp)
+            self._scores[house_id] = score
+            self._regions[house_id] = region
+            self._offer(self._boards[CITYWIDE], house_id, score)
+            self._offer(self._boards.setdefault(region, {}), house_id, score)
+            self.events += 1
+
+    def sync(self, force: bool = False) -> int:
+        """从事件流追加读取新的浏览记录，返回读取的条数
+
+        距上次读取不足 sync_interval 秒时直接返回；其他线程正在读取时也直接返回，不等待。
+        """
+        now = time.time()
+        if not force and now - self._synced_at < self.sync_interval:
+            return 0
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+        try:
+            since = datetime.utcfromtimestamp(now - WARMUP_HALF_LIVES * self.half_life)
+            loaded = 0
+            after = max(self._last_id - self.late_window, 0)
+            while True:
+                rows = list(self.loader(after, since))
+                for row_id, house_id, visit_time, region in rows:
+                    if row_id in self._seen:
+                        continue
+                    self._seen.add(row_id)
+                    self.add(house_id, region, visit_time)
+                    loaded += 1
+                if rows:
+                    after = rows[-1][0]
+                    self._last_id = max(self._last_id, after)
+                if len(rows) < self.batch_size:
+                    break
+            floor = self._last_id - self.late_window
+            self._seen = {row_id for row_id in self._seen if row_id > floor}
+            self._synced_at = now
+            return loaded
+        finally:
+            self._sync_lock.release()
+
+    def top(self, region: Optional[str] = CITYWIDE, limit: int = 10) -> List[Tuple[int, float]]:
+        """榜单：[(house_id, 衰减后的浏览次数)]，按热度降序；region 为 None 时为全市榜"""
+        with self._lock:
+            board = self._boards.get(region, {})
+            decay = 2 ** ((self._t0 - time.time()) / self.half_life)
+            return [(house_id, round(score * decay, 2))
+                    for house_id, score in heapq.nlargest(limit, board.items(), key=lambda item: item[1])]
+
+    def get_stats(self) -> Dict:
+        """榜单状态，用于监控"""
+        with self._lock:
+            return {
+                'houses': len(self._scores),
+                'regions': len(self._boards) - 1,
+                'events': self.events,
+                'last_id': self._last_id,
+                'rebases': self.rebases,
+                'half_life_hours': round(self.half_life / 3600, 2),
+                'synced_seconds_ago': round(time.time() - self._synced_at, 1) if self._synced_at else None
+            }
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库结构迁移
+migrations/ 目录下按版本号命名的 SQL 文件（如 0001_hot_path_indexes.sql）按顺序执行，
+已执行的版本记录在 schema_migrations 表中，重复运行只会执行新增的版本。
+迁移文件发布后不应再修改，校验和不一致时会给出警告。
+
+--check 对热点查询执行 EXPLAIN，有查询退化为全表扫描时以非零状态退出，可用于部署前检查。
+
+用法:
+    python migrate.py              # 执行尚未执行的迁移
+    python migrate.py --status     # 查看各版本的执行状态
+    python migrate.py --check      # 检查热点查询的执行计划
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+import pymysql
+
+from database import db_manager
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+CREATE_SCHEMA_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at DATETIME NOT NULL
+    ) DEFAULT CHARSET=utf8mb4
+"""
+
+# 可以忽略的错误：要添加的字段或索引已存在、要删除的字段或索引已不存在（例如 create_all
+# 新建的表已经是迁移后的结构）。错误码 -> (说明, 适用的语句)，只对对应的 ALTER / CREATE INDEX 忽略，
+# 其他语句出现同样的错误时照常中止迁移
+IGNORED_ERRORS = {
+    1060: ('字段已存在', re.compile(r'^ALTER\s+TABLE\b.*\bADD\s+COLUMN\b', re.I | re.S)),
+    1061: ('索引已存在', re.compile(r'^(ALTER\s+TABLE\b.*\bADD\s+(UNIQUE\s+)?(INDEX|KEY)\b'
+                                r'|CREATE\s+(UNIQUE\s+)?INDEX\b)', re.I | re.S)),
+    1091: ('字段或索引不存在', re.compile(r'^ALTER\s+TABLE\b.*\bDROP\s+(COLUMN|INDEX|KEY)\b', re.I | re.S))
+}
+
+# 热点查询：(名称, 表, SQL, 参数)，与 app.py 中的查询保持一致
+HOT_QUERIES = [
+    ('收藏状态', 'favorites',
+     "SELECT id FROM favorites WHERE user_id = %s AND house_id = %s", (1, 1)),
+    ('收藏列表', 'favorites',
+     "SELECT f.id, h.id FROM favorites f JOIN house_info h ON h.id = f.house_id WHERE f.user_id = %s "
+     "AND (f.created_at < %s OR (f.created_at = %s AND f.id < %s)) "
+     "ORDER BY f.created_at DESC, f.id DESC LIMIT 21",
+     (1, '2030-01-01 00:00:00', '2030-01-01 00:00:00', 1 << 30)),
+    ('最近浏览（登录用户）', 'browse_history',
+     "SELECT id FROM browse_history WHERE user_id = %s AND house_id = %s AND visit_time > %s LIMIT 1",
+     (1, 1, '2024-01-01 00:00:00')),
+    ('最近浏览（匿名用户）', 'browse_history',
+     "SELECT id FROM browse_history WHERE ip_address = %s AND house_id = %s AND visit_time > %s LIMIT 1",
+     ('127.0.0.1', 1, '2024-01-01 00:00:00')),
+    ('浏览记录页', 'browse_history',
+     "SELECT b.id FROM browse_history b JOIN house_info h ON b.house_id = h.id "
+     "WHERE b.user_id = %s AND b.visit_time >= %s ORDER BY b.visit_time DESC LIMIT 20",
+     (1, '2024-01-01 00:00:00')),
+    ('相似房源（区域+租赁类型）', 'house_info',
+     "SELECT id FROM house_info WHERE region = %s AND rent_type = %s AND id != %s LIMIT 4",
+     ('朝阳', '整租', 1)),
+    ('相似房源（户型+租赁类型）', 'house_info',
+     "SELECT id FROM house_info WHERE rooms = %s AND rent_type = %s AND id != %s LIMIT 10",
+     ('2室1厅', '整租', 1)),
+    ('批量导入（按房源编号去重）', 'house_info',
+     "SELECT id FROM house_info WHERE house_num IN (%s, %s)", ('BJ0000000001', 'BJ0000000002')),
+    ('附近房源', 'house_info',
+     "SELECT id FROM house_info WHERE latitude BETWEEN %s AND %s AND longitude BETWEEN %s AND %s",
+     (39.90, 39.95, 116.40, 116.45))
+]
+
+# 表的数据量低于该值时优化器会直接全表扫描，执行计划不具参考性，跳过检查
+CHECK_MIN_ROWS = 1000
+
+# 视为全表扫描的访问类型（ALL：扫描全表，index：扫描整个索引）
+FULL_SCAN_TYPES = ('ALL', 'index')
+
+_FILE_PATTERN = re.compile(r'^(\d+)_(.+)\.sql$')
+
+
+def load_migrations(directory=None):
+    """读取迁移文件，按版本号排序
+
+    Returns:
+        [(版本号, 名称, SQL 文本, 校验和)]
+    """
+    directory = directory or MIGRATIONS_DIR
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            sql = f.read()
+        migrations.append((int(match.group(1)), match.group(2), sql,
+                           hashlib.sha256(sql.encode('utf-8')).hexdigest()))
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"迁移版本号重复: {versions}")
+    return migrations
+
+
+def split_statements(sql):
+    """去掉注释行后按分号拆分为单条语句
+
+    与 mysql 命令行相同，触发器、存储过程等包含分号的语句用 DELIMITER 临时切换分隔符。
+    """
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('--'):
+            continue
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        buffer.append(line)
+        text = '\n'.join(buffer)
+        while delimiter in text:
+            statement, text = text.split(delimiter, 1)
+            if statement.strip():
+                statements.append(statement.strip())
+        buffer = [text] if text.strip() else []
+    if buffer and '\n'.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+
+def ignored_error(statement, code):
+    """语句执行出错时是否可以跳过
+
+    Returns:
+        可以跳过时返回说明，否则返回 None
+    """
+    if code not in IGNORED_ERRORS:
+        return None
+    reason, pattern = IGNORED_ERRORS[code]
+    return reason if pattern.search(statement) else None
+
+
+def applied_migrations(conn):
+    """已执行的版本 -> 校验和"""
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_SCHEMA_TABLE_SQL)
+        cursor.execute("SELECT version, checksum FROM schema_migrations")
+        return dict(cursor.fetchall())
+
+
+def apply_migrations(conn, target=None):
+    """在给定连接上执行尚未执行的迁移（不关闭连接）
+
+    MySQL 的 DDL 会隐式提交，单个迁移中途失败时已执行的语句不会回滚；
+    修复后重新运行即可，已存在的字段和索引会被跳过。
+
+    Args:
+        conn: PyMySQL 连接，迁移作用于该连接当前选择的数据库
+        target: 只执行到该版本（含），默认全部
+
+    Returns:
+        本次执行的版本列表
+    """
+    executed = []
+    try:
+        applied = applied_migrations(conn)
+        for version, name, sql, checksum in load_migrations():
+            if target is not None and version > target:
+                break
+            if version in applied:
+                if applied[version] != checksum:
+                    print(f"⚠️ 迁移 {version:04d}_{name} 在执行后被修改过，不会重新执行")
+                continue
+
+            print(f"执行迁移 {version:04d}_{name} ...")
+            with conn.cursor() as cursor:
+                for statement in split_statements(sql):
+                    try:
+                        cursor.execute(statement)
+                    except pymysql.err.OperationalError as e:
+                        reason = ignored_error(statement, e.args[0])
+                        if reason is None:
+                            raise
+                        print(f"   跳过（{reason}）: {statement.splitlines()[0]}")
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum, applied_at) VALUES (%s, %s, %s, NOW())",
+                    (version, name, checksum)
+                )
+            conn.commit()
+            executed.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    return executed
+
+
+def migrate(target=None):
+    """在配置的数据库上执行尚未执行的迁移，见 apply_migrations()"""
+    conn = db_manager.get_connection()
+    try:
+        return apply_migrations(conn, target)
+    finally:
+        conn.close()
+
+
+def migration_status():
+    """各版本的执行状态：[(版本号, 名称, 是否已执行, 是否被修改)]"""
+    conn = db_manager.get_connection()
+    try:
+        applied = applied_migrations(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return [(version, name, version in applied, version in applied and applied[version] != checksum)
+            for version, name, _, checksum in load_migrations()]
+
+
+def check_query_plans():
+    """对热点查询执行 EXPLAIN
+
+    Returns:
+        [(名称, 结果, 说明)]，结果为 'ok'、'full_scan' 或 'skipped'
+    """
+    conn = db_manager.get_connection()
+    results = []
+    try:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(
+                "SELECT TABLE_NAME AS name, TABLE_ROWS AS row_count FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE()"
+            )
+            table_rows = {row['name']: row['row_count'] or 0 for row in cursor.fetchall()}
+
+            for name, table, sql, params in HOT_QUERIES:
+                if table not in table_rows:
+                    results.append((name, 'skipped', f"表 {table} 不存在"))
+                    continue
+                if table_rows[table] < CHECK_MIN_ROWS:
+                    results.append((name, 'skipped', f"表 {table} 只有约 {table_rows[table]} 行"))
+                    continue
+
+                cursor.execute(f"EXPLAIN {sql}", params)
+                plan = cursor.fetchall()
+                scans = [row for row in plan if row['type'] in FULL_SCAN_TYPES
+                         and table_rows.get(row['table'], CHECK_MIN_ROWS) >= CHECK_MIN_ROWS]
+                if scans:
+                    detail = ', '.join(f"{row['table']} type={row['type']} rows={row['rows']}" for row in scans)
+                    results.append((name, 'full_scan', detail))
+                else:
+                    detail = ', '.join(f"{row['table']} key={row['key']}" for row in plan if row['table'])
+                    results.append((name, 'ok', detail))
+    finally:
+        conn.close()
+    return results
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='数据库结构迁移')
+    parser.add_argument('--status', action='store_true', help='查看迁移执行状态')
+    parser.add_argument('--check', action='store_true', help='检查热点查询是否使用索引')
+    parser.add_argument('--target', type=int, default=None, help='只执行到指定版本')
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, applied, modified in migration_status():
+            state = '已执行' if applied else '未执行'
+            if modified:
+                state += '（文件已修改）'
+            print(f"{version:04d}_{name}: {state}")
+        return
+
+    if args.check:
+        results = check_query_plans()
+        for name, result, detail in results:
+            mark = {'ok': '✅', 'full_scan': '❌', 'skipped': '⏭️'}[result]
+            print(f"{mark} {name}: {detail}")
+        failures = sum(1 for _, result, _ in results if result == 'full_scan')
+        if failures:
+            print(f"❌ {failures} 个热点查询退化为全表扫描")
+            sys.exit(1)
+        print("✅ 热点查询均使用索引")
+        return
+
+    start = time.time()
+    executed = migrate(args.target)
+    if executed:
+        print(f"✅ 已执行 {len(executed)} 个迁移, 用时 {time.time() - start:.1f} 秒")
+    else:
+        print("✅ 数据库结构已是最新")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+-- 热点查询所需的组合索引和唯一约束
+
+-- 收藏和浏览记录表由 app.py 的 db.create_all() 创建，尚未启动过应用时先建表
+CREATE TABLE IF NOT EXISTS `favorites` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `user_id` INT NOT NULL,
+    `house_id` INT NOT NULL,
+    `created_at` DATETIME
+) DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `browse_history` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `user_id` INT NULL,
+    `house_id` INT NOT NULL,
+    `ip_address` VARCHAR(50),
+    `visit_time` DATETIME,
+    `user_agent` TEXT
+) DEFAULT CHARSET=utf8mb4;
+
+-- 同一用户重复收藏同一房源时只保留最早的一条，再加唯一约束（同时作为 (user_id, house_id) 查询的索引）
+DELETE f1 FROM `favorites` f1
+JOIN `favorites` f2 ON f1.user_id = f2.user_id AND f1.house_id = f2.house_id AND f1.id > f2.id;
+
+ALTER TABLE `favorites` ADD UNIQUE INDEX `uk_favorites_user_house` (`user_id`, `house_id`);
+
+-- 详情页去重：登录用户 / 匿名用户最近是否访问过同一房源
+CREATE INDEX `idx_history_user_house_time` ON `browse_history` (`user_id`, `house_id`, `visit_time`);
+CREATE INDEX `idx_history_ip_house_time` ON `browse_history` (`ip_address`, `house_id`, `visit_time`);
+
+-- 浏览记录页：按用户取最近的记录
+CREATE INDEX `idx_history_user_time` ON `browse_history` (`user_id`, `visit_time`);
+
+-- 房源筛选和相似房源推荐
+CREATE INDEX `idx_house_region_rent_type` ON `house_info` (`region`, `rent_type`);
+CREATE INDEX `idx_house_rooms_rent_type` ON `house_info` (`rooms`, `rent_type`);
+CREATE INDEX `idx_house_rent_type` ON `house_info` (`rent_type`);
@@ -0,0 +1,32 @@
+-- 收藏列表按收藏时间做键集分页，收藏总数由计数表维护
+
+-- 没有收藏时间的旧记录按迁移时间补齐，之后收藏时间不允许为空
+UPDATE `favorites` SET `created_at` = CURRENT_TIMESTAMP WHERE `created_at` IS NULL;
+
+ALTER TABLE `favorites` MODIFY `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- (user_id, created_at) 加上 InnoDB 隐含的主键 id，正好是分页的排序键
+CREATE INDEX `idx_favorites_user_created` ON `favorites` (`user_id`, `created_at`);
+
+CREATE TABLE IF NOT EXISTS `user_counters` (
+    `user_id` INT PRIMARY KEY,
+    `favorite_count` INT NOT NULL DEFAULT 0
+) DEFAULT CHARSET=utf8mb4;
+
+-- 触发器随收藏的增删维护计数（与 house_rollup.py 相同，任何写入途径都会被计入）
+DROP TRIGGER IF EXISTS `favorites_counter_insert`;
+
+CREATE TRIGGER `favorites_counter_insert` AFTER INSERT ON `favorites` FOR EACH ROW
+    INSERT INTO `user_counters` (`user_id`, `favorite_count`) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE `favorite_count` = `favorite_count` + 1;
+
+DROP TRIGGER IF EXISTS `favorites_counter_delete`;
+
+CREATE TRIGGER `favorites_counter_delete` AFTER DELETE ON `favorites` FOR EACH ROW
+    UPDATE `user_counters` SET `favorite_count` = GREATEST(`favorite_count` - 1, 0)
+    WHERE `user_id` = OLD.user_id;
+
+-- 先装触发器再回填：回填期间的增删已由触发器计入，回填结果覆盖为准确值
+INSERT INTO `user_counters` (`user_id`, `favorite_count`)
+SELECT `user_id`, COUNT(*) FROM `favorites` GROUP BY `user_id`
+ON DUPLICATE KEY UPDATE `favorite_count` = VALUES(`favorite_count`);
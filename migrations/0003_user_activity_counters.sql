@@ -0,0 +1,41 @@
+-- 个人中心的浏览统计：累计浏览数记在 user_counters，最近30天按天分桶
+
+ALTER TABLE `user_counters` ADD COLUMN `browse_count` INT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS `user_daily_views` (
+    `user_id` INT NOT NULL,
+    `day` DATE NOT NULL,
+    `view_count` INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (`user_id`, `day`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 只统计登录用户；浏览数为累计值，不随浏览记录的过期清理减少，因此没有删除触发器
+DROP TRIGGER IF EXISTS `browse_history_counter_insert`;
+
+DELIMITER //
+CREATE TRIGGER `browse_history_counter_insert` AFTER INSERT ON `browse_history` FOR EACH ROW
+BEGIN
+    IF NEW.user_id IS NOT NULL THEN
+        INSERT INTO `user_counters` (`user_id`, `browse_count`) VALUES (NEW.user_id, 1)
+        ON DUPLICATE KEY UPDATE `browse_count` = `browse_count` + 1;
+
+        IF NEW.visit_time IS NOT NULL THEN
+            INSERT INTO `user_daily_views` (`user_id`, `day`, `view_count`)
+            VALUES (NEW.user_id, DATE(NEW.visit_time), 1)
+            ON DUPLICATE KEY UPDATE `view_count` = `view_count` + 1;
+        END IF;
+    END IF;
+END //
+DELIMITER ;
+
+-- 先装触发器再回填，回填结果覆盖为准确值
+INSERT INTO `user_counters` (`user_id`, `browse_count`)
+SELECT `user_id`, COUNT(*) FROM `browse_history` WHERE `user_id` IS NOT NULL GROUP BY `user_id`
+ON DUPLICATE KEY UPDATE `browse_count` = VALUES(`browse_count`);
+
+-- 只需回填最近30天（多回填一天，避免跨零点的误差）
+INSERT INTO `user_daily_views` (`user_id`, `day`, `view_count`)
+SELECT `user_id`, DATE(`visit_time`), COUNT(*) FROM `browse_history`
+WHERE `user_id` IS NOT NULL AND `visit_time` >= UTC_DATE() - INTERVAL 31 DAY
+GROUP BY `user_id`, DATE(`visit_time`)
+ON DUPLICATE KEY UPDATE `view_count` = VALUES(`view_count`);
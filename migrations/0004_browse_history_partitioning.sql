@@ -0,0 +1,57 @@
+-- 浏览记录按月分区：过期分区汇总到每日浏览量后整体删除；User-Agent 拆到去重的维度表
+
+CREATE TABLE IF NOT EXISTS `user_agents` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `ua_hash` CHAR(40) NOT NULL,
+    `user_agent` TEXT NOT NULL,
+    UNIQUE INDEX `uk_user_agents_hash` (`ua_hash`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 过期浏览记录的每日汇总（每个房源每天一行）
+CREATE TABLE IF NOT EXISTS `house_daily_views` (
+    `house_id` INT NOT NULL,
+    `day` DATE NOT NULL,
+    `view_count` INT NOT NULL DEFAULT 0,
+    `visitor_count` INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (`house_id`, `day`)
+) DEFAULT CHARSET=utf8mb4;
+
+ALTER TABLE `browse_history` ADD COLUMN `user_agent_id` INT NULL AFTER `visit_time`;
+
+-- 只有 0001 创建的旧表带 user_agent 字段，create_all 新建的表已经是迁移后的结构
+DROP PROCEDURE IF EXISTS `migrate_browse_user_agents`;
+
+DELIMITER //
+CREATE PROCEDURE `migrate_browse_user_agents`()
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'browse_history' AND COLUMN_NAME = 'user_agent') THEN
+        INSERT IGNORE INTO `user_agents` (`ua_hash`, `user_agent`)
+        SELECT DISTINCT SHA1(`user_agent`), `user_agent` FROM `browse_history`
+        WHERE `user_agent` IS NOT NULL AND `user_agent` != '';
+
+        UPDATE `browse_history` b JOIN `user_agents` u ON u.ua_hash = SHA1(b.user_agent)
+        SET b.user_agent_id = u.id
+        WHERE b.user_agent IS NOT NULL AND b.user_agent != '';
+
+        ALTER TABLE `browse_history` DROP COLUMN `user_agent`;
+    END IF;
+END //
+DELIMITER ;
+
+CALL `migrate_browse_user_agents`();
+
+DROP PROCEDURE `migrate_browse_user_agents`;
+
+-- 分区列必须包含在主键中，且不能为空
+UPDATE `browse_history` SET `visit_time` = UTC_TIMESTAMP() WHERE `visit_time` IS NULL;
+
+ALTER TABLE `browse_history`
+    MODIFY `visit_time` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (`id`, `visit_time`);
+
+-- 先放在一个分区中，由 browse_retention.py 拆分为按月分区并提前创建后续月份
+ALTER TABLE `browse_history` PARTITION BY RANGE COLUMNS (`visit_time`) (
+    PARTITION `pmax` VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,35 @@
+-- 保存的搜索（订阅）、新房源匹配结果，以及批处理任务的水位线
+
+CREATE TABLE IF NOT EXISTS `saved_searches` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `user_id` INT NOT NULL,
+    `name` VARCHAR(100) NOT NULL,
+    `region` VARCHAR(100) NULL,
+    `rent_type` VARCHAR(100) NULL,
+    `rooms` VARCHAR(100) NULL,
+    `min_price` INT NULL,
+    `max_price` INT NULL,
+    `keyword` VARCHAR(100) NULL,
+    `latitude` DECIMAL(10, 7) NULL,
+    `longitude` DECIMAL(10, 7) NULL,
+    `radius_km` FLOAT NULL,
+    `created_at` DATETIME NOT NULL,
+    INDEX `idx_saved_searches_user` (`user_id`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 同一订阅同一房源只记录一次；动态按 (user_id, id) 倒序分页
+CREATE TABLE IF NOT EXISTS `saved_search_matches` (
+    `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+    `search_id` INT NOT NULL,
+    `user_id` INT NOT NULL,
+    `house_id` INT NOT NULL,
+    `matched_at` DATETIME NOT NULL,
+    UNIQUE INDEX `uk_saved_search_matches` (`search_id`, `house_id`),
+    INDEX `idx_saved_search_matches_user` (`user_id`, `id`)
+) DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `job_watermarks` (
+    `name` VARCHAR(50) PRIMARY KEY,
+    `value` BIGINT NOT NULL,
+    `updated_at` DATETIME NOT NULL
+) DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,68 @@
+-- 批量导入（house_ingest.py）：按房源编号去重，记录房源变更事件
+
+-- 空编号视为没有编号
+UPDATE `house_info` SET `house_num` = NULL WHERE `house_num` = '';
+
+-- 编号重复的旧房源合并到ID最小的一条，合并关系保留在该表中供核对
+CREATE TABLE IF NOT EXISTS `house_num_merges` (
+    `dup_id` INT PRIMARY KEY,
+    `keep_id` INT NOT NULL,
+    `house_num` VARCHAR(100) NOT NULL,
+    `merged_at` DATETIME NOT NULL
+) DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO `house_num_merges` (`dup_id`, `keep_id`, `house_num`, `merged_at`)
+SELECT h.id, d.keep_id, h.house_num, UTC_TIMESTAMP()
+FROM `house_info` h
+JOIN (
+    SELECT `house_num`, MIN(`id`) AS keep_id FROM `house_info`
+    WHERE `house_num` IS NOT NULL GROUP BY `house_num` HAVING COUNT(*) > 1
+) d ON h.house_num = d.house_num AND h.id <> d.keep_id;
+
+-- 收藏和订阅匹配改指向保留的房源，已同时指向保留房源的记录（唯一约束冲突）随后删除
+UPDATE IGNORE `favorites` f JOIN `house_num_merges` m ON f.house_id = m.dup_id
+SET f.house_id = m.keep_id;
+
+DELETE f FROM `favorites` f JOIN `house_num_merges` m ON f.house_id = m.dup_id;
+
+UPDATE IGNORE `saved_search_matches` s JOIN `house_num_merges` m ON s.house_id = m.dup_id
+SET s.house_id = m.keep_id;
+
+DELETE s FROM `saved_search_matches` s JOIN `house_num_merges` m ON s.house_id = m.dup_id;
+
+-- 浏览记录、每日浏览量和浏览次数合并到保留的房源
+UPDATE `browse_history` b JOIN `house_num_merges` m ON b.house_id = m.dup_id
+SET b.house_id = m.keep_id;
+
+INSERT INTO `house_daily_views` (`house_id`, `day`, `view_count`, `visitor_count`)
+SELECT m.keep_id, v.day, SUM(v.view_count), SUM(v.visitor_count)
+FROM `house_daily_views` v JOIN `house_num_merges` m ON v.house_id = m.dup_id
+GROUP BY m.keep_id, v.day
+ON DUPLICATE KEY UPDATE `view_count` = `view_count` + VALUES(`view_count`),
+                        `visitor_count` = `visitor_count` + VALUES(`visitor_count`);
+
+DELETE v FROM `house_daily_views` v JOIN `house_num_merges` m ON v.house_id = m.dup_id;
+
+UPDATE `house_info` k
+JOIN (
+    SELECT m.keep_id, SUM(COALESCE(h.page_views, 0)) AS page_views
+    FROM `house_info` h JOIN `house_num_merges` m ON h.id = m.dup_id
+    GROUP BY m.keep_id
+) s ON k.id = s.keep_id
+SET k.page_views = COALESCE(k.page_views, 0) + s.page_views;
+
+DELETE h FROM `house_info` h JOIN `house_num_merges` m ON h.id = m.dup_id;
+
+ALTER TABLE `house_info` ADD UNIQUE INDEX `uk_house_info_house_num` (`house_num`);
+
+-- 导入时新房源的ID由数据库分配，不再由导入进程计算 MAX(id)+1
+ALTER TABLE `house_info` MODIFY `id` INT NOT NULL AUTO_INCREMENT;
+
+-- 每个插入或修改的房源一条事件，下游按事件ID水位线增量刷新
+CREATE TABLE IF NOT EXISTS `house_changes` (
+    `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+    `house_id` INT NOT NULL,
+    `change_type` VARCHAR(10) NOT NULL,
+    `changed_at` DATETIME NOT NULL,
+    INDEX `idx_house_changes_house` (`house_id`)
+) DEFAULT CHARSET=utf8mb4;
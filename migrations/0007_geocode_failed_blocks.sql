@@ -0,0 +1,9 @@
+-- 小区级地理编码（amap_geocoding.py --mode block）无法解析到街道/建筑级别的小区，
+-- 记录后不再重复请求，这些小区的房源由逐条地址编码处理
+
+CREATE TABLE IF NOT EXISTS `geocode_failed_blocks` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `block` VARCHAR(100) NOT NULL,
+    `failed_at` DATETIME NOT NULL,
+    PRIMARY KEY (`region`, `block`)
+) DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,122 @@
+-- 房源统计汇总表（house_rollup.py）：区域 × 户型 × 租赁类型 × 朝向的分组统计，由 house_info 上的触发器增量维护
+-- 执行后运行 python house_rollup.py 从 house_info 全量重建汇总数据
+
+CREATE TABLE IF NOT EXISTS `house_rollup` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `rooms` VARCHAR(100) NOT NULL DEFAULT '',
+    `rent_type` VARCHAR(100) NOT NULL DEFAULT '',
+    `direction` VARCHAR(100) NOT NULL DEFAULT '',
+    `listing_count` INT NOT NULL DEFAULT 0,
+    `valid_count` INT NOT NULL DEFAULT 0,
+    `price_sum` DOUBLE NOT NULL DEFAULT 0,
+    `price_sq_sum` DOUBLE NOT NULL DEFAULT 0,
+    `area_sum` DOUBLE NOT NULL DEFAULT 0,
+    `area_sq_sum` DOUBLE NOT NULL DEFAULT 0,
+    `unit_price_sum` DOUBLE NOT NULL DEFAULT 0,
+    `unit_price_sq_sum` DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (`region`, `rooms`, `rent_type`, `direction`)
+) DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `house_price_histogram` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `rooms` VARCHAR(100) NOT NULL DEFAULT '',
+    `rent_type` VARCHAR(100) NOT NULL DEFAULT '',
+    `direction` VARCHAR(100) NOT NULL DEFAULT '',
+    `bucket` SMALLINT NOT NULL,
+    `listing_count` INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (`region`, `rooms`, `rent_type`, `direction`, `bucket`)
+) DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `house_area_histogram` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `rooms` VARCHAR(100) NOT NULL DEFAULT '',
+    `rent_type` VARCHAR(100) NOT NULL DEFAULT '',
+    `direction` VARCHAR(100) NOT NULL DEFAULT '',
+    `bucket` SMALLINT NOT NULL,
+    `listing_count` INT NOT NULL DEFAULT 0,
+    `unit_price_sum` DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (`region`, `rooms`, `rent_type`, `direction`, `bucket`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 已用旧版 house_rollup.py 安装过的库先删除原有的触发器和存储过程
+DROP TRIGGER IF EXISTS `house_info_rollup_insert`;
+DROP TRIGGER IF EXISTS `house_info_rollup_update`;
+DROP TRIGGER IF EXISTS `house_info_rollup_delete`;
+DROP PROCEDURE IF EXISTS `house_rollup_apply`;
+
+-- 把一条房源计入（p_sign=1）或移出（p_sign=-1）汇总表
+-- 分桶宽度 500 元、10 平方米与 database.PRICE_BUCKET_WIDTH、AREA_BUCKET_WIDTH 一致
+DELIMITER //
+CREATE PROCEDURE `house_rollup_apply`(
+    IN p_region VARCHAR(100), IN p_rooms VARCHAR(100),
+    IN p_rent_type VARCHAR(100), IN p_direction VARCHAR(100),
+    IN p_price VARCHAR(100), IN p_area VARCHAR(100), IN p_sign INT)
+BEGIN
+    DECLARE v_valid INT DEFAULT 0;
+    DECLARE v_price DOUBLE DEFAULT 0;
+    DECLARE v_area DOUBLE DEFAULT 0;
+    DECLARE v_unit DOUBLE DEFAULT 0;
+
+    SET p_region = COALESCE(p_region, '');
+    SET p_rooms = COALESCE(p_rooms, '');
+    SET p_rent_type = COALESCE(p_rent_type, '');
+    SET p_direction = COALESCE(p_direction, '');
+
+    IF p_price REGEXP '^[0-9]+$' AND p_area REGEXP '^[0-9]+$' THEN
+        SET v_price = CAST(p_price AS UNSIGNED);
+        SET v_area = CAST(p_area AS UNSIGNED);
+        IF v_price > 0 AND v_price < 100000 AND v_area > 0 AND v_area < 1000 THEN
+            SET v_valid = 1;
+            SET v_unit = v_price / v_area;
+        END IF;
+    END IF;
+
+    INSERT INTO `house_rollup`
+        (`region`, `rooms`, `rent_type`, `direction`, `listing_count`, `valid_count`,
+         `price_sum`, `price_sq_sum`, `area_sum`, `area_sq_sum`, `unit_price_sum`, `unit_price_sq_sum`)
+    VALUES
+        (p_region, p_rooms, p_rent_type, p_direction, p_sign, p_sign * v_valid,
+         p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price,
+         p_sign * v_valid * v_area, p_sign * v_valid * v_area * v_area,
+         p_sign * v_unit, p_sign * v_unit * v_unit)
+    ON DUPLICATE KEY UPDATE
+        `listing_count` = `listing_count` + VALUES(`listing_count`),
+        `valid_count` = `valid_count` + VALUES(`valid_count`),
+        `price_sum` = `price_sum` + VALUES(`price_sum`),
+        `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+        `area_sum` = `area_sum` + VALUES(`area_sum`),
+        `area_sq_sum` = `area_sq_sum` + VALUES(`area_sq_sum`),
+        `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`),
+        `unit_price_sq_sum` = `unit_price_sq_sum` + VALUES(`unit_price_sq_sum`);
+
+    IF v_valid = 1 THEN
+        INSERT INTO `house_price_histogram` (`region`, `rooms`, `rent_type`, `direction`, `bucket`, `listing_count`)
+        VALUES (p_region, p_rooms, p_rent_type, p_direction, FLOOR(v_price / 500), p_sign)
+        ON DUPLICATE KEY UPDATE `listing_count` = `listing_count` + VALUES(`listing_count`);
+
+        INSERT INTO `house_area_histogram`
+            (`region`, `rooms`, `rent_type`, `direction`, `bucket`, `listing_count`, `unit_price_sum`)
+        VALUES (p_region, p_rooms, p_rent_type, p_direction, FLOOR(v_area / 10), p_sign, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_rollup_insert` AFTER INSERT ON `house_info` FOR EACH ROW
+    CALL house_rollup_apply(NEW.region, NEW.rooms, NEW.rent_type, NEW.direction, NEW.price, NEW.area, 1) //
+
+-- 浏览量、坐标等字段的更新不影响汇总
+CREATE TRIGGER `house_info_rollup_update` AFTER UPDATE ON `house_info` FOR EACH ROW
+BEGIN
+    IF NOT (OLD.region <=> NEW.region AND OLD.rooms <=> NEW.rooms
+            AND OLD.rent_type <=> NEW.rent_type AND OLD.direction <=> NEW.direction
+            AND OLD.price <=> NEW.price AND OLD.area <=> NEW.area) THEN
+        CALL house_rollup_apply(OLD.region, OLD.rooms, OLD.rent_type, OLD.direction, OLD.price, OLD.area, -1);
+        CALL house_rollup_apply(NEW.region, NEW.rooms, NEW.rent_type, NEW.direction, NEW.price, NEW.area, 1);
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_rollup_delete` AFTER DELETE ON `house_info` FOR EACH ROW
+    CALL house_rollup_apply(OLD.region, OLD.rooms, OLD.rent_type, OLD.direction, OLD.price, OLD.area, -1) //
+DELIMITER ;
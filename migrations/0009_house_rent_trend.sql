@@ -0,0 +1,162 @@
+-- 租金走势时间序列（house_trend.py）：按周、按月 × 区域 × 户型汇总，由 house_info 上的触发器增量维护
+-- 执行后运行 python house_trend.py 从 house_info 全量重建走势数据
+
+CREATE TABLE IF NOT EXISTS `house_rent_trend` (
+    `period_type` VARCHAR(10) NOT NULL,
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `rooms` VARCHAR(100) NOT NULL DEFAULT '',
+    `period_start` DATE NOT NULL,
+    `listing_count` INT NOT NULL DEFAULT 0,
+    `valid_count` INT NOT NULL DEFAULT 0,
+    `price_sum` DOUBLE NOT NULL DEFAULT 0,
+    `price_sq_sum` DOUBLE NOT NULL DEFAULT 0,
+    `unit_price_sum` DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (`period_type`, `region`, `rooms`, `period_start`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 已用旧版 house_trend.py 安装过的库先删除原有的触发器和存储过程
+DROP TRIGGER IF EXISTS `house_info_trend_insert`;
+DROP TRIGGER IF EXISTS `house_info_trend_update`;
+DROP TRIGGER IF EXISTS `house_info_trend_delete`;
+DROP PROCEDURE IF EXISTS `house_trend_apply`;
+
+-- 把一条房源计入（p_sign=1）或移出（p_sign=-1）走势表，没有发布时间的房源不统计
+-- 每条房源计入 区域 × 户型、区域、户型、全市（'*'）四个维度组合，周从周一开始，月从1日开始
+DELIMITER //
+CREATE PROCEDURE `house_trend_apply`(
+    IN p_region VARCHAR(100), IN p_rooms VARCHAR(100), IN p_publish_time INT,
+    IN p_price VARCHAR(100), IN p_area VARCHAR(100), IN p_sign INT)
+BEGIN
+    DECLARE v_valid INT DEFAULT 0;
+    DECLARE v_price DOUBLE DEFAULT 0;
+    DECLARE v_area DOUBLE DEFAULT 0;
+    DECLARE v_unit DOUBLE DEFAULT 0;
+
+    IF p_publish_time IS NOT NULL AND p_publish_time > 0 THEN
+        SET p_region = COALESCE(p_region, '');
+        SET p_rooms = COALESCE(p_rooms, '');
+
+        IF p_price REGEXP '^[0-9]+$' AND p_area REGEXP '^[0-9]+$' THEN
+            SET v_price = CAST(p_price AS UNSIGNED);
+            SET v_area = CAST(p_area AS UNSIGNED);
+            IF v_price > 0 AND v_price < 100000 AND v_area > 0 AND v_area < 1000 THEN
+                SET v_valid = 1;
+                SET v_unit = v_price / v_area;
+            END IF;
+        END IF;
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('week', p_region, p_rooms, DATE(FROM_UNIXTIME(p_publish_time)) - INTERVAL WEEKDAY(FROM_UNIXTIME(p_publish_time)) DAY,
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('week', p_region, '*', DATE(FROM_UNIXTIME(p_publish_time)) - INTERVAL WEEKDAY(FROM_UNIXTIME(p_publish_time)) DAY,
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('week', '*', p_rooms, DATE(FROM_UNIXTIME(p_publish_time)) - INTERVAL WEEKDAY(FROM_UNIXTIME(p_publish_time)) DAY,
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('week', '*', '*', DATE(FROM_UNIXTIME(p_publish_time)) - INTERVAL WEEKDAY(FROM_UNIXTIME(p_publish_time)) DAY,
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('month', p_region, p_rooms, DATE_FORMAT(FROM_UNIXTIME(p_publish_time), '%Y-%m-01'),
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('month', p_region, '*', DATE_FORMAT(FROM_UNIXTIME(p_publish_time), '%Y-%m-01'),
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('month', '*', p_rooms, DATE_FORMAT(FROM_UNIXTIME(p_publish_time), '%Y-%m-01'),
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+
+        INSERT INTO `house_rent_trend`
+            (`period_type`, `region`, `rooms`, `period_start`, `listing_count`, `valid_count`,
+             `price_sum`, `price_sq_sum`, `unit_price_sum`)
+        VALUES ('month', '*', '*', DATE_FORMAT(FROM_UNIXTIME(p_publish_time), '%Y-%m-01'),
+                p_sign, p_sign * v_valid, p_sign * v_valid * v_price, p_sign * v_valid * v_price * v_price, p_sign * v_unit)
+        ON DUPLICATE KEY UPDATE
+            `listing_count` = `listing_count` + VALUES(`listing_count`),
+            `valid_count` = `valid_count` + VALUES(`valid_count`),
+            `price_sum` = `price_sum` + VALUES(`price_sum`),
+            `price_sq_sum` = `price_sq_sum` + VALUES(`price_sq_sum`),
+            `unit_price_sum` = `unit_price_sum` + VALUES(`unit_price_sum`);
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_trend_insert` AFTER INSERT ON `house_info` FOR EACH ROW
+    CALL house_trend_apply(NEW.region, NEW.rooms, NEW.publish_time, NEW.price, NEW.area, 1) //
+
+-- 浏览量、坐标等字段的更新不影响走势
+CREATE TRIGGER `house_info_trend_update` AFTER UPDATE ON `house_info` FOR EACH ROW
+BEGIN
+    IF NOT (OLD.region <=> NEW.region AND OLD.rooms <=> NEW.rooms
+            AND OLD.publish_time <=> NEW.publish_time
+            AND OLD.price <=> NEW.price AND OLD.area <=> NEW.area) THEN
+        CALL house_trend_apply(OLD.region, OLD.rooms, OLD.publish_time, OLD.price, OLD.area, -1);
+        CALL house_trend_apply(NEW.region, NEW.rooms, NEW.publish_time, NEW.price, NEW.area, 1);
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_trend_delete` AFTER DELETE ON `house_info` FOR EACH ROW
+    CALL house_trend_apply(OLD.region, OLD.rooms, OLD.publish_time, OLD.price, OLD.area, -1) //
+DELIMITER ;
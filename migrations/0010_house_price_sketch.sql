@@ -0,0 +1,54 @@
+-- 租金分位数草图（house_price_sketch.py）：区域 × 户型的对数分桶计数，由 house_info 上的触发器增量维护
+-- 执行后运行 python house_price_sketch.py 从 house_info 全量重建草图数据
+
+CREATE TABLE IF NOT EXISTS `house_price_sketch` (
+    `region` VARCHAR(100) NOT NULL DEFAULT '',
+    `rooms` VARCHAR(100) NOT NULL DEFAULT '',
+    `bin` SMALLINT NOT NULL,
+    `listing_count` INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (`region`, `rooms`, `bin`)
+) DEFAULT CHARSET=utf8mb4;
+
+-- 已用旧版 house_price_sketch.py 安装过的库先删除原有的触发器和存储过程
+DROP TRIGGER IF EXISTS `house_info_sketch_insert`;
+DROP TRIGGER IF EXISTS `house_info_sketch_update`;
+DROP TRIGGER IF EXISTS `house_info_sketch_delete`;
+DROP PROCEDURE IF EXISTS `house_price_sketch_apply`;
+
+-- 把一条有效房源计入（p_sign=1）或移出（p_sign=-1）草图
+-- 分桶编号 CEIL(LN(租金) / LN(γ))，γ = 1.01 / 0.99，与 house_price_sketch.bin_index() 一致
+DELIMITER //
+CREATE PROCEDURE `house_price_sketch_apply`(
+    IN p_region VARCHAR(100), IN p_rooms VARCHAR(100),
+    IN p_price VARCHAR(100), IN p_area VARCHAR(100), IN p_sign INT)
+BEGIN
+    DECLARE v_price DOUBLE DEFAULT 0;
+    DECLARE v_area DOUBLE DEFAULT 0;
+
+    IF p_price REGEXP '^[0-9]+$' AND p_area REGEXP '^[0-9]+$' THEN
+        SET v_price = CAST(p_price AS UNSIGNED);
+        SET v_area = CAST(p_area AS UNSIGNED);
+        IF v_price > 0 AND v_price < 100000 AND v_area > 0 AND v_area < 1000 THEN
+            INSERT INTO `house_price_sketch` (`region`, `rooms`, `bin`, `listing_count`)
+            VALUES (COALESCE(p_region, ''), COALESCE(p_rooms, ''), CEIL(LN(v_price) / 0.020000666706669435), p_sign)
+            ON DUPLICATE KEY UPDATE `listing_count` = `listing_count` + VALUES(`listing_count`);
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_sketch_insert` AFTER INSERT ON `house_info` FOR EACH ROW
+    CALL house_price_sketch_apply(NEW.region, NEW.rooms, NEW.price, NEW.area, 1) //
+
+-- 浏览量、坐标等字段的更新不影响草图
+CREATE TRIGGER `house_info_sketch_update` AFTER UPDATE ON `house_info` FOR EACH ROW
+BEGIN
+    IF NOT (OLD.region <=> NEW.region AND OLD.rooms <=> NEW.rooms
+            AND OLD.price <=> NEW.price AND OLD.area <=> NEW.area) THEN
+        CALL house_price_sketch_apply(OLD.region, OLD.rooms, OLD.price, OLD.area, -1);
+        CALL house_price_sketch_apply(NEW.region, NEW.rooms, NEW.price, NEW.area, 1);
+    END IF;
+END //
+
+CREATE TRIGGER `house_info_sketch_delete` AFTER DELETE ON `house_info` FOR EACH ROW
+    CALL house_price_sketch_apply(OLD.region, OLD.rooms, OLD.price, OLD.area, -1) //
+DELIMITER ;
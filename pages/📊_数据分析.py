@@ -6,49 +6,88 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from database import db_manager
+from house_snapshot import get_snapshot, analytics_summary
+from house_trend import trend_series
 
 st.set_page_config(page_title="数据分析", page_icon="📊", layout="wide")
 
+@st.cache_data(ttl=300)
+def load_analytics(snapshot_version=None):
+    """计算统计结果：优先使用列式快照，否则在数据库中完成聚合"""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return analytics_summary(snapshot)
+
+    summary = db_manager.get_analytics_summary()
+    top_regions = db_manager.get_value_counts('region', limit=10)
+    top5 = top_regions['region'].head(5).tolist()
+    return {
+        'summary': summary,
+        'price_hist': db_manager.get_histogram('price', bins=30),
+        'area_hist': db_manager.get_histogram('area', bins=30),
+        'region_counts': top_regions,
+        'rent_type_counts': db_manager.get_value_counts('rent_type'),
+        'room_price': db_manager.get_room_price_stats(min_count=10),
+        'region_stats': db_manager.get_region_stats(top5),
+        'region_rooms': db_manager.get_region_room_counts(top5),
+        'top_regions': top5
+    }
+
+
+@st.cache_data(ttl=300)
+def load_sample(size=1000):
+    """随机抽样房源用于散点图"""
+    return db_manager.get_sample_listings(size)
+
+
+@st.cache_data(ttl=300)
+def load_trend(period, region, rooms, window):
+    """读取租金走势（来自 house_rent_trend 汇总表）"""
+    return pd.DataFrame(trend_series(period, region=region, rooms=rooms, window=window))
+
+
+def histogram_figure(hist, title, label):
+    """把数据库返回的分桶结果绘制为直方图"""
+    hist = hist.copy()
+    hist['range'] = hist.apply(lambda r: f"{r['bucket_start']:.0f}-{r['bucket_end']:.0f}", axis=1)
+    fig = px.bar(
+        hist,
+        x='range',
+        y='count',
+        title=title,
+        labels={'range': label, 'count': '房源数量'}
+    )
+    fig.update_layout(bargap=0)
+    return fig
+
+
 def main():
     st.title("📊 房源数据分析")
 
     try:
-        # 获取所有房源数据进行分析
-        all_houses = db_manager.get_houses(limit=10000)
+        # 统计覆盖全部房源；快照版本变化时缓存自动失效
+        snapshot = get_snapshot()
+        analytics = load_analytics(snapshot.version if snapshot is not None else None)
+        summary = analytics['summary']
 
-        if len(all_houses) == 0:
+        if not summary['total']:
             st.warning("没有可分析的数据")
             return
 
-        # 数据预处理
-        all_houses['price_numeric'] = pd.to_numeric(all_houses['price'], errors='coerce')
-        all_houses['area_numeric'] = pd.to_numeric(all_houses['area'], errors='coerce')
-
-        # 去除异常值
-        all_houses = all_houses[
-            (all_houses['price_numeric'] > 0) &
-            (all_houses['price_numeric'] < 100000) &
-            (all_houses['area_numeric'] > 0) &
-            (all_houses['area_numeric'] < 1000)
-        ]
-
         # 基础统计信息
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            st.metric("总房源数", len(all_houses))
+            st.metric("总房源数", int(summary['total']))
 
         with col2:
-            avg_price = all_houses['price_numeric'].mean()
-            st.metric("平均租金", f"¥{avg_price:.0f}/月")
+            st.metric("平均租金", f"¥{summary['avg_price']:.0f}/月")
 
         with col3:
-            avg_area = all_houses['area_numeric'].mean()
-            st.metric("平均面积", f"{avg_area:.1f}㎡")
+            st.metric("平均面积", f"{summary['avg_area']:.1f}㎡")
 
         with col4:
-            avg_unit_price = (all_houses['price_numeric'] / all_houses['area_numeric']).mean()
-            st.metric("平均单价", f"¥{avg_unit_price:.1f}/㎡")
+            st.metric("平均单价", f"¥{summary['avg_unit_price']:.1f}/㎡")
 
         st.divider()
 
@@ -58,25 +97,13 @@ def main():
         with col1:
             # 价格分布
             st.subheader("💰 租金分布")
-            fig_price = px.histogram(
-                all_houses,
-                x='price_numeric',
-                nbins=30,
-                title="租金分布直方图",
-                labels={'price_numeric': '租金(元/月)', 'count': '房源数量'}
-            )
+            fig_price = histogram_figure(analytics['price_hist'], "租金分布直方图", '租金(元/月)')
             st.plotly_chart(fig_price, use_container_width=True)
 
         with col2:
             # 面积分布
             st.subheader("📐 面积分布")
-            fig_area = px.histogram(
-                all_houses,
-                x='area_numeric',
-                nbins=30,
-                title="面积分布直方图",
-                labels={'area_numeric': '面积(㎡)', 'count': '房源数量'}
-            )
+            fig_area = histogram_figure(analytics['area_hist'], "面积分布直方图", '面积(㎡)')
             st.plotly_chart(fig_area, use_container_width=True)
 
         col1, col2 = st.columns(2)
@@ -84,10 +111,10 @@ def main():
         with col1:
             # 区域分布
             st.subheader("🏙️ 区域房源分布")
-            region_counts = all_houses['region'].value_counts().head(10)
+            region_counts = analytics['region_counts']
             fig_region = px.bar(
-                x=region_counts.index,
-                y=region_counts.values,
+                x=region_counts['region'],
+                y=region_counts['count'],
                 title="各区域房源数量TOP10",
                 labels={'x': '区域', 'y': '房源数量'}
             )
@@ -96,18 +123,17 @@ def main():
         with col2:
             # 租赁类型分布
             st.subheader("🏠 租赁类型分布")
-            rent_type_counts = all_houses['rent_type'].value_counts()
+            rent_type_counts = analytics['rent_type_counts']
             fig_rent = px.pie(
-                values=rent_type_counts.values,
-                names=rent_type_counts.index,
+                values=rent_type_counts['count'],
+                names=rent_type_counts['rent_type'],
                 title="租赁类型占比"
             )
             st.plotly_chart(fig_rent, use_container_width=True)
 
         # 房型分析
         st.subheader("🏡 房型与价格关系")
-        room_price = all_houses.groupby('rooms')['price_numeric'].agg(['mean', 'count']).reset_index()
-        room_price = room_price[room_price['count'] >= 10]  # 只显示房源数量>=10的房型
+        room_price = analytics['room_price']  # 只包含房源数量>=10的房型
 
         fig_room_price = px.bar(
             room_price,
@@ -120,7 +146,9 @@ def main():
 
         # 价格与面积散点图
         st.subheader("💹 租金与面积关系")
-        sample_data = all_houses.sample(min(1000, len(all_houses)))  # 随机采样1000条数据
+        sample_data = analytics.get('sample')
+        if sample_data is None:
+            sample_data = load_sample(1000)  # 随机采样1000条数据
 
         fig_scatter = px.scatter(
             sample_data,
@@ -129,35 +157,64 @@ def main():
             color='region',
             title="租金与面积关系散点图",
             labels={'area_numeric': '面积(㎡)', 'price_numeric': '租金(元/月)'},
-            hover_data=['title', 'rooms']
+            hover_data=[c for c in ['title', 'rooms'] if c in sample_data.columns]
         )
         st.plotly_chart(fig_scatter, use_container_width=True)
 
+        # 租金走势
+        st.subheader("📈 租金走势")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            trend_region = st.selectbox("区域", ['全市'] + analytics['region_counts']['region'].tolist())
+        with col2:
+            trend_rooms = st.selectbox("户型", ['全部'] + room_price['rooms'].tolist())
+        with col3:
+            trend_period = st.radio("周期", ['month', 'week'], horizontal=True,
+                                    format_func=lambda p: '按月' if p == 'month' else '按周')
+
+        trend = load_trend(trend_period,
+                           None if trend_region == '全市' else trend_region,
+                           None if trend_rooms == '全部' else trend_rooms,
+                           3)
+        if trend.empty:
+            st.info("暂无走势数据")
+        else:
+            fig_trend = go.Figure()
+            fig_trend.add_trace(go.Scatter(x=trend['period_start'], y=trend['avg_price'],
+                                           mode='lines+markers', name='平均租金'))
+            fig_trend.add_trace(go.Scatter(x=trend['period_start'], y=trend['moving_avg_price'],
+                                           mode='lines', name='3期移动平均'))
+            fig_trend.update_layout(title=f"{trend_region}{'' if trend_rooms == '全部' else trend_rooms}租金走势",
+                                    xaxis_title='发布时间', yaxis_title='租金(元/月)')
+            st.plotly_chart(fig_trend, use_container_width=True)
+
         # 热门区域详细分析
         st.subheader("🔥 热门区域分析")
-        top_regions = all_houses['region'].value_counts().head(5).index
+        region_stats = analytics['region_stats'].set_index('region')
+        region_rooms = analytics['region_rooms']
 
-        for region in top_regions:
-            region_data = all_houses[all_houses['region'] == region]
+        for region in analytics['top_regions']:
+            if region not in region_stats.index:
+                continue
+            stats = region_stats.loc[region]
 
-            with st.expander(f"📍 {region} (共{len(region_data)}套房源)"):
+            with st.expander(f"📍 {region} (共{int(stats['count'])}套房源)"):
                 col1, col2, col3 = st.columns(3)
 
                 with col1:
-                    st.metric("平均租金", f"¥{region_data['price_numeric'].mean():.0f}/月")
+                    st.metric("平均租金", f"¥{stats['avg_price']:.0f}/月")
 
                 with col2:
-                    st.metric("平均面积", f"{region_data['area_numeric'].mean():.1f}㎡")
+                    st.metric("平均面积", f"{stats['avg_area']:.1f}㎡")
 
                 with col3:
-                    avg_unit = (region_data['price_numeric'] / region_data['area_numeric']).mean()
-                    st.metric("平均单价", f"¥{avg_unit:.1f}/㎡")
+                    st.metric("平均单价", f"¥{stats['avg_unit_price']:.1f}/㎡")
 
                 # 该区域的房型分布
-                room_dist = region_data['rooms'].value_counts()
+                room_dist = region_rooms[region_rooms['region'] == region]
                 fig_room_dist = px.pie(
-                    values=room_dist.values,
-                    names=room_dist.index,
+                    values=room_dist['count'],
+                    names=room_dist['rooms'],
                     title=f"{region}房型分布"
                 )
                 st.plotly_chart(fig_room_dist, use_container_width=True)
@@ -42,7 +42,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             if (data.success) {
                 alert('收藏成功！');
-                updateFavoriteButtons();
+                markFavorite(houseId, true);
             } else {
                 alert('收藏失败：' + data.message);
             }
@@ -69,7 +69,7 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(data => {
                 if (data.success) {
                     alert('取消收藏成功！');
-                    updateFavoriteButtons();
+                    markFavorite(houseId, false);
                 } else {
                     alert('取消收藏失败：' + data.message);
                 }
@@ -81,33 +81,101 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     };
 
-    // 更新收藏按钮状态
+    // 把首页的筛选条件保存为订阅
+    window.saveSearch = function(form) {
+        const fields = ['region', 'rent_type', 'rooms', 'min_price', 'max_price'];
+        const payload = {keyword: form.elements['search'].value};
+        fields.forEach(name => {
+            payload[name] = form.elements[name].value;
+        });
+
+        fetch('/api/saved-searches', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => response.json())
+        .then(data => {
+            alert(data.success ? data.message : '订阅失败：' + data.message);
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('操作失败，请稍后重试');
+        });
+    };
+
+    // 删除订阅
+    window.deleteSavedSearch = function(searchId) {
+        if (confirm('确定要取消这个订阅吗？')) {
+            fetch(`/api/saved-searches/${searchId}`, {
+                method: 'DELETE'
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    location.reload();
+                } else {
+                    alert('取消订阅失败：' + data.message);
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('操作失败，请稍后重试');
+            });
+        }
+    };
+
+    function favoriteHouseId(button) {
+        return parseInt(button.dataset.houseId || button.getAttribute('onclick').match(/\d+/)[0]);
+    }
+
+    function setFavoriteButton(button, isFavorite) {
+        const houseId = favoriteHouseId(button);
+        button.dataset.favorited = isFavorite ? 'true' : 'false';
+        if (isFavorite) {
+            button.classList.remove('btn-outline-danger');
+            button.classList.add('btn-danger');
+            button.innerHTML = '<i class="fas fa-heart"></i> 已收藏';
+            button.setAttribute('onclick', `removeFavorite(${houseId})`);
+        } else {
+            button.classList.remove('btn-danger');
+            button.classList.add('btn-outline-danger');
+            button.innerHTML = '<i class="fas fa-heart"></i> 收藏';
+            button.setAttribute('onclick', `addToFavorites(${houseId})`);
+        }
+    }
+
+    // 收藏/取消收藏成功后直接更新该房源的按钮，无需重新查询
+    function markFavorite(houseId, isFavorite) {
+        document.querySelectorAll(`[data-house-id="${houseId}"]`).forEach(button => {
+            setFavoriteButton(button, isFavorite);
+        });
+    }
+
+    // 更新收藏按钮状态：服务端已渲染状态（data-favorited）的按钮直接使用，
+    // 其余按钮合并为一次批量查询
     function updateFavoriteButtons() {
-        const favoriteButtons = document.querySelectorAll('[onclick*="addToFavorites"]');
-
-        favoriteButtons.forEach(button => {
-            const houseId = button.getAttribute('onclick').match(/\d+/)[0];
-
-            // 从服务器检查收藏状态
-            fetch(`/api/favorites/check/${houseId}`)
-                .then(response => response.json())
-                .then(data => {
-                    if (data.is_favorite) {
-                        button.classList.remove('btn-outline-danger');
-                        button.classList.add('btn-danger');
-                        button.innerHTML = '<i class="fas fa-heart"></i> 已收藏';
-                        button.setAttribute('onclick', `removeFavorite(${houseId})`);
-                    } else {
-                        button.classList.remove('btn-danger');
-                        button.classList.add('btn-outline-danger');
-                        button.innerHTML = '<i class="fas fa-heart"></i> 收藏';
-                        button.setAttribute('onclick', `addToFavorites(${houseId})`);
-                    }
-                })
-                .catch(error => {
-                    console.error('Error checking favorite status:', error);
+        const favoriteButtons = Array.from(
+            document.querySelectorAll('[onclick*="addToFavorites"], [onclick*="removeFavorite"]')
+        ).filter(button => button.dataset.favorited === undefined);
+        if (favoriteButtons.length === 0) {
+            return;
+        }
+
+        const houseIds = [...new Set(favoriteButtons.map(favoriteHouseId))];
+        fetch(`/api/favorites/status?ids=${houseIds.join(',')}`)
+            .then(response => response.json())
+            .then(data => {
+                const favoriteIds = new Set(data.favorite_ids || []);
+                favoriteButtons.forEach(button => {
+                    setFavoriteButton(button, favoriteIds.has(favoriteHouseId(button)));
                 });
-        });
+            })
+            .catch(error => {
+                console.error('Error checking favorite status:', error);
+            });
     }
 
     // 页面加载时更新收藏按钮状态
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""测试直接导入仓库根目录下的模块"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 地理编码等脚本在当前目录写日志和进度文件，测试在临时目录中运行
+os.chdir(tempfile.mkdtemp(prefix='house-tests-'))
+
+from favorite_cache import FavoriteCache  # noqa: E402
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """把 app 的主库换成临时 SQLite 文件并建表（没有 MySQL 迁移安装的触发器，
+    按月分区的 browse_history 在 SQLite 中建不出来），返回 app 模块"""
+    import app as house_app
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'house.db'}")
+    monkeypatch.setitem(house_app.db._app_engines[house_app.app], None, engine)
+    monkeypatch.setattr(house_app, 'REPLICA_BINDS', [])
+    monkeypatch.setattr(house_app, 'READ_SNAPSHOT', None)
+    # 不启动热门榜预热线程
+    monkeypatch.setattr(house_app, '_trending_warmup_pid', os.getpid())
+    monkeypatch.setattr(house_app, 'favorite_cache', FavoriteCache(house_app.load_favorite_ids))
+    tables = [table for name, table in house_app.db.metadata.tables.items() if name != 'browse_history']
+    house_app.db.metadata.create_all(engine, tables=tables)
+    with house_app.app.app_context():
+        yield house_app
+        house_app.db.session.remove()
+    engine.dispose()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""amap_geocoding 的批量编码和小区级编码（对本地桩服务和 SQLite 压测库运行）"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from amap_stub_server import COARSE_MARKER, UNRESOLVABLE_MARKER, AmapStubServer
+from benchmark_geocoding import BenchmarkGeocoder, SQLiteConnection, seed_sqlite
+
+
+@pytest.fixture
+def stub():
+    server = AmapStubServer(('127.0.0.1', 0), seed=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _geocoder(stub, tmp_path, rows, cls=BenchmarkGeocoder):
+    path = str(tmp_path / 'geocoding.db')
+    seed_sqlite(path, rows)
+    geocoder = cls('test', stub.base_url, lambda: SQLiteConnection(path))
+    geocoder.delay = 0
+    geocoder.retry_delay = 0
+    # 出错时最多消耗这么多次调用，避免测试陷入死循环
+    geocoder.daily_quota = 200
+    return geocoder, path
+
+
+def _missing(path):
+    conn = SQLiteConnection(path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM house_info WHERE latitude IS NULL ORDER BY id")
+    ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return ids
+
+
+def test_batches_addresses(stub, tmp_path):
+    rows = [(i, f'朝阳区测试路{i}号', '朝阳', '') for i in range(1, 26)]
+    geocoder, path = _geocoder(stub, tmp_path, rows)
+    geocoder.process_geocoding()
+    assert geocoder.api_calls == 3  # 每次请求打包 10 条地址
+    assert geocoder.success_count == 25
+    assert _missing(path) == []
+
+
+def test_unresolvable_addresses_are_not_retried(stub, tmp_path):
+    rows = [(i, f'朝阳区测试路{i}号' + (UNRESOLVABLE_MARKER if i % 2 else ''), '朝阳', '') for i in range(1, 11)]
+    geocoder, path = _geocoder(stub, tmp_path, rows)
+    geocoder.process_geocoding()
+    assert geocoder.api_calls == 1
+    assert (geocoder.success_count, geocoder.fail_count, geocoder.retry_count) == (5, 5, 0)
+    assert _missing(path) == [1, 3, 5, 7, 9]
+
+
+class ReadOnlyGeocoder(BenchmarkGeocoder):
+    """坐标写入总是失败"""
+
+    def update_coordinates_batch(self, coordinates):
+        return False
+
+
+def test_write_failures_are_skipped_not_regeocoded(stub, tmp_path):
+    rows = [(i, f'朝阳区测试路{i}号', '朝阳', '') for i in range(1, 26)]
+    geocoder, path = _geocoder(stub, tmp_path, rows, cls=ReadOnlyGeocoder)
+    geocoder.process_geocoding()
+    # 写入失败的记录按失败跳过，每条地址只请求一次
+    assert geocoder.api_calls == 3
+    assert (geocoder.success_count, geocoder.fail_count) == (0, 25)
+    assert len(_missing(path)) == 25
+
+
+def _block_rows():
+    rows = [(i, f'望京花园{i}号楼', '朝阳', '望京花园') for i in range(1, 6)]
+    rows += [(i, f'海淀区学院路{i}号', '海淀', COARSE_MARKER + '小区') for i in range(6, 9)]
+    rows += [(9, '西城区无小区路1号', '西城', '')]
+    return rows
+
+
+def test_block_mode_propagates_precise_blocks_only(stub, tmp_path):
+    geocoder, path = _geocoder(stub, tmp_path, _block_rows())
+    geocoder.process_block_geocoding()
+    conn = sqlite3.connect(path)
+    coords = dict(conn.execute("SELECT id, latitude || ',' || longitude FROM house_info"))
+    failed = conn.execute("SELECT region, block FROM geocode_failed_blocks").fetchall()
+    conn.close()
+    # 同一小区的房源写入相同坐标；只解析到区县级的小区不传播，其房源逐条编码
+    assert len({coords[i] for i in range(1, 6)}) == 1
+    assert len({coords[i] for i in range(6, 9)}) == 3
+    assert failed == [('海淀', COARSE_MARKER + '小区')]
+    assert _missing(path) == []
+
+
+def test_block_mode_skips_recorded_failed_blocks(stub, tmp_path):
+    geocoder, path = _geocoder(stub, tmp_path, _block_rows())
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO geocode_failed_blocks VALUES ('朝阳', '望京花园', '2026-01-01')")
+    conn.commit()
+    conn.close()
+    assert geocoder.get_pending_blocks() == [(('海淀', COARSE_MARKER + '小区'), 3)]
+    # 重复记录同一小区时更新时间，不违反主键
+    geocoder.record_failed_blocks([('朝阳', '望京花园'), (None, '无区域小区')])
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT region, block FROM geocode_failed_blocks ORDER BY block").fetchall() == [
+        ('', '无区域小区'), ('朝阳', '望京花园')]
+    conn.close()
+
+
+def test_block_mode_fails_without_failed_blocks_table(stub, tmp_path):
+    geocoder, path = _geocoder(stub, tmp_path, _block_rows())
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE geocode_failed_blocks")
+    conn.close()
+    with pytest.raises(sqlite3.OperationalError):
+        geocoder.process_block_geocoding()
+    assert geocoder.api_calls == 0
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""高德桩服务的故障注入和地理编码压测"""
+
+import argparse
+
+from amap_stub_server import AMAP_BATCH_LIMIT, UNRESOLVABLE_MARKER, AmapStubServer, stub_location
+from benchmark_geocoding import run_benchmark
+
+
+def _server(**kwargs):
+    server = AmapStubServer(('127.0.0.1', 0), seed=1, **kwargs)
+    server.server_close()  # 直接调用 handle_geocode，不需要监听端口
+    return server
+
+
+def test_batch_response():
+    status, data = _server().handle_geocode(f'甲路1号|乙路2号{UNRESOLVABLE_MARKER}', batch=True)
+    assert status == 200 and data['status'] == '1' and data['count'] == '1'
+    first, second = data['geocodes']
+    assert first['location'] == stub_location('甲路1号')
+    assert second['location'] == [] and second['level'] == []
+
+    too_many = '|'.join(f'路{i}号' for i in range(AMAP_BATCH_LIMIT + 1))
+    assert _server().handle_geocode(too_many, batch=True)[1]['info'] == 'INVALID_PARAMS'
+
+
+def test_daily_quota_and_qps_limit():
+    server = _server(daily_quota=2)
+    infos = [server.handle_geocode('甲路1号', batch=False)[1]['info'] for _ in range(3)]
+    assert infos == ['OK', 'OK', 'DAILY_QUERY_OVER_LIMIT']
+    assert server.get_stats()['quota_rejected'] == 1
+
+    server = _server(qps_limit=2)
+    infos = [server.handle_geocode('甲路1号', batch=False)[1]['info'] for _ in range(3)]
+    assert infos == ['OK', 'OK', 'CUQPS_HAS_EXCEEDED_THE_LIMIT']
+    assert server.get_stats()['qps_rejected'] == 1
+
+
+def test_http_errors():
+    server = _server(error_rate=1.0)
+    assert server.handle_geocode('甲路1号', batch=False)[0] == 500
+    assert server.get_stats()['http_errors'] == 1
+
+
+def _args(**values):
+    args = dict(rows=300, seed=42, rps=0, mode='address', batch_size=None, retry_delay=0, latency=0,
+                qps_limit=None, failure_rate=0.0, error_rate=0.0, sqlite=None, mysql=False)
+    args.update(values)
+    return argparse.Namespace(**args)
+
+
+def test_run_benchmark_address_and_block_modes(tmp_path):
+    result = run_benchmark(_args(sqlite=str(tmp_path / 'address.db')))
+    assert result['success'] == 300 and result['api_calls'] == 30
+
+    result = run_benchmark(_args(mode='block', sqlite=str(tmp_path / 'block.db')))
+    assert result['success'] == 300
+    # 小区级编码按小区请求，调用次数明显少于逐条编码
+    assert result['api_calls'] < 15
+
+
+def test_run_benchmark_counts_unresolved_addresses(tmp_path):
+    result = run_benchmark(_args(failure_rate=0.1, sqlite=str(tmp_path / 'bench.db')))
+    assert result['failed'] > 0
+    assert result['success'] + result['failed'] == 300
+    assert result['api_calls'] == 30  # 无法解析的地址不重试
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""browse_retention 的分区规划和过期清理"""
+
+from datetime import datetime
+
+import pytest
+
+from browse_retention import (add_months, ensure_partitions, expire_partitions, list_partitions,
+                              partition_name, plan_new_partitions, retention_cutoff)
+
+NOW = datetime(2024, 10, 15, 8, 30)
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(' '.join(sql.split()))
+
+    def fetchall(self):
+        return self.conn.rows
+
+    def fetchone(self):
+        return (self.conn.earliest,)
+
+
+class _Connection:
+    def __init__(self, rows=None, earliest=None):
+        self.rows = rows or []
+        self.earliest = earliest
+        self.executed = []
+
+    def cursor(self, cursor_class=None):
+        return _Cursor(self)
+
+    def commit(self):
+        self.executed.append('COMMIT')
+
+
+def _monthly(*months):
+    """按月分区加 pmax，月份为 (年, 月)"""
+    partitions = [(partition_name(datetime(y, m, 1)), add_months(datetime(y, m, 1), 1), 100) for y, m in months]
+    return partitions + [('pmax', None, 0)]
+
+
+def test_add_months_across_years():
+    assert add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+    assert add_months(datetime(2024, 11, 1), 3) == datetime(2025, 2, 1)
+    assert add_months(datetime(2024, 6, 1), -18) == datetime(2022, 12, 1)
+
+
+def test_retention_cutoff():
+    assert retention_cutoff(6, NOW) == datetime(2024, 4, 1)
+    assert retention_cutoff(0, NOW) == datetime(2024, 10, 1)
+
+
+def test_list_partitions_parses_bounds():
+    conn = _Connection([{'name': 'p202409', 'bound': "'2024-10-01 00:00:00'", 'row_count': 12},
+                        {'name': 'pmax', 'bound': 'MAXVALUE', 'row_count': None}])
+    assert list_partitions(conn) == [('p202409', datetime(2024, 10, 1), 12), ('pmax', None, 0)]
+
+
+def test_list_partitions_requires_partitioned_table():
+    with pytest.raises(RuntimeError):
+        list_partitions(_Connection([{'name': None, 'bound': None, 'row_count': 5}]))
+
+
+def test_plan_continues_after_last_partition():
+    planned = plan_new_partitions(_Connection(), _monthly((2024, 9), (2024, 10)), ahead=2, now=NOW)
+    assert planned == [('p202411', datetime(2024, 12, 1)), ('p202412', datetime(2025, 1, 1))]
+
+
+def test_plan_starts_from_earliest_record():
+    conn = _Connection(earliest=datetime(2024, 8, 20, 10, 0))
+    planned = plan_new_partitions(conn, [('pmax', None, 0)], ahead=1, now=NOW)
+    assert [name for name, _ in planned] == ['p202408', 'p202409', 'p202410', 'p202411']
+
+
+def test_ensure_partitions_reorganizes_pmax():
+    conn = _Connection()
+    created = ensure_partitions(conn, _monthly((2024, 10)), ahead=1, now=NOW)
+    assert created == ['p202411']
+    assert conn.executed == [
+        "ALTER TABLE browse_history REORGANIZE PARTITION pmax INTO "
+        "(PARTITION p202411 VALUES LESS THAN ('2024-12-01 00:00:00'), PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    ]
+    assert ensure_partitions(conn, _monthly((2024, 11)), ahead=1, now=NOW) == []
+
+
+def test_expire_rolls_up_before_dropping():
+    partitions = _monthly((2024, 2), (2024, 3), (2024, 4))
+    cutoff = retention_cutoff(6, NOW)
+
+    dry_run = _Connection()
+    assert expire_partitions(dry_run, partitions, cutoff, dry_run=True) == [('p202402', 100), ('p202403', 100)]
+    assert dry_run.executed == []
+
+    conn = _Connection()
+    expire_partitions(conn, partitions, cutoff)
+    steps = [sql.split()[0] if sql != 'COMMIT' else sql for sql in conn.executed]
+    assert steps == ['INSERT', 'COMMIT', 'ALTER'] * 2
+    assert 'PARTITION (p202402)' in conn.executed[0]
+    assert conn.executed[2] == 'ALTER TABLE browse_history DROP PARTITION p202402'
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""DatabaseManager 的连接池等待统计、汇总表统计查询和流式读取"""
+
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pymysql.cursors
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+import database
+from database import DatabaseManager, build_house_filters, compact_dtypes
+
+
+@pytest.fixture
+def manager():
+    manager = DatabaseManager()
+    manager.config = dict(manager.config, pool_size=1, max_overflow=0)
+    return manager
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1,
+                         max_overflow=0, pool_timeout=5, connect_args={'check_same_thread': False})
+
+
+def test_slow_connect_is_not_a_wait(manager, engine):
+    # 连接池未满时新建连接再慢也不算等待
+    @event.listens_for(engine.pool, 'connect')
+    def slow_connect(dbapi_connection, connection_record):
+        time.sleep(0.05)
+
+    conn = manager._checkout(engine)
+    conn.close()
+    conn = manager._checkout(engine)
+    conn.close()
+    assert (manager._checkouts, manager._connects, manager._waits) == (2, 1, 0)
+    assert manager._in_use[engine.pool] == 0
+
+
+def test_exhausted_pool_counts_wait(manager, engine):
+    first = manager._checkout(engine)
+    assert manager._in_use[engine.pool] == 1
+
+    timer = threading.Timer(0.2, first.close)
+    timer.start()
+    second = manager._checkout(engine)
+    timer.join()
+    second.close()
+
+    assert manager._checkouts == 2
+    assert manager._waits == 1
+    assert manager._max_wait_time >= 0.15
+    assert manager._in_use[engine.pool] == 0
+
+
+def test_pool_timeout_counts_wait(manager, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1,
+                           max_overflow=0, pool_timeout=0.1, connect_args={'check_same_thread': False})
+    held = manager._checkout(engine)
+    with pytest.raises(PoolTimeoutError):
+        manager._checkout(engine)
+    held.close()
+    assert manager._waits == 1 and manager._checkouts == 2
+
+
+def test_unlimited_overflow_never_waits(manager, engine):
+    manager.config['max_overflow'] = -1
+    assert manager.pool_capacity is None
+    conn = manager._checkout(engine)
+    conn.close()
+    assert manager._waits == 0
+
+
+class _SQLiteConnection:
+    """把 pymysql 风格的 %s 占位符转换为 sqlite3 的 ?，用 SQLite 执行汇总表上的统计查询"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        conn = self.conn
+
+        class Cursor(sqlite3.Cursor):
+            def execute(self, sql, params=()):
+                return super().execute(sql.replace('%s', '?'), params)
+
+        return conn.cursor(Cursor)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        pass
+
+
+ROLLUP_ROWS = [
+    # region, rooms, rent_type, valid_count, price_sum, area_sum, unit_price_sum
+    ('朝阳', '1室1厅', '整租', 2, 10000, 100, 200),
+    ('朝阳', '2室1厅', '整租', 1, 8000, 80, 100),
+    ('海淀', '1室1厅', '合租', 1, 3000, 20, 150),
+    ('通州', '', '整租', 0, 0, 0, 0),
+]
+
+
+@pytest.fixture
+def rollup_manager(manager, monkeypatch):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE house_rollup (region TEXT, rooms TEXT, rent_type TEXT, direction TEXT DEFAULT '', "
+                 "valid_count INT, price_sum REAL, area_sum REAL, unit_price_sum REAL)")
+    conn.execute("CREATE TABLE house_price_histogram (region TEXT, bucket INT, listing_count INT)")
+    conn.executemany("INSERT INTO house_rollup (region, rooms, rent_type, valid_count, price_sum, area_sum, "
+                     "unit_price_sum) VALUES (?, ?, ?, ?, ?, ?, ?)", ROLLUP_ROWS)
+    # 区间 [6, 13] 共 8 个分桶，按 3 个区间合并时每个区间 3 个分桶
+    conn.executemany("INSERT INTO house_price_histogram VALUES (?, ?, ?)",
+                     [('朝阳', 6, 1), ('海淀', 6, 2), ('朝阳', 9, 4), ('朝阳', 10, 0), ('朝阳', 13, 5)])
+    monkeypatch.setattr(manager, 'get_read_connection', lambda user_id=None: _SQLiteConnection(conn))
+    return manager
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_analytics_summary_from_rollup(rollup_manager):
+    summary = rollup_manager.get_analytics_summary()
+    assert summary['total'] == 4
+    assert summary['avg_price'] == 5250
+    assert summary['avg_area'] == 50
+    assert summary['avg_unit_price'] == 112.5
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_histogram_merges_buckets(rollup_manager):
+    df = rollup_manager.get_histogram('price', bins=3)
+    width = database.PRICE_BUCKET_WIDTH
+    assert df.values.tolist() == [[6 * width, 9 * width, 3], [9 * width, 12 * width, 4], [12 * width, 15 * width, 5]]
+    with pytest.raises(ValueError):
+        rollup_manager.get_histogram('page_views')
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_value_counts_and_group_stats(rollup_manager):
+    counts = rollup_manager.get_value_counts('region', limit=2)
+    assert counts.values.tolist() == [['朝阳', 3], ['海淀', 1]]
+    with pytest.raises(ValueError):
+        rollup_manager.get_value_counts('title')
+
+    rooms = rollup_manager.get_room_price_stats(min_count=2)
+    assert rooms.values.tolist() == [['1室1厅', pytest.approx(13000 / 3), 3]]
+
+    stats = rollup_manager.get_region_stats(['海淀', '通州'])
+    assert stats[['region', 'count', 'avg_price']].values.tolist() == [['海淀', 1, 3000]]
+    assert rollup_manager.get_region_stats([]).empty
+
+    layouts = rollup_manager.get_region_room_counts(['朝阳'])
+    assert layouts.values.tolist() == [['朝阳', '1室1厅', 2], ['朝阳', '2室1厅', 1]]
+
+
+def test_compact_dtypes():
+    df = pd.DataFrame({
+        'region': ['朝阳', '海淀', '朝阳'],
+        'page_views': pd.Series([1, 200, 3], dtype='int64'),
+        'delta': pd.Series([-1, 0, 1], dtype='int64'),
+        'score': pd.Series([0.5, 1.5, 2.5], dtype='float64'),
+        'latitude': [Decimal('39.9'), None, Decimal('40.1')],
+        'title': ['a', 'b', 'c'],
+    })
+    df = compact_dtypes(df)
+    assert df['region'].dtype == 'category'
+    assert df['page_views'].dtype == np.uint8
+    assert df['delta'].dtype == np.int8
+    assert df['score'].dtype == np.float32
+    assert df['latitude'].dtype == np.float64
+    assert df['title'].tolist() == ['a', 'b', 'c'] and df['title'].dtype != 'category'
+
+
+def test_build_house_filters():
+    assert build_house_filters() == ('', [])
+    where, params = build_house_filters(search='公园', rent_type='整租', min_price=3000)
+    assert where == (" WHERE (title LIKE %s OR address LIKE %s OR block LIKE %s) AND rent_type = %s"
+                     " AND CAST(price AS UNSIGNED) >= %s")
+    assert params == ['%公园%'] * 3 + ['整租', 3000]
+
+
+class _StreamingConnection:
+    """模拟服务端游标：记录执行的查询和每次 fetchmany 的大小"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.fetches = []
+        self.closed = False
+        self.description = [('id',), ('region',), ('price',)]
+
+    def cursor(self, cursor_class=None):
+        assert cursor_class is pymysql.cursors.SSCursor
+        return self
+
+    def execute(self, query, params=None):
+        self.executed.append((' '.join(query.split()), params))
+
+    def fetchmany(self, size):
+        self.fetches.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+def test_iter_houses_streams_chunks(manager, monkeypatch):
+    conn = _StreamingConnection([(i, '朝阳' if i % 2 else '海淀', '3000') for i in range(1, 6)])
+    monkeypatch.setattr(database, 'connect', lambda init_command=None: conn)
+
+    chunks = list(manager.iter_houses('id, region, price', chunk_size=2, region='朝阳'))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0]['id'].dtype == np.uint8
+    assert chunks[0]['region'].dtype == 'category'
+    assert conn.executed == [("SELECT id, region, price FROM house_info WHERE region LIKE %s ORDER BY id",
+                              ['%朝阳%'])]
+    assert conn.closed
+
+
+def test_iter_query_closes_on_early_exit(manager, monkeypatch):
+    conn = _StreamingConnection([(i, '', '') for i in range(10)])
+    monkeypatch.setattr(database, 'connect', lambda init_command=None: conn)
+
+    chunks = manager.iter_query("SELECT id, region, price FROM house_info", chunk_size=3)
+    next(chunks)
+    chunks.close()
+    assert conn.fetches == [3]
+    assert conn.closed
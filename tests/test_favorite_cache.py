@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""favorite_cache 的失效规则"""
+
+import time
+
+from favorite_cache import FavoriteCache
+
+
+def _cache(**kwargs):
+    favorites = {1: {101, 102}, 2: {201}}
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return favorites.get(user_id, ())
+
+    return FavoriteCache(loader, **kwargs), favorites, loads
+
+
+def test_hits_after_first_load():
+    cache, _, loads = _cache()
+    assert cache.get(1) == {101, 102}
+    assert cache.contains(1, 101) and not cache.contains(1, 201)
+    assert loads == [1]
+    assert cache.get_stats()['hits'] == 2
+
+
+def test_invalidate_reloads():
+    cache, favorites, loads = _cache()
+    cache.get(1)
+    favorites[1].add(103)
+    assert 103 not in cache.get(1)
+    cache.invalidate(1)
+    assert 103 in cache.get(1)
+    assert loads == [1, 1]
+
+
+def test_changed_at_from_other_process_reloads():
+    cache, favorites, loads = _cache()
+    cache.get(1)
+    favorites[1].discard(101)
+    # 会话中记录的修改时间晚于缓存加载时间时重新加载
+    assert 101 not in cache.get(1, changed_at=time.time() + 1)
+    assert cache.get(1, changed_at=0) == {102}
+    assert loads == [1, 1]
+
+
+def test_ttl_expiry():
+    cache, _, loads = _cache(ttl=0)
+    cache.get(1)
+    cache.get(1)
+    assert loads == [1, 1]
+
+
+def test_evicts_least_recently_used():
+    cache, _, loads = _cache(max_users=1)
+    cache.get(1)
+    cache.get(2)
+    assert cache.get_stats()['users'] == 1
+    cache.get(1)
+    assert loads == [1, 2, 1]
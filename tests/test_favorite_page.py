@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""收藏列表的键集分页"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+T0 = datetime(2024, 10, 1, 12, 0, 0, 123456)
+
+
+@pytest.fixture
+def favorites(app_db):
+    """用户 7 收藏 5 个房源，其中 3 个收藏时间相同；用户 8 的收藏不应出现"""
+    db = app_db.db
+    for house_id in range(1, 7):
+        db.session.add(app_db.HouseInfo(id=house_id, title=f'房源{house_id}', price='3000'))
+    times = [T0, T0, T0, T0 + timedelta(seconds=1), T0 - timedelta(days=1)]
+    for house_id, created_at in enumerate(times, start=1):
+        db.session.add(app_db.Favorite(user_id=7, house_id=house_id, created_at=created_at))
+    db.session.add(app_db.Favorite(user_id=8, house_id=6, created_at=T0))
+    db.session.commit()
+    return app_db
+
+
+def _pages(app_db, limit):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = app_db.favorite_page(7, cursor, limit)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip(app_db):
+    row = type('Row', (), {'favorited_at': T0, 'favorite_id': 42})
+    cursor = app_db.encode_favorite_cursor(row)
+    assert cursor == '20241001120000123456-42'
+    assert app_db.decode_favorite_cursor(cursor) == (T0, 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'abc', '2024-1', '20241001120000123456-x', '1-2-3'])
+def test_invalid_cursor(app_db, cursor):
+    assert app_db.decode_favorite_cursor(cursor) is None
+
+
+def test_pages_cover_ties_without_duplicates(favorites):
+    # 收藏时间倒序，同一时间按收藏ID倒序
+    assert _pages(favorites, 2) == [[4, 3], [2, 1], [5]]
+    assert _pages(favorites, 5) == [[4, 3, 2, 1, 5]]
+
+
+def test_invalid_cursor_starts_from_first_page(favorites):
+    rows, next_cursor = favorites.favorite_page(7, 'bogus', 2)
+    assert [row.id for row in rows] == [4, 3]
+    assert next_cursor is not None
+
+
+def test_api_returns_cards_and_cursor(favorites):
+    client = favorites.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 7
+    data = client.get('/api/favorites?limit=3').get_json()
+    assert [house['id'] for house in data['houses']] == [4, 3, 2]
+    assert data['houses'][0]['favorited_at'] == (T0 + timedelta(seconds=1)).isoformat()
+    assert set(data['houses'][0]) == {column.key for column in favorites.FAVORITE_CARD_COLUMNS} | {'favorited_at'}
+
+    data = client.get(f"/api/favorites?limit=3&cursor={data['next_cursor']}").get_json()
+    assert [house['id'] for house in data['houses']] == [1, 5]
+    assert data['next_cursor'] is None
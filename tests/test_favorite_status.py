@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""批量收藏状态接口和收藏集合缓存"""
+
+import pytest
+
+from favorite_cache import FavoriteCache
+
+
+@pytest.fixture
+def client(app_db):
+    client = app_db.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 7
+        session['username'] = 'alice'
+    return client
+
+
+def _add(app_db, user_id, *house_ids):
+    for house_id in house_ids:
+        app_db.db.session.add(app_db.Favorite(user_id=user_id, house_id=house_id))
+    app_db.db.session.commit()
+
+
+def test_cache_reloads_after_change_time():
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return [1, 2]
+
+    cache = FavoriteCache(loader)
+    assert cache.get(7) == {1, 2}
+    assert cache.contains(7, 2)
+    assert loads == [7]
+    # 其他进程写入后会话中的修改时间晚于缓存，重新加载
+    cache.get(7, changed_at=float('inf'))
+    assert loads == [7, 7]
+    cache.invalidate(7)
+    cache.get(7)
+    assert cache.get_stats()['misses'] == 3
+
+
+def test_cache_evicts_least_recently_used():
+    cache = FavoriteCache(lambda user_id: [user_id], max_users=2)
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+    assert list(cache._entries) == [1, 3]
+
+
+def test_status_logged_out(app_db):
+    response = app_db.app.test_client().get('/api/favorites/status?ids=1,2')
+    assert response.get_json() == {'success': True, 'favorite_ids': []}
+
+
+def test_status_rejects_too_many_ids(client, app_db):
+    ids = ','.join(str(i) for i in range(app_db.FAVORITE_STATUS_LIMIT + 1))
+    response = client.get(f'/api/favorites/status?ids={ids}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_status_returns_favorited_subset(client, app_db):
+    _add(app_db, 7, 3, 1)
+    _add(app_db, 8, 2)
+    response = client.get('/api/favorites/status?ids=1,2,3,x,4')
+    assert response.get_json() == {'success': True, 'favorite_ids': [1, 3]}
+
+
+def test_writes_invalidate_cache(client, app_db):
+    assert client.get('/api/favorites/status?ids=5').get_json()['favorite_ids'] == []
+
+    assert client.post('/api/favorites', json={'house_id': 5}).get_json()['message'] == '收藏成功'
+    assert client.get('/api/favorites/status?ids=5').get_json()['favorite_ids'] == [5]
+    assert client.get('/api/favorites/check/5').get_json() == {'is_favorite': True}
+    # 重复收藏被唯一约束忽略
+    assert client.post('/api/favorites', json={'house_id': 5}).get_json()['message'] == '该房源已在收藏列表中'
+
+    assert client.delete('/api/favorites', json={'house_id': 5}).get_json()['message'] == '取消收藏成功'
+    assert client.get('/api/favorites/status?ids=5').get_json()['favorite_ids'] == []
+    with client.session_transaction() as session:
+        assert session['favorites_at'] > 0
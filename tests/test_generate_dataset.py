@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""generate_dataset 的数据生成和导入准备"""
+
+import glob
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+import generate_dataset
+from generate_dataset import (BASE_SCHEMA_SQL, HOUSE_COLUMNS, REGION_WEIGHTS, BlockPool, escape_field,
+                              generate_favorites, generate_history, generate_houses)
+from migrate import MIGRATIONS_DIR
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+NOW_TS = int(NOW.timestamp())
+
+
+class _Cursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append(' '.join(sql.split()))
+
+
+class _Connection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return _Cursor(self.executed)
+
+    def commit(self):
+        pass
+
+
+def _houses(seed, count=500):
+    rng = np.random.default_rng(seed)
+    return generate_houses(rng, BlockPool(rng, count), 101, count, NOW_TS)
+
+
+def test_generate_houses_valid_listings():
+    rows = _houses(7)
+    assert len(rows) == 500
+    records = [dict(zip(HOUSE_COLUMNS, row)) for row in rows]
+    assert [r['id'] for r in records] == list(range(101, 601))
+    assert len({r['house_num'] for r in records}) == len(records)
+    for r in records:
+        # 与 database.VALID_LISTING_CONDITION 相同的有效性判断，汇总表统计全部生成的房源
+        assert r['price'].isdigit() and 0 < int(r['price']) < 100000
+        assert r['area'].isdigit() and 0 < int(r['area']) < 1000
+        assert r['region'] in REGION_WEIGHTS
+        assert r['block'].startswith(r['region'].rstrip('区'))
+        assert NOW_TS - 731 * 86400 <= r['publish_time'] <= NOW_TS
+
+
+def test_generate_houses_reproducible_with_seed():
+    assert _houses(42, 50) == _houses(42, 50)
+    assert _houses(42, 50) != _houses(43, 50)
+
+
+def test_generate_favorites_no_duplicates():
+    rng = np.random.default_rng(1)
+    rows = generate_favorites(rng, np.arange(1, 201), 1000, 5, NOW)
+    pairs = [(user_id, house_id) for user_id, house_id, _ in rows]
+    assert len(pairs) == len(set(pairs))
+    assert all(1 <= house_id <= 1000 for _, house_id in pairs)
+
+
+def test_generate_history_without_users_is_anonymous():
+    rng = np.random.default_rng(2)
+    rows = generate_history(rng, 0, 100, 50, NOW, [11, 12])
+    assert all(user_id is None for user_id, *_ in rows)
+    assert {row[4] for row in rows} <= {11, 12}
+
+
+def test_escape_field():
+    assert escape_field(None) == '\\N'
+    assert escape_field('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+    assert escape_field(datetime(2024, 1, 2, 3, 4, 5)) == '2024-01-02 03:04:05'
+
+
+def test_truncate_clears_trigger_maintained_tables(monkeypatch):
+    monkeypatch.setattr(generate_dataset, 'apply_migrations', lambda conn: [])
+    conn = _Connection()
+    generate_dataset.prepare_schema(conn, truncate=True)
+    truncated = [sql.split()[-1] for sql in conn.executed if sql.startswith('TRUNCATE')]
+
+    # house_info 上触发器维护的表都要清空，否则与重新导入的房源不一致
+    trigger_tables = set()
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')):
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+        if 'ON `house_info`' in sql:
+            trigger_tables.update(re.findall(r'INSERT INTO `(\w+)`', sql))
+    assert {'house_rollup', 'house_rent_trend', 'house_price_sketch'} <= trigger_tables
+    assert trigger_tables - {'house_info'} <= set(truncated)
+
+    # 清空的表都由基础表或迁移创建
+    created = set()
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')):
+        with open(path, encoding='utf-8') as f:
+            created.update(re.findall(r'CREATE TABLE IF NOT EXISTS `(\w+)`', f.read()))
+    created.update(re.search(r'CREATE TABLE IF NOT EXISTS (\w+)', sql).group(1) for sql in BASE_SCHEMA_SQL)
+    assert set(truncated) <= created
+
+
+def test_no_truncate_by_default(monkeypatch):
+    monkeypatch.setattr(generate_dataset, 'apply_migrations', lambda conn: [])
+    conn = _Connection()
+    generate_dataset.prepare_schema(conn, truncate=False)
+    assert not [sql for sql in conn.executed if sql.startswith('TRUNCATE')]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""house_covisit 的共同浏览统计"""
+
+import itertools
+import random
+from collections import Counter
+
+import numpy as np
+
+from house_covisit import count_pairs, top_neighbors
+
+
+def _visits(pairs):
+    """与 load_visits() 的结果相同：(访客, 房源) 去重并按访客排序"""
+    keys = sorted(set(pairs))
+    return (np.array([visitor for visitor, _ in keys], dtype=np.int64),
+            np.array([house for _, house in keys], dtype=np.int64))
+
+
+def _brute_force(visitors, houses, max_houses):
+    by_visitor = {}
+    for visitor, house in zip(visitors.tolist(), houses.tolist()):
+        by_visitor.setdefault(visitor, []).append(house)
+    counts = Counter()
+    for seen in by_visitor.values():
+        if len(seen) <= max_houses:
+            counts.update(itertools.permutations(seen, 2))
+    return counts
+
+
+def _as_counter(keys, counts, modulus):
+    return Counter({(int(key) // modulus, int(key) % modulus): int(count) for key, count in zip(keys, counts)})
+
+
+def test_count_pairs_matches_brute_force():
+    random.seed(5)
+    visitors, houses = _visits((random.randint(0, 60), random.randint(1, 40)) for _ in range(600))
+    expected = _brute_force(visitors, houses, max_houses=12)
+    keys, counts, modulus = count_pairs(visitors, houses, max_houses=12)
+    assert _as_counter(keys, counts, modulus) == expected
+    # 分成很小的批次结果不变
+    keys, counts, modulus = count_pairs(visitors, houses, max_houses=12, batch_size=50)
+    assert _as_counter(keys, counts, modulus) == expected
+
+
+def test_count_pairs_empty():
+    keys, counts, _ = count_pairs(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    assert len(keys) == 0 and len(counts) == 0
+    # 每个访客只看了一套房源，没有房源对
+    keys, counts, _ = count_pairs(*_visits([(0, 1), (1, 2)]))
+    assert len(keys) == 0
+
+
+def test_top_neighbors():
+    # 房源 1 与 2 有三个共同访客，与 3 只有一个；房源 4 只被一个访客看过
+    visitors, houses = _visits([(0, 1), (0, 2), (1, 1), (1, 2), (2, 1), (2, 2), (2, 3), (3, 3), (3, 4)])
+    keys, counts, modulus = count_pairs(visitors, houses)
+    assert top_neighbors(houses, keys, counts, modulus, top_k=5, min_covisits=1) == {
+        1: [2, 3], 2: [1, 3], 3: [4, 1, 2], 4: [3]}
+    assert top_neighbors(houses, keys, counts, modulus, top_k=1, min_covisits=2) == {1: [2], 2: [1]}
+    assert top_neighbors(houses, keys, counts, modulus, min_covisits=5) == {}
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""house_ingest 的规范化与合并规则"""
+
+from datetime import datetime
+
+import pytest
+
+from house_ingest import (INGEST_COLUMNS, merge_record, normalize_area, normalize_coordinate,
+                          normalize_price, normalize_publish_time, normalize_record, normalize_rooms)
+
+NOW = datetime(2026, 10, 19, 15, 30)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3500元/月', '3500'),
+    ('1.2万元/月', '12000'),
+    ('3,000-3500', '3000'),
+    ('面议', '面议'),
+    (4200, '4200'),
+    ('0', None),
+    ('', None),
+    (None, None),
+])
+def test_normalize_price(value, expected):
+    assert normalize_price(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('89.5㎡', '90'),
+    ('89平米', '89'),
+    ('约60平', '60'),
+    (120, '120'),
+    ('abc', None),
+])
+def test_normalize_area(value, expected):
+    assert normalize_area(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2室1厅1卫', '2室1厅1卫'),
+    ('两室一厅', '2室1厅'),
+    ('三室两厅两卫', '3室2厅2卫'),
+    ('2房1厅', '2室1厅'),
+    ('2-1-1', '2室1厅1卫'),
+    ('3居', '3室'),
+    ('开间', '1室0厅'),
+    ('别墅', '别墅'),
+    (None, None),
+])
+def test_normalize_rooms(value, expected):
+    assert normalize_rooms(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    (1700000000, datetime.fromtimestamp(1700000000)),
+    (1700000000123, datetime.fromtimestamp(1700000000)),
+    ('2024-05-01 12:00', datetime(2024, 5, 1, 12, 0)),
+    ('2024年5月1日', datetime(2024, 5, 1)),
+    ('05-01', datetime(2026, 5, 1)),
+    ('12-25', datetime(2025, 12, 25)),  # 月日晚于当前日期时取去年
+    ('3天前', datetime(2026, 10, 16, 15, 30)),
+    ('2小时前', datetime(2026, 10, 19, 13, 30)),
+    ('昨天', datetime(2026, 10, 18)),
+    ('刚刚', NOW),
+])
+def test_normalize_publish_time(value, expected):
+    assert normalize_publish_time(value, NOW) == int(expected.timestamp())
+
+
+@pytest.mark.parametrize('value', ['xx', '', None, True])
+def test_normalize_publish_time_invalid(value):
+    assert normalize_publish_time(value, NOW) is None
+
+
+def test_normalize_coordinate():
+    assert normalize_coordinate('39.123456789', 90) == 39.12345679
+    assert normalize_coordinate('91', 90) is None
+    assert normalize_coordinate(0, 90) is None
+    assert normalize_coordinate('nan', 90) is None
+
+
+def test_normalize_record():
+    assert normalize_record({'title': '没有编号'}) is None
+
+    record = normalize_record({'house_num': ' A1 ', 'title': '  ', 'facilities': ['空调', ' ', '冰箱'],
+                               'price': '3500元/月', 'latitude': '39.9', 'longitude': 'abc'}, NOW)
+    assert set(record) == set(INGEST_COLUMNS)
+    assert record['house_num'] == 'A1'
+    assert record['title'] is None
+    assert record['facilities'] == '空调-冰箱'
+    assert record['price'] == '3500'
+    # 经纬度只有一个有效时都不保留
+    assert record['latitude'] is None and record['longitude'] is None
+
+
+def _existing(**values):
+    row = {column: None for column in INGEST_COLUMNS}
+    row.update(id=7, page_views=12, house_num='A1', title='旧标题', price='3000',
+               address='朝阳某路1号', block='X小区', latitude=39.9, longitude=116.4)
+    row.update(values)
+    return row
+
+
+def _record(**values):
+    return normalize_record(dict({'house_num': 'A1'}, **values), NOW)
+
+
+def test_merge_record_unchanged():
+    assert merge_record(_existing(), _record(title='旧标题', price='3000元/月')) is None
+
+
+def test_merge_record_keeps_missing_fields():
+    merged = merge_record(_existing(), _record(title='新标题'))
+    assert merged['title'] == '新标题'
+    assert merged['price'] == '3000'
+    assert merged['id'] == 7 and merged['page_views'] == 12
+    assert (merged['latitude'], merged['longitude']) == (39.9, 116.4)
+
+
+def test_merge_record_clears_coordinates_when_address_changes():
+    merged = merge_record(_existing(), _record(address='朝阳某路2号'))
+    assert merged['latitude'] is None and merged['longitude'] is None
+
+    merged = merge_record(_existing(), _record(block='Y小区', latitude='39.91', longitude='116.41'))
+    assert (merged['latitude'], merged['longitude']) == (39.91, 116.41)
+
+
+def test_merge_record_compares_decimal_coordinates():
+    from decimal import Decimal
+    existing = _existing(latitude=Decimal('39.90000000'), longitude=Decimal('116.40000000'))
+    assert merge_record(existing, _record(latitude='39.9', longitude='116.4')) is None
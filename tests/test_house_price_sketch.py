@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""house_price_sketch 的分位数草图"""
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+import house_price_sketch
+from house_price_sketch import RELATIVE_ACCURACY, PriceSketch, bin_bounds, bin_index, bin_value
+from migrate import MIGRATIONS_DIR, split_statements
+
+
+def test_bin_value_within_accuracy():
+    for price in (800, 1234, 3500, 9999, 58000):
+        low, high = bin_bounds(bin_index(price))
+        assert low < price <= high
+        assert abs(bin_value(bin_index(price)) - price) <= RELATIVE_ACCURACY * price + 1e-9
+
+
+def test_quantile_relative_error():
+    random.seed(3)
+    prices = [random.randint(800, 20000) for _ in range(5000)]
+    sketch = PriceSketch()
+    for price in prices:
+        sketch.add(price)
+    assert sketch.total == len(prices)
+    for q in (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1):
+        expected = np.percentile(prices, q * 100, method='lower')
+        assert sketch.quantile(q) == pytest.approx(expected, rel=2 * RELATIVE_ACCURACY)
+
+
+def test_count_below():
+    sketch = PriceSketch()
+    for price, count in ((1000, 3), (2000, 5), (3000, 2)):
+        sketch.add(price, count)
+    assert sketch.count_below(2000) == (3, 5)
+    assert sketch.count_below(500) == (0, 0)
+    assert sketch.count_below(2500) == (8, 0)
+    assert sketch.count_below(50000) == (10, 0)
+
+
+def test_merge_and_empty():
+    assert PriceSketch().quantile(0.5) is None
+    assert PriceSketch().count_below(1000) == (0, 0)
+
+    left, right = PriceSketch(), PriceSketch()
+    left.add(1000, 2)
+    assert left.quantile(0.5) == pytest.approx(1000, rel=RELATIVE_ACCURACY)
+    right.add(5000, 2)
+    left.merge(right)
+    assert left.total == 4
+    assert left.quantile(1) == pytest.approx(5000, rel=RELATIVE_ACCURACY)
+
+
+def test_migration_bins_match_bin_index():
+    with open(os.path.join(MIGRATIONS_DIR, '0010_house_price_sketch.sql'), encoding='utf-8') as f:
+        statements = split_statements(f.read())
+    procedure = next(s for s in statements if s.startswith('CREATE PROCEDURE'))
+    assert house_price_sketch._BIN_SQL.format(price='v_price') in procedure
+    assert [s.split('`')[1] for s in statements if s.startswith('CREATE TRIGGER')] == [
+        'house_info_sketch_insert', 'house_info_sketch_update', 'house_info_sketch_delete']
+
+
+def test_rebuild_releases_locks_on_failure(monkeypatch):
+    executed = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            executed.append(sql.split()[0])
+            if sql.lstrip().startswith('INSERT'):
+                raise RuntimeError('执行失败')
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+
+        def commit(self):
+            executed.append('COMMIT')
+
+        def rollback(self):
+            executed.append('ROLLBACK')
+
+        def close(self):
+            executed.append('CLOSE')
+
+    monkeypatch.setattr(house_price_sketch.db_manager, 'get_connection', Connection)
+    with pytest.raises(RuntimeError):
+        house_price_sketch.rebuild_sketch()
+    assert executed == ['SET', 'LOCK', 'DELETE', 'INSERT', 'ROLLBACK', 'UNLOCK', 'CLOSE']
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""house_rollup 的迁移和全量重建"""
+
+import os
+import re
+
+import pytest
+
+import house_rollup
+from database import AREA_BUCKET_WIDTH, PRICE_BUCKET_WIDTH
+from migrate import MIGRATIONS_DIR, split_statements
+
+
+def _migration_statements():
+    with open(os.path.join(MIGRATIONS_DIR, '0008_house_rollup.sql'), encoding='utf-8') as f:
+        return split_statements(f.read())
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(' '.join(sql.split()))
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError('执行失败')
+
+    def fetchone(self):
+        return (12,)
+
+
+class _Connection:
+    """记录执行的语句和事务操作"""
+
+    def __init__(self, fail_on=None):
+        self.executed = []
+        self.fail_on = fail_on
+        self.closed = False
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.executed.append('COMMIT')
+
+    def rollback(self):
+        self.executed.append('ROLLBACK')
+
+    def close(self):
+        self.closed = True
+
+
+def test_migration_creates_procedure_and_triggers():
+    statements = _migration_statements()
+    created = [re.match(r'CREATE (TABLE IF NOT EXISTS|PROCEDURE|TRIGGER) `(\w+)`', s).group(2)
+               for s in statements if s.startswith('CREATE')]
+    assert created == ['house_rollup', 'house_price_histogram', 'house_area_histogram', 'house_rollup_apply',
+                       'house_info_rollup_insert', 'house_info_rollup_update', 'house_info_rollup_delete']
+    # 触发器和存储过程在重新创建前先删除，已用旧脚本安装过的库也能执行
+    kinds = [s.split()[0] + ' ' + s.split()[1] for s in statements]
+    assert kinds[3:] == ['DROP TRIGGER'] * 3 + ['DROP PROCEDURE', 'CREATE PROCEDURE'] + ['CREATE TRIGGER'] * 3
+
+
+def test_migration_bucket_widths_match_rebuild():
+    procedure = next(s for s in _migration_statements() if s.startswith('CREATE PROCEDURE'))
+    assert f'FLOOR(v_price / {PRICE_BUCKET_WIDTH})' in procedure
+    assert f'FLOOR(v_area / {AREA_BUCKET_WIDTH})' in procedure
+    rebuild = '\n'.join(house_rollup.REBUILD_SQL)
+    assert f'FLOOR(price_value / {PRICE_BUCKET_WIDTH})' in rebuild
+    assert f'FLOOR(area_value / {AREA_BUCKET_WIDTH})' in rebuild
+
+
+def test_rebuild_holds_table_locks(monkeypatch):
+    conn = _Connection()
+    monkeypatch.setattr(house_rollup.db_manager, 'get_connection', lambda: conn)
+
+    assert house_rollup.rebuild_rollup() == 12
+    executed = conn.executed
+    lock = executed.index(' '.join(house_rollup.LOCK_TABLES_SQL.split()))
+    assert executed[:lock] == ['SET autocommit = 0']
+    assert executed[lock + 1].startswith('DELETE FROM house_rollup')
+    assert executed[-2:] == ['COMMIT', 'UNLOCK TABLES']
+    assert conn.closed
+
+
+def test_rebuild_failure_releases_locks(monkeypatch):
+    conn = _Connection(fail_on='INSERT INTO house_price_histogram')
+    monkeypatch.setattr(house_rollup.db_manager, 'get_connection', lambda: conn)
+
+    with pytest.raises(RuntimeError):
+        house_rollup.rebuild_rollup()
+    assert conn.executed[-2:] == ['ROLLBACK', 'UNLOCK TABLES']
+    assert 'COMMIT' not in conn.executed
+    assert conn.closed
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""house_snapshot 的列式快照构建、增量刷新和统计"""
+
+import itertools
+import math
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import house_snapshot
+from house_snapshot import get_snapshot, refresh_snapshot, region_chart_stats, valid_listing_mask
+
+
+class _Cursor:
+    """pymysql 风格的游标：支持 with 语句和 %s 占位符"""
+
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cursor.close()
+        return False
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace('%s', '?'), params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class _Connection:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return _Cursor(self.conn)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def source(monkeypatch):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE house_info (id INTEGER PRIMARY KEY, region TEXT, rent_type TEXT, rooms TEXT, "
+                 "direction TEXT, price TEXT, area TEXT, publish_time INT, page_views INT, "
+                 "latitude REAL, longitude REAL)")
+    conn.execute("CREATE TABLE house_changes (id INTEGER PRIMARY KEY, house_id INT, change_type TEXT)")
+    monkeypatch.setattr(house_snapshot.db_manager, 'get_connection', lambda: _Connection(conn))
+    # 版本名按毫秒时间生成，测试中连续刷新时保证每次不同
+    clock = itertools.count(1700000000, 1)
+    monkeypatch.setattr(house_snapshot, 'time', SimpleNamespace(time=lambda: next(clock)))
+    return conn
+
+
+def _insert(conn, *rows):
+    conn.executemany("INSERT INTO house_info VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _house(house_id, region='朝阳', price='5000', area='50', rooms='1室1厅', direction='南'):
+    return (house_id, region, '整租', rooms, direction, price, area, 1700000000 + house_id, house_id, None, None)
+
+
+def test_full_build(source, tmp_path):
+    _insert(source, _house(1), _house(2, region='海淀', price='面议'), _house(3, region='', area='30'))
+    snapshot = refresh_snapshot(str(tmp_path))
+
+    assert snapshot.rows == 3 and snapshot.watermark == 3 and snapshot.change_watermark == 0
+    assert snapshot.dictionaries['region'] == ['朝阳', '海淀']
+    assert snapshot['region'].tolist() == [0, 1, -1]
+    assert snapshot.decode('region', snapshot['region']) == ['朝阳', '海淀', None]
+    assert math.isnan(snapshot['price'][1])
+    assert np.isnan(snapshot['latitude']).all()
+    assert valid_listing_mask(snapshot).tolist() == [True, False, True]
+    assert snapshot.to_dataframe(['id', 'region'])['region'].tolist()[:2] == ['朝阳', '海淀']
+
+
+def test_incremental_appends_and_updates(source, tmp_path):
+    _insert(source, _house(1), _house(2))
+    first = refresh_snapshot(str(tmp_path))
+
+    # 没有新房源和修改时沿用当前版本
+    assert refresh_snapshot(str(tmp_path)).version == first.version
+
+    _insert(source, _house(3, region='通州'))
+    source.execute("UPDATE house_info SET price = '6000', region = '大兴' WHERE id = 2")
+    source.executemany("INSERT INTO house_changes (house_id, change_type) VALUES (?, ?)",
+                       [(2, 'update'), (9, 'update'), (3, 'insert')])
+    second = refresh_snapshot(str(tmp_path))
+
+    assert second.version != first.version
+    assert second['id'].tolist() == [1, 2, 3]
+    assert second['price'].tolist() == [5000, 6000, 5000]
+    assert second.decode('region', second['region']) == ['朝阳', '大兴', '通州']
+    # 已有的编码保持不变，新值追加到字典末尾
+    assert second.dictionaries['region'][0] == '朝阳'
+    assert (second.watermark, second.change_watermark) == (3, 3)
+
+
+def test_publish_keeps_previous_version(source, tmp_path):
+    directory = str(tmp_path)
+    _insert(source, _house(1))
+    versions = [refresh_snapshot(directory, full=True).version]
+    for house_id in (2, 3):
+        _insert(source, _house(house_id))
+        versions.append(refresh_snapshot(directory).version)
+
+    assert sorted(name for name in os.listdir(directory) if name.startswith('v')) == versions[1:]
+    assert get_snapshot(directory).version == versions[-1]
+    assert get_snapshot(str(tmp_path / 'missing')) is None
+
+
+def test_region_chart_stats(source, tmp_path):
+    _insert(source,
+            _house(1, price='3000', area='30'),
+            _house(2, price='9000', area='90', rooms='2室1厅', direction='南北'),
+            _house(3, price='5000', area='50'),
+            _house(4, region='海淀', price='12000', area='40'))
+    snapshot = refresh_snapshot(str(tmp_path))
+
+    stats = region_chart_stats(snapshot, '朝阳', house_id=3)
+    assert stats['room_distribution'] == [('1室1厅', 2), ('2室1厅', 1)]
+    assert stats['direction_distribution'] == [('南', 2), ('南北', 1)]
+    # 区域单价不含当前房源，全市单价包含全部房源
+    assert stats['region_avg_unit_price'] == 100
+    assert stats['city_avg_unit_price'] == 150
+    assert stats['price_histogram'] == [0, 1, 1, 0, 1, 0, 0]
+    assert [point['price'] for point in stats['scatter_data']] == [3000, 9000]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""house_sqlite 的快照导出和按表路由"""
+
+import os
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+import app as house_app
+import house_sqlite
+from house_sqlite import CREATE_SQL, INDEX_SQL, HOUSE_COLUMNS, fts_phrase, snapshot_tables
+
+HOUSES = [
+    (1, '朝阳公园南门两居', '2室1厅1卫', '72', '6500', '南', '整租', '朝阳区', '朝阳公园小区', '朝阳区朝阳公园路1号',
+     Decimal('39.93000000'), Decimal('116.47000000')),
+    (2, '学院路合租主卧', '3室1厅1卫', '15', '3200元/月', '南北', '合租主卧', '海淀区', '学院路小区', '海淀区学院路8号',
+     None, None),
+]
+
+
+class _SourceCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class _Source:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, cursor_class=None):
+        return _SourceCursor(self.rows)
+
+
+def _mysql_rows():
+    names = [name for name, _ in HOUSE_COLUMNS]
+    rows = []
+    for house_id, title, rooms, area, price, direction, rent_type, region, block, address, lat, lng in HOUSES:
+        values = dict(id=house_id, title=title, rooms=rooms, area=area, price=price, direction=direction,
+                      rent_type=rent_type, region=region, block=block, address=address,
+                      latitude=lat, longitude=lng)
+        rows.append(tuple(values.get(name) for name in names))
+    return rows
+
+
+def _build(path, tables=('house_info',)):
+    conn = sqlite3.connect(path)
+    for sql in CREATE_SQL:
+        conn.execute(sql)
+    house_sqlite._copy_houses(_Source(_mysql_rows()), conn)
+    for sql in INDEX_SQL:
+        conn.execute(sql)
+    conn.execute("INSERT INTO snapshot_meta (key, value) VALUES ('tables', ?)", (','.join(tables),))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('6500', 6500), ('3200元/月', 3200), (' 42', 42), ('-5', -5), ('面议', 0), ('', 0), (None, None)])
+def test_cast_int_matches_mysql(value, expected):
+    assert house_sqlite._cast_int(value) == expected
+
+
+def test_fts_phrase():
+    assert fts_phrase('朝阳') is None
+    assert fts_phrase('朝阳公园') == '"朝阳公园"'
+    assert fts_phrase('a"b"c') == '"a""b""c"'
+    assert fts_phrase('学院路', ['block']) == '{block} : "学院路"'
+
+
+def test_snapshot_search_and_spatial_index(tmp_path):
+    path = str(tmp_path / 'house.db')
+    _build(path)
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT rowid FROM house_fts WHERE house_fts MATCH ?", (fts_phrase('学院路'),)).fetchall()
+        assert rows == [(2,)]
+        assert conn.execute("SELECT id, price_num, area_num FROM house_info ORDER BY id").fetchall() == [
+            (1, 6500, 72), (2, 3200, 15)]
+        # 没有坐标的房源不进入空间索引
+        assert conn.execute("SELECT id, min_lat FROM house_rtree").fetchall() == [(1, pytest.approx(39.93))]
+    finally:
+        conn.close()
+
+
+def test_snapshot_tables_reloads_replaced_file(tmp_path):
+    path = str(tmp_path / 'house.db')
+    assert snapshot_tables(path) == frozenset()
+
+    _build(path)
+    assert snapshot_tables(path) == {'house_info'}
+
+    tmp = str(tmp_path / 'house.db.tmp')
+    _build(tmp, ('house_info', 'house_rollup'))
+    os.replace(tmp, path)
+    assert snapshot_tables(path) == {'house_info', 'house_rollup'}
+
+
+def test_snapshot_query_only_for_exported_tables(tmp_path, monkeypatch):
+    path = str(tmp_path / 'house.db')
+    _build(path)
+    monkeypatch.setattr(house_app, 'READ_SNAPSHOT', path)
+    db = house_app.db
+
+    assert house_app.snapshot_query(db.select(house_app.HouseInfo))
+    # 快照中没有导出的汇总表、用户相关的表仍查 MySQL
+    assert not house_app.snapshot_query(db.select(house_app.HouseRollup))
+    assert not house_app.snapshot_query(
+        db.select(house_app.HouseInfo).join(house_app.Favorite, house_app.Favorite.house_id == house_app.HouseInfo.id))
+    assert not house_app.snapshot_query(db.update(house_app.HouseInfo).values(page_views=1))
+    assert not house_app.snapshot_query(None)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""house_trend 的迁移、全量重建和走势查询"""
+
+import os
+from datetime import date
+
+import pytest
+
+import house_trend
+from migrate import MIGRATIONS_DIR, split_statements
+
+
+def _migration_statements():
+    with open(os.path.join(MIGRATIONS_DIR, '0009_house_rent_trend.sql'), encoding='utf-8') as f:
+        return split_statements(f.read())
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(' '.join(sql.split()))
+
+    def fetchone(self):
+        return (40,)
+
+
+class _Connection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.executed.append('COMMIT')
+
+    def rollback(self):
+        self.executed.append('ROLLBACK')
+
+    def close(self):
+        pass
+
+
+def _trend_row(day, valid_count, price_sum, price_sq_sum=0.0, unit_price_sum=0.0):
+    return {'period_start': day, 'listing_count': valid_count, 'valid_count': valid_count,
+            'price_sum': price_sum, 'price_sq_sum': price_sq_sum, 'unit_price_sum': unit_price_sum}
+
+
+def test_migration_matches_rebuild_dimensions():
+    statements = _migration_statements()
+    procedure = next(s for s in statements if s.startswith('CREATE PROCEDURE'))
+    # 每个周期、每个维度组合各一条 upsert，与全量重建的语句一一对应
+    assert procedure.count('INSERT INTO `house_rent_trend`') == len(house_trend._rebuild_statements()) - 1
+    for period in house_trend.TREND_PERIODS:
+        assert house_trend._PERIOD_START_SQL[period].format(ts='p_publish_time') in procedure
+    assert [s.split('`')[1] for s in statements if s.startswith('CREATE TRIGGER')] == [
+        'house_info_trend_insert', 'house_info_trend_update', 'house_info_trend_delete']
+
+
+def test_rebuild_holds_table_locks(monkeypatch):
+    conn = _Connection()
+    monkeypatch.setattr(house_trend.db_manager, 'get_connection', lambda: conn)
+
+    assert house_trend.rebuild_trend() == 40
+    assert conn.executed[:3] == ['SET autocommit = 0', house_trend.LOCK_TABLES_SQL, 'DELETE FROM house_rent_trend']
+    assert conn.executed[-2:] == ['COMMIT', 'UNLOCK TABLES']
+
+
+def test_trend_series_fills_gaps_and_weights_moving_average(monkeypatch):
+    rows = [_trend_row(date(2024, 1, 1), 2, 6000.0, 18500000.0, 100.0),
+            _trend_row(date(2024, 3, 1), 1, 4000.0, 16000000.0, 50.0)]
+    queries = []
+
+    def fetch_rows(query, params):
+        queries.append(params)
+        return rows
+
+    monkeypatch.setattr(house_trend.db_manager, 'fetch_rows', fetch_rows)
+    series = house_trend.trend_series('month', region='朝阳', window=3)
+
+    assert queries == [['month', '朝阳', house_trend.ALL]]
+    assert [p['period_start'] for p in series] == [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)]
+    january, february, march = series
+    assert january['avg_price'] == 3000
+    assert january['std_price'] == pytest.approx(500)
+    assert january['avg_unit_price'] == 50
+    # 空周期补零，不参与均值
+    assert february['count'] == 0 and february['avg_price'] is None
+    assert february['moving_avg_price'] == 3000
+    assert march['moving_avg_price'] == pytest.approx(10000 / 3)
+
+
+def test_trend_series_since_keeps_full_window(monkeypatch):
+    rows = [_trend_row(date(2024, 1, d), 1, 1000.0 * i) for i, d in enumerate((1, 8, 15, 22), 1)]
+    params_seen = []
+
+    def fetch_rows(query, params):
+        params_seen.append(params)
+        return rows
+
+    monkeypatch.setattr(house_trend.db_manager, 'fetch_rows', fetch_rows)
+    series = house_trend.trend_series('week', window=2, since=date(2024, 1, 15))
+
+    # 多取一个周期，返回的第一个周期的移动平均包含上一周
+    assert params_seen[0][-1] == date(2024, 1, 8)
+    assert [p['period_start'] for p in series] == [date(2024, 1, 15), date(2024, 1, 22)]
+    assert series[0]['moving_avg_price'] == 2500
+
+
+def test_trend_series_rejects_unknown_period():
+    with pytest.raises(ValueError):
+        house_trend.trend_series('day')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""house_trending 的热门榜"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import house_trending
+from house_trending import TrendingBoard
+
+
+def _board(rows=(), **kwargs):
+    events = list(rows)
+
+    def loader(last_id, since):
+        return sorted(row for row in events if row[0] > last_id)[:board.batch_size]
+
+    board = TrendingBoard(loader, **kwargs)
+    return board, events
+
+
+def _ago(seconds):
+    return datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_top_decays_and_orders():
+    board, _ = _board(half_life=3600, top_n=10)
+    board.add(1, '朝阳', _ago(0))
+    board.add(2, '海淀', _ago(3600))
+    board.add(3, '海淀', _ago(7200))
+    ranked = board.top(limit=3)
+    assert [house_id for house_id, _ in ranked] == [1, 2, 3]
+    assert [score for _, score in ranked] == pytest.approx([1.0, 0.5, 0.25], abs=0.01)
+    assert [house_id for house_id, _ in board.top('海淀')] == [2, 3]
+    assert board.top('西城') == []
+
+
+def test_board_keeps_top_n():
+    board, _ = _board(top_n=3)
+    now = _ago(0)
+    for house_id, views in ((1, 1), (2, 5), (3, 2), (4, 4), (5, 3)):
+        for _ in range(views):
+            board.add(house_id, '朝阳', now)
+    assert [house_id for house_id, _ in board.top(limit=10)] == [2, 4, 5]
+    assert [house_id for house_id, _ in board.top('朝阳', limit=10)] == [2, 4, 5]
+
+
+def test_rebase_keeps_ranking_and_prunes():
+    board, _ = _board(half_life=60, top_n=10)
+    start = time.time()
+    board.add(1, '朝阳', start)
+    board.add(1, '朝阳', start)
+    board.add(2, '朝阳', start)
+    # 超过 REBASE_EXPONENT 个半衰期后的浏览触发平移，旧的浏览已衰减到可以忽略
+    later = start + 60 * (house_trending.REBASE_EXPONENT + 1)
+    board.add(3, '海淀', later)
+    board.add(4, '海淀', later)
+    board.add(4, '海淀', later)
+    assert board.rebases == 1
+    assert board.get_stats()['houses'] == 2
+    assert [house_id for house_id, _ in board.top(limit=10)] == [4, 3]
+    assert board.top('朝阳') == []
+
+
+def test_sync_reads_in_batches():
+    now = _ago(0)
+    board, _ = _board([(row_id, row_id % 3, now, '朝阳') for row_id in range(1, 8)], batch_size=3)
+    assert board.sync(force=True) == 7
+    assert board.get_stats()['last_id'] == 7
+    assert board.sync() == 0  # 未到 sync_interval
+
+
+def test_sync_picks_up_late_commits():
+    now = _ago(0)
+    board, events = _board([(1, 10, now, '朝阳'), (3, 11, now, '朝阳')], late_window=5)
+    assert board.sync(force=True) == 2
+    events.append((2, 12, now, '朝阳'))  # ID 较小但提交较晚的浏览
+    assert board.sync(force=True) == 1
+    assert board.sync(force=True) == 0
+    assert board.events == 3
+    assert sorted(house_id for house_id, _ in board.top()) == [10, 11, 12]
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""migrate 的迁移文件解析和执行"""
+
+import pymysql
+import pytest
+
+import migrate
+from migrate import ignored_error, load_migrations, split_statements
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        for marker, code in self.conn.errors.items():
+            if marker in sql:
+                raise pymysql.err.OperationalError(code, '模拟错误')
+        self.conn.executed.append(sql if params is None else params)
+
+    def fetchall(self):
+        return []
+
+
+class _Connection:
+    """按语句中的片段模拟 MySQL 错误"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _write(directory, files):
+    for name, sql in files.items():
+        (directory / name).write_text(sql, encoding='utf-8')
+
+
+def test_split_statements_with_delimiter():
+    sql = """-- 注释
+CREATE TABLE `t` (`a` INT);
+UPDATE `t` SET `a` = 1; UPDATE `t` SET `a` = 2;
+
+DELIMITER //
+CREATE TRIGGER `t_insert` AFTER INSERT ON `t` FOR EACH ROW
+BEGIN
+    -- 触发器内的注释
+    INSERT INTO `u` VALUES (NEW.a);
+END //
+DELIMITER ;
+DROP TABLE `v`"""
+    statements = split_statements(sql)
+    assert statements[:3] == ['CREATE TABLE `t` (`a` INT)', 'UPDATE `t` SET `a` = 1', 'UPDATE `t` SET `a` = 2']
+    assert statements[3].startswith('CREATE TRIGGER') and statements[3].endswith('END')
+    assert 'INSERT INTO `u` VALUES (NEW.a);' in statements[3]
+    assert statements[4] == 'DROP TABLE `v`'
+    assert len(statements) == 5
+
+
+def test_load_migrations_sorted(tmp_path):
+    _write(tmp_path, {'0002_b.sql': 'SELECT 2;', '0001_a.sql': 'SELECT 1;', 'README.md': '说明'})
+    migrations = load_migrations(str(tmp_path))
+    assert [(version, name) for version, name, _, _ in migrations] == [(1, 'a'), (2, 'b')]
+    assert migrations[0][3] != migrations[1][3]
+
+
+def test_load_migrations_rejects_duplicate_versions(tmp_path):
+    _write(tmp_path, {'0001_a.sql': 'SELECT 1;', '0001_b.sql': 'SELECT 2;'})
+    with pytest.raises(ValueError):
+        load_migrations(str(tmp_path))
+
+
+def test_repository_migrations_parse():
+    migrations = load_migrations()
+    assert [m[0] for m in migrations] == list(range(1, len(migrations) + 1))
+    for _, name, sql, _ in migrations:
+        assert split_statements(sql), name
+
+
+@pytest.mark.parametrize('statement, code, ignored', [
+    ('ALTER TABLE `t` ADD COLUMN `a` INT', 1060, True),
+    ('CREATE INDEX `i` ON `t` (`a`)', 1061, True),
+    ('ALTER TABLE `t` ADD UNIQUE INDEX `u` (`a`)', 1061, True),
+    ('ALTER TABLE `t` DROP COLUMN `a`', 1091, True),
+    # 字段不存在不再忽略，数据迁移引用了不存在的字段时中止
+    ('UPDATE `t` SET `a` = 1', 1054, False),
+    ('INSERT INTO `t` SELECT `a` FROM `u`', 1054, False),
+    # 错误码只对对应的语句忽略
+    ('ALTER TABLE `t` ADD COLUMN `a` INT', 1061, False),
+    ('CREATE TABLE `t` (`a` INT, `a` INT)', 1060, False),
+    ('ALTER TABLE `t` MODIFY `a` BIGINT', 1091, False),
+])
+def test_ignored_error(statement, code, ignored):
+    assert (ignored_error(statement, code) is not None) == ignored
+
+
+def test_apply_migrations_skips_existing_index(tmp_path, monkeypatch):
+    _write(tmp_path, {'0001_a.sql': 'CREATE INDEX `i` ON `t` (`a`);\nUPDATE `t` SET `a` = 1;'})
+    monkeypatch.setattr(migrate, 'MIGRATIONS_DIR', str(tmp_path))
+    conn = _Connection({'CREATE INDEX': 1061})
+
+    assert migrate.apply_migrations(conn) == [1]
+    assert 'UPDATE `t` SET `a` = 1' in conn.executed
+    assert conn.executed[-1][:2] == (1, 'a')
+
+
+def test_apply_migrations_stops_on_unknown_column(tmp_path, monkeypatch):
+    _write(tmp_path, {'0001_a.sql': 'UPDATE `t` SET `b` = `a`;\nALTER TABLE `t` DROP COLUMN `a`;'})
+    monkeypatch.setattr(migrate, 'MIGRATIONS_DIR', str(tmp_path))
+    conn = _Connection({'SET `b`': 1054})
+
+    with pytest.raises(pymysql.err.OperationalError):
+        migrate.apply_migrations(conn)
+    assert conn.rollbacks == 1
+    assert not any('DROP COLUMN' in str(sql) for sql in conn.executed)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""/api/pool-stats 的访问控制"""
+
+import pytest
+
+import app as house_app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(house_app.app.config, 'ADMIN_USERNAMES', {'ops'})
+    return house_app.app.test_client()
+
+
+def _login(client, user_id, username):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = username
+
+
+def test_requires_login(client):
+    response = client.get('/api/pool-stats')
+    assert response.status_code == 401
+    assert response.get_json()['success'] is False
+
+
+def test_requires_admin(client):
+    _login(client, 1, 'alice')
+    response = client.get('/api/pool-stats')
+    assert response.status_code == 403
+    assert 'database_manager' not in response.get_json()
+
+
+def test_admin_sees_stats(client):
+    _login(client, 2, 'ops')
+    response = client.get('/api/pool-stats')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    assert {'database_manager', 'replicas', 'favorite_cache', 'sqlalchemy'} <= set(data)
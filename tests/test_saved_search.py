@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""saved_search 的区间树与订阅索引"""
+
+import random
+
+from saved_search import IntervalTree, SavedSearchIndex, price_value, rooms_key
+
+
+def test_interval_tree_matches_brute_force():
+    random.seed(7)
+    intervals = []
+    for i in range(300):
+        low = random.randint(0, 1000)
+        intervals.append((low, low + random.randint(0, 300), i))
+    tree = IntervalTree(intervals)
+    for point in list(range(-5, 1400, 7)) + [0, 1000]:
+        expected = sorted(item for low, high, item in intervals if low <= point <= high)
+        assert sorted(tree.stab(point)) == expected
+
+
+def test_interval_tree_closed_bounds_and_empty():
+    tree = IntervalTree([(1000, 2000, 'a'), (2000, 3000, 'b')])
+    assert sorted(tree.stab(2000)) == ['a', 'b']
+    assert tree.stab(999) == []
+    assert IntervalTree([]).stab(1) == []
+
+
+def test_rooms_key_and_price_value():
+    assert rooms_key('2室1厅') == '2室'
+    assert rooms_key('别墅') == '别墅'
+    assert rooms_key('') is None
+    assert price_value('3500') == 3500
+    assert price_value('面议') == 0
+    assert price_value(None) == 0
+
+
+def _search(search_id, **values):
+    search = dict(id=search_id, user_id=1, region=None, rent_type=None, rooms=None, min_price=None,
+                  max_price=None, keyword=None, latitude=None, longitude=None, radius_km=None)
+    search.update(values)
+    return search
+
+
+def _house(**values):
+    house = dict(id=1, title='望京精装两居', address='望京西路1号', block='望京花园', region='朝阳',
+                 rent_type='整租', rooms='2室1厅', price='3500', latitude=39.99, longitude=116.47)
+    house.update(values)
+    return house
+
+
+def _matched_ids(index, house):
+    return sorted(search['id'] for search in index.match(house))
+
+
+def test_saved_search_index_match():
+    index = SavedSearchIndex([
+        _search(1),                                              # 不限条件
+        _search(2, region='朝阳', min_price=3000, max_price=4000),
+        _search(3, region='海淀'),
+        _search(4, region='朝阳', rent_type='合租'),
+        _search(5, rooms='2室', max_price=3000),
+        _search(6, rooms='2室2厅', min_price=3500, max_price=3500),  # 户型按 N室 匹配
+        _search(7, keyword='望京花园'),
+        _search(8, keyword='国贸'),
+        _search(9, min_price=5000, max_price=4000),              # 区间为空，不会匹配
+    ])
+    assert index.size == 9
+    assert _matched_ids(index, _house()) == [1, 2, 6, 7]
+    assert _matched_ids(index, _house(price='面议')) == [1, 5, 7]
+    assert _matched_ids(index, _house(region=None)) == [1, 6, 7]
+
+
+def test_saved_search_index_radius():
+    index = SavedSearchIndex([_search(1, latitude=39.99, longitude=116.47, radius_km=1)])
+    assert _matched_ids(index, _house(latitude=39.995, longitude=116.47)) == [1]
+    assert _matched_ids(index, _house(latitude=40.2, longitude=116.47)) == []
+    assert _matched_ids(index, _house(latitude=None, longitude=None)) == []
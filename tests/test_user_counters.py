@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""个人中心的计数表统计"""
+
+import os
+from datetime import datetime, timedelta
+
+import migrate
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'migrations', '0003_user_activity_counters.sql')
+
+
+def _add_views(app_db, user_id, *days_ago):
+    today = datetime.utcnow().date()
+    for days in days_ago:
+        app_db.db.session.add(app_db.UserDailyView(user_id=user_id, day=today - timedelta(days=days), view_count=10))
+    app_db.db.session.commit()
+
+
+def test_migration_installs_trigger_as_one_statement():
+    with open(MIGRATION, encoding='utf-8') as f:
+        statements = migrate.split_statements(f.read())
+    triggers = [sql for sql in statements if sql.startswith('CREATE TRIGGER')]
+    assert len(triggers) == 1
+    assert triggers[0].rstrip().endswith('END')
+    assert 'ON DUPLICATE KEY UPDATE `view_count` = `view_count` + 1' in triggers[0]
+
+
+def test_favorite_count_reads_counter(app_db):
+    assert app_db.favorite_count(7) == 0
+    app_db.db.session.add(app_db.UserCounter(user_id=7, favorite_count=3, browse_count=12))
+    app_db.db.session.commit()
+    assert app_db.favorite_count(7) == 3
+
+
+def test_recent_view_count_window(app_db):
+    assert app_db.recent_view_count(7) == 0
+    # 今天算在窗口内，30天前的分桶不算
+    _add_views(app_db, 7, 0, 29, 30)
+    _add_views(app_db, 8, 0)
+    assert app_db.recent_view_count(7) == 20
+    assert app_db.recent_view_count(7, days=1) == 10
+
+
+def test_profile_shows_counters(app_db):
+    db = app_db.db
+    user = app_db.User(username='alice', email='alice@example.com')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(app_db.UserCounter(user_id=user.id, favorite_count=4, browse_count=57))
+    db.session.commit()
+    _add_views(app_db, user.id, 1, 45)
+
+    client = app_db.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+        session['username'] = 'alice'
+    response = client.get('/profile')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert '<h4>4</h4>' in html and '<h4>57</h4>' in html
+    assert '最近30天: 10<' in html
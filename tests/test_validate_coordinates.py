@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""validate_coordinates 的向量化坐标检查"""
+
+import sqlite3
+
+import numpy as np
+
+import validate_coordinates as V
+from benchmark_geocoding import SQLiteConnection
+
+
+def _check(regions, points, cluster_keys=np.empty(0, dtype=np.int64)):
+    region_index, region_bounds = V.build_region_bounds()
+    lat = np.array([p[0] for p in points], dtype=np.float64)
+    lng = np.array([p[1] for p in points], dtype=np.float64)
+    return V.check_chunk(regions, lat, lng, region_index, region_bounds, V.build_center_points(),
+                         cluster_keys).tolist()
+
+
+def test_check_chunk_flags():
+    issues = _check(
+        ['朝阳', '朝阳区', '海淀', '未知区域', '石景山'],
+        [(39.92, 116.47),      # 正常
+         (39.95, 116.30),      # 落在海淀，超出朝阳范围
+         (39.9598, 116.2982),  # 海淀区中心点
+         (1.0, 1.0),           # 境外，区域未知不做范围检查
+         (39.9042, 116.4074)]  # 北京市中心点，同时超出石景山范围
+    )
+    assert issues == [0, V.ISSUE_OUT_OF_REGION, V.ISSUE_CITY_CENTER, V.ISSUE_OUT_OF_CHINA,
+                      V.ISSUE_CITY_CENTER | V.ISSUE_OUT_OF_REGION]
+    assert V.describe_issues(issues[-1]) == 'out_of_region,city_center'
+
+
+def test_region_margin():
+    # 区域边界外 REGION_MARGIN 以内不算超出范围
+    assert _check(['朝阳'], [(39.9900 + V.REGION_MARGIN / 2, 116.47)]) == [0]
+    assert _check(['朝阳'], [(39.9900 + V.REGION_MARGIN * 2, 116.47)]) == [V.ISSUE_OUT_OF_REGION]
+
+
+def _database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE house_info (id INTEGER PRIMARY KEY, region TEXT, block TEXT, "
+                 "latitude REAL, longitude REAL)")
+    conn.execute("CREATE TABLE coordinate_issues (id INTEGER PRIMARY KEY AUTOINCREMENT, house_id INT, "
+                 "issues TEXT, latitude REAL, longitude REAL, checked_at TEXT)")
+    conn.executemany("INSERT INTO house_info VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return SQLiteConnection(path)
+
+
+def test_cluster_detection_and_requeue(tmp_path):
+    # 同一坐标被 CLUSTER_MIN_BLOCKS 个不同小区共用时视为异常聚集；同一小区共用坐标是正常的
+    rows = [(i, '朝阳', f'小区{i}', 39.93, 116.46) for i in range(1, V.CLUSTER_MIN_BLOCKS + 1)]
+    rows += [(100 + i, '朝阳', '同一小区', 39.92, 116.47) for i in range(10)]
+    rows += [(200, '朝阳', '小区X', None, None)]
+    conn = _database(str(tmp_path / 'coords.db'), rows)
+
+    cluster_keys = V.load_cluster_keys(conn)
+    assert len(cluster_keys) == 1
+
+    chunks = list(V.iter_coordinate_chunks(conn, chunk_size=4))
+    assert [len(ids) for ids, _, _, _ in chunks] == [4, 4, 4, 3]  # 没有坐标的房源不读取
+    ids = np.concatenate([chunk[0] for chunk in chunks])
+    lat = np.concatenate([chunk[2] for chunk in chunks])
+    lng = np.concatenate([chunk[3] for chunk in chunks])
+    regions = [region for chunk in chunks for region in chunk[1]]
+    issues = np.array(_check(regions, list(zip(lat, lng)), cluster_keys))
+    suspect = issues != 0
+    assert ids[suspect].tolist() == list(range(1, V.CLUSTER_MIN_BLOCKS + 1))
+
+    V.record_and_requeue(conn, ids[suspect], lat[suspect], lng[suspect], issues[suspect])
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM house_info WHERE latitude IS NULL")
+    assert cursor.fetchone()[0] == V.CLUSTER_MIN_BLOCKS + 1
+    cursor.execute("SELECT DISTINCT issues FROM coordinate_issues")
+    assert cursor.fetchall() == [('cluster',)]
+    conn.close()
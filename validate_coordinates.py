@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+房源坐标批量校验与修复工具
+分块读取 house_info 的坐标到 NumPy 数组，向量化检查以下问题：
+  - 坐标在中国境外（与 coordinate_converter.out_of_china 规则一致）
+  - 坐标超出所属区域的范围（BEIJING_REGIONS）
+  - 坐标落在城市/区域中心点上（地理编码降级返回的中心点）
+  - 大量不同小区的房源共用同一个坐标点
+可疑记录写入 coordinate_issues 表，并在 --fix 模式下清空坐标，交给地理编码脚本重新处理
+
+用法:
+    python validate_coordinates.py              # 只检查并输出报告
+    python validate_coordinates.py --fix        # 记录并清空可疑坐标
+"""
+
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from add_test_coordinates import BEIJING_REGIONS, get_db_connection
+from location_utils import CITY_COORDINATES
+
+# 问题类型（按位组合）
+ISSUE_OUT_OF_CHINA = 1
+ISSUE_OUT_OF_REGION = 2
+ISSUE_CITY_CENTER = 4
+ISSUE_CLUSTER = 8
+
+ISSUE_NAMES = {
+    ISSUE_OUT_OF_CHINA: 'out_of_china',
+    ISSUE_OUT_OF_REGION: 'out_of_region',
+    ISSUE_CITY_CENTER: 'city_center',
+    ISSUE_CLUSTER: 'cluster'
+}
+
+# 区域范围判断的容差（度），约2公里，避免边界上的房源被误判
+REGION_MARGIN = 0.02
+
+# 与中心点的距离小于该值（度）即视为降级返回的中心点，约10米
+CENTER_TOLERANCE = 0.0001
+
+# 同一坐标点被超过该数量的不同小区共用时视为异常聚集
+CLUSTER_MIN_BLOCKS = 5
+
+# 坐标比较的精度（小数位数）
+POINT_PRECISION = 5
+
+CREATE_ISSUES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS coordinate_issues (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        house_id INT NOT NULL,
+        issues VARCHAR(100) NOT NULL,
+        latitude DECIMAL(10, 8) NULL,
+        longitude DECIMAL(11, 8) NULL,
+        checked_at DATETIME NOT NULL,
+        INDEX idx_house_id (house_id)
+    ) DEFAULT CHARSET=utf8mb4
+"""
+
+
+def out_of_china_mask(lng, lat):
+    """coordinate_converter.out_of_china 的向量化版本"""
+    return ~((lng > 73.66) & (lng < 135.05) & (lat > 3.86) & (lat < 53.55))
+
+
+def normalize_region(region):
+    """把 '朝阳' 之类的区域名映射到 BEIJING_REGIONS 的键"""
+    if not region:
+        return None
+    if region in BEIJING_REGIONS:
+        return region
+    if f"{region}区" in BEIJING_REGIONS:
+        return f"{region}区"
+    return None
+
+
+def build_region_bounds():
+    """把区域范围整理成按区域编号索引的数组
+
+    Returns:
+        (region_index, bounds): region_index 为 {区域名: 编号}，
+        bounds 为 (区域数, 4) 的数组，列依次为 min_lat, max_lat, min_lng, max_lng
+    """
+    region_index = {}
+    bounds = np.empty((len(BEIJING_REGIONS), 4))
+    for i, (region, data) in enumerate(BEIJING_REGIONS.items()):
+        region_index[region] = i
+        bounds[i] = (data['lat_range'][0] - REGION_MARGIN, data['lat_range'][1] + REGION_MARGIN,
+                     data['lng_range'][0] - REGION_MARGIN, data['lng_range'][1] + REGION_MARGIN)
+    return region_index, bounds
+
+
+def build_center_points():
+    """城市中心和区域中心点，(N, 2) 数组，列依次为 lat, lng"""
+    centers = list(CITY_COORDINATES.values())
+    centers.extend(data['center'] for data in BEIJING_REGIONS.values())
+    return np.array(centers, dtype=np.float64)
+
+
+def point_keys(lat, lng):
+    """把坐标按精度编码为 int64，便于向量化比较"""
+    scale = 10 ** POINT_PRECISION
+    lat_key = np.round(lat * scale).astype(np.int64)
+    lng_key = np.round(lng * scale).astype(np.int64)
+    return lat_key * (400 * scale) + lng_key
+
+
+def load_cluster_keys(conn):
+    """找出被多个不同小区共用的坐标点
+
+    同一小区共用坐标是正常的（小区级地理编码会这样写入），
+    所以只统计不同小区的数量。
+    """
+    cursor = conn.cursor()
+    sql = f"""
+        SELECT ROUND(latitude, {POINT_PRECISION}) AS lat, ROUND(longitude, {POINT_PRECISION}) AS lng
+        FROM house_info
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY lat, lng
+        HAVING COUNT(DISTINCT COALESCE(block, '')) >= %s
+    """
+    cursor.execute(sql, (CLUSTER_MIN_BLOCKS,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64)
+
+    points = np.array(rows, dtype=np.float64)
+    return np.unique(point_keys(points[:, 0], points[:, 1]))
+
+
+def iter_coordinate_chunks(conn, chunk_size):
+    """按主键分块读取坐标，避免一次性加载整张表"""
+    last_id = 0
+    sql = """
+        SELECT id, region, latitude, longitude
+        FROM house_info
+        WHERE id > %s
+        AND latitude IS NOT NULL
+        AND longitude IS NOT NULL
+        ORDER BY id
+        LIMIT %s
+    """
+    while True:
+        cursor = conn.cursor()
+        cursor.execute(sql, (last_id, chunk_size))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if not rows:
+            break
+
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        regions = [row[1] for row in rows]
+        lat = np.fromiter((float(row[2]) for row in rows), dtype=np.float64, count=len(rows))
+        lng = np.fromiter((float(row[3]) for row in rows), dtype=np.float64, count=len(rows))
+
+        yield ids, regions, lat, lng
+        last_id = int(ids[-1])
+
+
+def check_chunk(regions, lat, lng, region_index, region_bounds, centers, cluster_keys):
+    """对一块坐标做向量化检查，返回每行的问题位掩码"""
+    issues = np.zeros(len(lat), dtype=np.int64)
+
+    # 1. 境外坐标
+    issues[out_of_china_mask(lng, lat)] |= ISSUE_OUT_OF_CHINA
+
+    # 2. 超出所属区域范围（只检查已知区域）
+    codes = np.fromiter((region_index.get(normalize_region(r), -1) for r in regions),
+                        dtype=np.int64, count=len(regions))
+    known = codes >= 0
+    if known.any():
+        b = region_bounds[codes[known]]
+        k_lat, k_lng = lat[known], lng[known]
+        outside = (k_lat < b[:, 0]) | (k_lat > b[:, 1]) | (k_lng < b[:, 2]) | (k_lng > b[:, 3])
+        issues[np.flatnonzero(known)[outside]] |= ISSUE_OUT_OF_REGION
+
+    # 3. 中心点降级坐标
+    d_lat = np.abs(lat[:, None] - centers[None, :, 0])
+    d_lng = np.abs(lng[:, None] - centers[None, :, 1])
+    at_center = ((d_lat < CENTER_TOLERANCE) & (d_lng < CENTER_TOLERANCE)).any(axis=1)
+    issues[at_center] |= ISSUE_CITY_CENTER
+
+    # 4. 异常聚集点
+    if len(cluster_keys):
+        issues[np.isin(point_keys(lat, lng), cluster_keys)] |= ISSUE_CLUSTER
+
+    return issues
+
+
+def describe_issues(mask):
+    """把问题位掩码转换为可读的字符串"""
+    return ','.join(name for bit, name in ISSUE_NAMES.items() if mask & bit)
+
+
+def record_and_requeue(conn, ids, lat, lng, issues):
+    """记录可疑坐标并清空，交给地理编码脚本重新处理"""
+    now = datetime.now()
+    cursor = conn.cursor()
+    cursor.executemany(
+        """
+        INSERT INTO coordinate_issues (house_id, issues, latitude, longitude, checked_at)
+        VALUES (%s, %s, %s, %s, %s)
+        """,
+        [(int(i), describe_issues(int(m)), float(a), float(o), now)
+         for i, m, a, o in zip(ids, issues, lat, lng)]
+    )
+    cursor.executemany(
+        "UPDATE house_info SET latitude = NULL, longitude = NULL WHERE id = %s",
+        [(int(i),) for i in ids]
+    )
+    conn.commit()
+    cursor.close()
+
+
+def validate_coordinates(chunk_size=50000, fix=False):
+    """执行坐标校验
+
+    Returns:
+        统计信息字典
+    """
+    region_index, region_bounds = build_region_bounds()
+    centers = build_center_points()
+
+    stats = {'checked': 0, 'suspect': 0, 'requeued': 0}
+    stats.update({name: 0 for name in ISSUE_NAMES.values()})
+
+    conn = get_db_connection()
+    try:
+        if fix:
+            cursor = conn.cursor()
+            cursor.execute(CREATE_ISSUES_TABLE_SQL)
+            cursor.close()
+
+        cluster_keys = load_cluster_keys(conn)
+        print(f"发现 {len(cluster_keys)} 个被 {CLUSTER_MIN_BLOCKS} 个以上小区共用的坐标点")
+
+        # 读写使用不同连接，避免清空坐标影响分块读取
+        write_conn = get_db_connection() if fix else None
+        try:
+            for ids, regions, lat, lng in iter_coordinate_chunks(conn, chunk_size):
+                issues = check_chunk(regions, lat, lng, region_index, region_bounds, centers, cluster_keys)
+                suspect = issues != 0
+
+                stats['checked'] += len(ids)
+                stats['suspect'] += int(suspect.sum())
+                for bit, name in ISSUE_NAMES.items():
+                    stats[name] += int(((issues & bit) != 0).sum())
+
+                if fix and suspect.any():
+                    record_and_requeue(write_conn, ids[suspect], lat[suspect], lng[suspect], issues[suspect])
+                    stats['requeued'] += int(suspect.sum())
+
+                print(f"已检查 {stats['checked']:,} 条, 可疑 {stats['suspect']:,} 条")
+        finally:
+            if write_conn:
+                write_conn.close()
+    finally:
+        conn.close()
+
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='房源坐标批量校验与修复')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='每次读取的记录数')
+    parser.add_argument('--fix', action='store_true', help='记录可疑坐标并清空，等待重新地理编码')
+    args = parser.parse_args()
+
+    print("=== 房源坐标校验工具 ===")
+    print(f"模式: {'校验并修复' if args.fix else '仅校验'}")
+    print()
+
+    stats = validate_coordinates(chunk_size=args.chunk_size, fix=args.fix)
+
+    print()
+    print(f"📊 共检查 {stats['checked']:,} 条坐标, 可疑 {stats['suspect']:,} 条")
+    print(f"   境外坐标: {stats['out_of_china']:,}")
+    print(f"   超出区域范围: {stats['out_of_region']:,}")
+    print(f"   中心点降级坐标: {stats['city_center']:,}")
+    print(f"   异常聚集点: {stats['cluster']:,}")
+    if args.fix:
+        print(f"✅ 已清空 {stats['requeued']:,} 条可疑坐标，运行 amap_geocoding.py 重新编码")
+    elif stats['suspect']:
+        print("使用 --fix 参数清空可疑坐标并重新地理编码")
+
+
+if __name__ == "__main__":
+    main()